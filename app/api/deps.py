@@ -1,49 +1,55 @@
-from typing import Generator, Annotated
+from typing import Annotated
+from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
 from app.core.security import ALGORITHM
 from app.db.session import get_db
 from app.models.user import User
+from app.services.user_cache import user_cache
 
 # C'est l'URL que FastAPI utilisera pour la doc Swagger si on veut se loguer (optionnel ici)
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.BASE_URL}/api/v1/auth/login"
 )
 
-def get_current_user(
+async def get_current_user(
     token: Annotated[str, Depends(reusable_oauth2)],
-    db: Annotated[Session, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_db)]
 ) -> User:
     """
     Cette fonction est le 'Videur'. 
     Elle est appelée avant chaque route protégée.
     1. Elle récupère le token.
-    2. Elle le décrypte.
-    3. Elle cherche l'utilisateur en base.
+    2. Elle le décrypte (ou le retrouve dans le cache des tokens déjà vérifiés).
+    3. Elle cherche l'utilisateur (cache mémoire / Redis, sinon en base).
     4. Si tout est OK, elle retourne l'objet User. Sinon, elle jette une erreur 401.
     """
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    user_id = user_cache.get_token_subject(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[ALGORITHM]
+            )
+            user_id: str = payload.get("sub")
+            if user_id is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Token invalide: ID utilisateur manquant",
+                )
+            user_id = UUID(user_id)
+        except (JWTError, ValidationError, ValueError):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token invalide: ID utilisateur manquant",
+                detail="Token invalide ou expiré",
             )
-    except (JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide ou expiré",
-        )
+        user_cache.remember_token(token, user_id, payload.get("exp"))
 
-    user = db.get(User, user_id)
+    user = await user_cache.get_user(user_id, lambda: db.get(User, user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
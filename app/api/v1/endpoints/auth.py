@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Request, Depends, HTTPException
 from starlette.responses import RedirectResponse
 from authlib.integrations.starlette_client import OAuth
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
 from app.db.session import get_db
 from app.models.user import User
@@ -30,7 +31,7 @@ async def login(request: Request):
     return await oauth.google.authorize_redirect(request, redirect_uri, access_type='offline', prompt='consent')
 
 @router.get("/callback", name="auth_callback")
-async def auth_callback(request: Request, db: Session = Depends(get_db)):
+async def auth_callback(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         # 1. Échange du code contre les tokens
         token = await oauth.google.authorize_access_token(request)
@@ -42,7 +43,7 @@ async def auth_callback(request: Request, db: Session = Depends(get_db)):
 
         # 2. Recherche si l'utilisateur existe déjà
         statement = select(User).where(User.email == email)
-        user = db.exec(statement).first()
+        user = (await db.exec(statement)).first()
 
         # 3. Si non, on le crée
         if not user:
@@ -53,8 +54,8 @@ async def auth_callback(request: Request, db: Session = Depends(get_db)):
                 is_active=True
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
 
         # 4. Sauvegarde / Mise à jour des Tokens Google (Pour l'IA)
         # On cherche si on a déjà des crédentials pour ce user
@@ -62,7 +63,7 @@ async def auth_callback(request: Request, db: Session = Depends(get_db)):
             OAuthCredential.user_id == user.id, 
             OAuthCredential.provider == "google"
         )
-        credential = db.exec(cred_statement).first()
+        credential = (await db.exec(cred_statement)).first()
 
         if not credential:
             credential = OAuthCredential(user_id=user.id, provider="google", access_token="")
@@ -76,7 +77,7 @@ async def auth_callback(request: Request, db: Session = Depends(get_db)):
         credential.expires_at = token.get('expires_at')
         
         db.add(credential)
-        db.commit()
+        await db.commit()
 
         # 5. Création du Token de Session (JWT) pour l'App Mobile
         access_token = create_access_token(subject=user.id)
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends
+from pydantic import EmailStr
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api import deps
+from app.db.session import get_db
+from app.models.user import User
+from app.schemas.availability import AvailabilityRequest
+from app.services.availability import availability_finder
+
+router = APIRouter()
+
+@router.post("/common-slots")
+async def find_common_slots(
+    request: AvailabilityRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    "Trouve un créneau pour nous tous" : plages libres communes à l'utilisateur connecté
+    et aux participants qui lui partagent leurs disponibilités, en respectant le fuseau
+    et la nuit de chacun. Seuls les créneaux sont renvoyés, jamais le détail des agendas.
+    Participants sans partage -> `unknown` ; agenda illisible -> `unavailable`.
+    """
+    return await availability_finder.find(current_user, request, db)
+
+@router.get("/shares")
+async def read_shares(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    return await availability_finder.shares(current_user, db)
+
+@router.put("/shares/{email}")
+async def share_availability(
+    email: EmailStr,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """Autorise `email` à voir mes disponibilités (libre / occupé) dans ses recherches de créneaux."""
+    await availability_finder.share(current_user, str(email), db)
+    return {"status": "shared"}
+
+@router.delete("/shares/{email}")
+async def unshare_availability(
+    email: EmailStr,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    await availability_finder.unshare(current_user, str(email), db)
+    return {"status": "revoked"}
@@ -1,20 +1,19 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from typing import Any, List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, Header
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.api import deps  # Notre fichier de sécurité
 from app.db.session import get_db
 from app.models.user import User
 from app.services.calendar_service import calendar_service
 from app.schemas.ai import ScheduledItem
-from typing import List
-from app.schemas.ai import ScheduledItem
 
 router = APIRouter()
 
 @router.get("/events")
 async def read_events(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user) # <--- SÉCURITÉ ICI
 ) -> List[Any]:
     """
@@ -26,16 +25,44 @@ async def read_events(
 @router.post("/sync")
 async def sync_calendar(
     tasks: List[ScheduledItem], # On reçoit la liste validée par l'user
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user)
 ):
-    """Prend les tâches validées et les pousse dans Google"""
-    count = 0
-    for item in tasks:
-        # On ne ré-écrit pas les événements qui viennent déjà de Google !
-        if item.type == 'task': 
-            # On convertit l'objet Pydantic en dict pour le service
-            await calendar_service.create_event(current_user.id, item.dict(), db)
-            count += 1
-    
-    return {"status": "success", "created": count}
+    """Prend les tâches validées et les pousse dans Google (en parallèle)"""
+    # On ne ré-écrit pas les événements qui viennent déjà de Google !
+    # On convertit les objets Pydantic en dict pour le service
+    to_create = [item.dict() for item in tasks if item.type == 'task']
+    results = await calendar_service.create_events_bulk(current_user.id, to_create, db)
+
+    created = sum(1 for r in results if r["status"] == "created")
+    failed = len(results) - created
+    retried = sum(1 for r in results if r["attempts"] > 1)
+    if not failed:
+        status = "success"
+    elif created:
+        status = "partial"
+    else:
+        status = "failed"
+
+    return {"status": status, "created": created, "failed": failed, "retried": retried, "items": results}
+
+@router.post("/webhook", include_in_schema=False)
+async def google_calendar_webhook(
+    x_goog_channel_id: str = Header(...),
+    x_goog_channel_token: Optional[str] = Header(None),
+    x_goog_resource_state: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Notifications push de Google (canal "watch") : le calendrier a changé.
+    On marque la copie locale comme périmée, la prochaine lecture fera la synchro incrémentale.
+    """
+    # "sync" est le message de confirmation envoyé à l'ouverture du canal
+    if x_goog_resource_state == "sync" or not x_goog_channel_token:
+        return {"status": "ignored"}
+    try:
+        user_id = UUID(x_goog_channel_token)
+    except ValueError:
+        return {"status": "ignored"}
+    marked = await calendar_service.mark_stale(user_id, x_goog_channel_id, db)
+    return {"status": "stale" if marked else "ignored"}
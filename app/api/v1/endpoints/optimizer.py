@@ -1,56 +1,173 @@
-from typing import List
-from fastapi import APIRouter, Depends, Body
-from celery.result import AsyncResult
-from sqlmodel import Session
+import json
+import uuid
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.api import deps
+from app.core.logs import get_logger
+from app.core.tracing import tracer
 from app.db.session import get_db
 from app.models.user import User
+from app.services.admission import admission, queue_for
+from app.services.ai_engine.optimizer import ai_optimizer
+from app.services.ai_engine.result_cache import schedule_cache
 from app.services.calendar_service import calendar_service
+from app.services.inflight_requests import INFLIGHT_HEADER, inflight_requests
+from app.services.optimizer import deterministic_scheduler
+from app.services.plan_precompute import plan_precompute
+from app.services.task_events import poll_url, task_events, task_status
+from app.services.task_payloads import task_payloads
 from app.schemas.ai import OptimizationRequest
 from app.workers.ai_task import optimize_schedule_task
 
 router = APIRouter()
+log = get_logger("api")
 
 @router.post("/optimize/start")
 async def optimize_day(
     request: OptimizationRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
 ):
-    print(f"📥 Reçu de Flutter: {len(request.tasks)} tâches à optimiser")
     """
     Endpoint Magique : Reçoit des tâches -> Lit le Calendrier -> Renvoie le planning parfait.
     """
+    log.info("optimize.received", "Demande d'optimisation", tasks=len(request.tasks), engine=request.engine)
+
     # 1. Récupérer les événements réels (Google)
     # On force la récupération (même si ça prend du temps)
     try:
-        google_events = await calendar_service.get_upcoming_events(user_id=current_user.id, db=db)
+        google_events = await calendar_service.get_upcoming_events(
+            user_id=current_user.id, db=db, user_timezone=request.user_timezone
+        )
     except Exception:
         google_events = [] # Si pas de Google, on optimise sur une page blanche
 
-    # 2. Lancer l'IA
-    tasks_for_ai = [t.dict() for t in request.tasks]
-    # Note: En production, cela devrait être une tâche d'arrière-plan (Celery)
-    task = optimize_schedule_task.delay(
-        google_events=google_events,
-        tasks_todo=tasks_for_ai,
-        user_timezone=request.user_timezone
+    # 2a. Solveur déterministe : quelques millisecondes, on répond directement (sans Celery)
+    if request.engine == "deterministic":
+        schedule = deterministic_scheduler.schedule(
+            current_events=google_events,
+            tasks_todo=request.tasks,
+            user_timezone=request.user_timezone
+        )
+        return {"task_id": None, "status": "completed", "result": [item.dict() for item in schedule]}
+
+    # Dernière demande IA de l'utilisateur : sert au pré-calcul de son planning la nuit prochaine
+    await plan_precompute.remember(current_user.id, request)
+
+    # 2b. Planning calculé cette nuit, toujours valable (même agenda, mêmes tâches) ? (sans Celery)
+    if not request.bypass_cache:
+        precomputed = await plan_precompute.get_plan(current_user.id, google_events, request)
+        if precomputed is not None:
+            return {"task_id": None, "status": "completed", "precomputed": True, "result": [item.dict() for item in precomputed]}
+
+    # 2c. Même demande que tout à l'heure ? On renvoie le planning déjà calculé (sans Celery)
+    if not request.bypass_cache:
+        cached = await ai_optimizer.cached_schedule(
+            google_events, request.tasks, request.user_timezone, request.engine
+        )
+        if cached is not None:
+            return {"task_id": None, "status": "completed", "cached": True, "result": [item.dict() for item in cached]}
+
+    # 2d. Même demande encore en cours (double tap, retry client) ? On renvoie sa tâche (sans Celery)
+    task_id = str(uuid.uuid4())
+    inflight_key, running_id = await inflight_requests.claim(
+        current_user.id, google_events, request, task_id, optimize_schedule_task.time_limit, idempotency_key
     )
+    if running_id is not None:
+        return {"task_id": running_id, "status": "processing", "coalesced": True}
+
+    try:
+        # 2e. Lancer l'IA. Admission seulement ici : cache, pré-calcul et doublons ne coûtent pas de jeton
+        # (débit par utilisateur et par offre, 429 + Retry-After au-delà ; délestage si la file déborde)
+        tier = await admission.admit(current_user)
+        await admission.check_backlog(tier)
+        # Gros arguments (agenda surtout) déposés une fois dans Redis : seule leur clé passe par le broker
+        events_for_ai = await task_payloads.put(google_events)
+        tasks_for_ai = await task_payloads.put([t.dict() for t in request.tasks])
+        # Entrée du registre libérée par le worker en fin de tâche (une Idempotency-Key reste valable)
+        headers = {INFLIGHT_HEADER: inflight_key} if inflight_key and not idempotency_key else None
+        # Span parent du span de la tâche côté worker (contexte propagé dans les en-têtes Celery)
+        with tracer.start_as_current_span("optimize.enqueue") as span:
+            task = optimize_schedule_task.apply_async(
+                kwargs=dict(
+                    google_events=events_for_ai,
+                    tasks_todo=tasks_for_ai,
+                    user_timezone=request.user_timezone,
+                    engine=request.engine,
+                    use_cache=False,  # cache déjà consulté ci-dessus ; le worker y écrira le résultat
+                    stream=request.stream
+                ),
+                task_id=task_id,  # déjà enregistré pour les demandes identiques qui suivront
+                headers=headers,
+                queue=queue_for(tier),  # file de l'offre : les payants ne passent jamais derrière le gratuit
+            )
+            span.set_attribute("celery.task_id", task.id)
+    except BaseException:
+        # 429 de délestage, broker indisponible... : les demandes suivantes ne doivent pas attendre une tâche fantôme
+        if inflight_key:
+            await inflight_requests.release(inflight_key, task_id)
+        raise
+    log.info("optimize.enqueued", "Tâche IA envoyée au worker", task_id=task.id)
 
     # On retourne juste l'ID du ticket
     return {"task_id": task.id, "status": "processing"}
 
-# 2. Endpoint pour VÉRIFIER le statut
+# Métriques du cache des plannings IA (taux de hit, temps de calcul évité)
+@router.get("/optimize/cache/stats")
+async def get_cache_stats(current_user: User = Depends(deps.get_current_user)):
+    return await schedule_cache.stats()
+
+# 2. Endpoint pour VÉRIFIER le statut (polling, toujours disponible en repli)
 @router.get("/optimize/status/{task_id}")
 async def get_optimization_status(task_id: str):
-    task_result = AsyncResult(task_id)
-    
-    if task_result.state == 'PENDING':
-        return {"status": "processing"}
-    elif task_result.state == 'SUCCESS':
-        return {"status": "completed", "result": task_result.result}
-    elif task_result.state == 'FAILURE':
-        return {"status": "failed", "error": str(task_result.result)}
-    
-    return {"status": task_result.state}
\ No newline at end of file
+    return task_status(task_id)
+
+# 3. Même chose en push : le serveur prévient quand c'est prêt (Server-Sent Events)
+@router.get("/optimize/events/{task_id}")
+async def stream_optimization_status(task_id: str):
+    if not task_events.try_acquire():
+        return _busy_response(task_id)
+
+    async def events():
+        try:
+            async for payload in task_events.follow(task_id):
+                if payload is None:
+                    yield ": ping\n\n"  # garde la connexion ouverte (proxies, mobile)
+                else:
+                    yield f"event: status\ndata: {json.dumps(payload, default=str)}\n\n"
+        finally:
+            task_events.release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# 4. Variante WebSocket (mêmes messages JSON que le SSE)
+@router.websocket("/optimize/ws/{task_id}")
+async def websocket_optimization_status(websocket: WebSocket, task_id: str):
+    await websocket.accept()
+    if not task_events.try_acquire():
+        await websocket.send_json({"status": "fallback", "poll": poll_url(task_id)})
+        await websocket.close(code=1013)  # "Try Again Later"
+        return
+    try:
+        async for payload in task_events.follow(task_id):
+            if payload is not None:
+                await websocket.send_json(payload)
+        await websocket.close()
+    finally:
+        task_events.release()
+
+def _busy_response(task_id: str) -> JSONResponse:
+    """Trop de connexions ouvertes sur ce process : le client repasse au polling."""
+    return JSONResponse(
+        status_code=503,
+        content={"status": "fallback", "poll": poll_url(task_id)},
+        headers={"Retry-After": "2"},
+    )
@@ -0,0 +1,33 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api import deps
+from app.db.session import get_db
+from app.models.user import User
+from app.schemas.planning import PlannedTask, ReplanRequest
+from app.services.replanner import incremental_planner
+
+router = APIRouter()
+
+@router.get("")
+async def read_plan(
+    user_timezone: str = "UTC",
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> List[PlannedTask]:
+    """Planning persistant de l'utilisateur : créneaux à venir, puis les tâches sans place."""
+    return await incremental_planner.get_plan(current_user.id, db, user_timezone)
+
+@router.post("/replan")
+async def replan(
+    diff: ReplanRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Applique un diff (tâches ajoutées / supprimées / déplacées, changements d'agenda).
+    Seules les tâches touchées sont replacées, le reste du planning ne bouge pas.
+    Synchrone (quelques ms) : ni Celery ni LLM.
+    """
+    return await incremental_planner.replan(current_user.id, diff, db)
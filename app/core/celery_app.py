@@ -1,16 +1,63 @@
 from celery import Celery
-import os
+from celery.schedules import crontab
+from kombu import Queue
+from app.core.config import settings
+from app.core.serialization import RESULT_SERIALIZER
 
-# On lit l'URL Redis depuis l'env ou on met une valeur par défaut pour Docker
-redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
+# URL Redis lue depuis l'env (valeur par défaut pour Docker dans la config)
+redis_url = settings.REDIS_URL
 
 celery_app = Celery(
     "kairos_worker",
     broker=redis_url,
     backend=redis_url,
-    include=['app.workers.ai_task']
+    include=['app.workers.ai_task', 'app.workers.precompute_task']
 )
 
-#celery_app.conf.task_routes = {
-#   "app.workers.ai_task.optimize_schedule_task": "main-queue"
-#}
\ No newline at end of file
+# Signaux de télémétrie (en-têtes de traçage à l'envoi, métriques et logs côté worker) :
+# importés ici pour être actifs dans l'API comme dans le worker
+import app.workers.telemetry  # noqa: E402,F401
+
+# Résultats compacts (msgpack, zlib au-delà d'un seuil) et effacés après CELERY_RESULT_EXPIRES_SECONDS
+# (défaut Celery : 1 jour). Les résultats JSON d'un ancien worker restent lisibles (repli dans
+# serialization.unpack) ; les messages du broker restent en JSON.
+celery_app.conf.result_serializer = settings.CELERY_RESULT_SERIALIZER
+celery_app.conf.result_accept_content = ["json", RESULT_SERIALIZER]
+celery_app.conf.result_expires = settings.CELERY_RESULT_EXPIRES_SECONDS
+
+# Pré-calcul nocturne : un petit lot toutes les PRECOMPUTE_TICK_MINUTES, sur toute la fenêtre creuse
+# (lancer aussi `celery -A app.core.celery_app beat`)
+celery_app.conf.timezone = "UTC"
+celery_app.conf.beat_schedule = {
+    "precompute-next-day-plans": {
+        "task": "app.workers.precompute_task.dispatch_precomputations",
+        "schedule": crontab(
+            minute=f"*/{settings.PRECOMPUTE_TICK_MINUTES}",
+            hour=",".join(
+                str((settings.PRECOMPUTE_WINDOW_START_HOUR + i) % 24) for i in range(settings.PRECOMPUTE_WINDOW_HOURS)
+            ),
+        ),
+    },
+}
+
+# Une file par offre pour les optimisations IA (choisie à l'envoi, voir services/admission.py) ;
+# le reste (pré-calcul nocturne) sur la file par défaut. En production, des workers dédiés :
+#   celery worker -Q optimize-founder,optimize-pro   (offres payantes, jamais derrière le gratuit)
+#   celery worker -Q optimize-free,celery
+# Sans -Q, un worker consomme toutes les files (développement).
+celery_app.conf.task_default_queue = "celery"
+celery_app.conf.task_queues = [Queue("celery"), *(Queue(name) for name in settings.OPTIMIZE_QUEUES.values())]
+celery_app.conf.task_routes = {
+    "app.workers.ai_task.optimize_schedule_task": {"queue": settings.OPTIMIZE_QUEUES["FREE"]},
+}
+# Prefetch : réglable par worker (--prefetch-multiplier), donc par groupe de files
+celery_app.conf.worker_prefetch_multiplier = settings.CELERY_PREFETCH_MULTIPLIER
+
+# Mode asynchrone (défauts de -P / -c, toujours surchargeables en ligne de commande).
+# Contre-pression : avec prefetch 1 et acks_late, le process ne réserve jamais plus de
+# WORKER_MAX_IN_FLIGHT messages ; le reste attend dans Redis, disponible pour les autres workers.
+if settings.WORKER_ASYNC_MODE:
+    celery_app.conf.worker_pool = "threads"
+    celery_app.conf.worker_concurrency = settings.WORKER_MAX_IN_FLIGHT
+# Un worker sur plusieurs files les vide dans l'ordre donné à -Q (founder avant pro)
+celery_app.conf.broker_transport_options = {"queue_order_strategy": "priority"}
\ No newline at end of file
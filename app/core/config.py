@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic import PostgresDsn, field_validator, ValidationInfo
 from pydantic_settings import BaseSettings
 
@@ -16,11 +16,165 @@ class Settings(BaseSettings):
     # URL de connexion complète (sera construite automatiquement)
     DATABASE_URL: Optional[str] = None
 
+    # "production" coupe les logs SQL et masque les paramètres des requêtes dans les erreurs
+    ENVIRONMENT: str = "development"
+
+    # Pool de connexions (moteur asynchrone asyncpg)
+    DB_ECHO: bool = False  # log de chaque requête SQL (debug uniquement)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Cache de requêtes préparées par connexion (0 si on passe par pgbouncer en mode transaction)
+    DB_STATEMENT_CACHE_SIZE: int = 500
+
+    # Redis (broker Celery + caches partagés)
+    REDIS_URL: str = "redis://redis:6379/0"
+
     # Google OAuth
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
     # Gemini key
     GOOGLE_API_KEY: str
+    GEMINI_BASE_URL: Optional[str] = None  # autre point d'accès Gemini (proxy, faux serveur des tests de charge)
+
+    # Endpoints Google (surchargeables pour pointer vers un faux serveur en benchmark)
+    GOOGLE_TOKEN_URL: str = "https://oauth2.googleapis.com/token"
+    GOOGLE_CALENDAR_API_URL: str = "https://www.googleapis.com/calendar/v3"
+
+    # Renouvellement des tokens OAuth Google (un seul refresh à la fois par utilisateur)
+    GOOGLE_TOKEN_REFRESH_SKEW_SECONDS: int = 300  # on renouvelle avant l'expiration, pas après le 401
+    GOOGLE_TOKEN_REFRESH_LOCK_TIMEOUT_SECONDS: float = 15.0  # durée de vie max du verrou Redis
+    GOOGLE_TOKEN_REFRESH_WAIT_SECONDS: float = 10.0  # attente max du refresh d'un autre process
+
+    # Client HTTP partagé vers Google (pool de connexions keep-alive)
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # secondes
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 15.0
+    HTTP_POOL_TIMEOUT: float = 5.0
+
+    # Synchro incrémentale Google Calendar (copie locale + syncToken)
+    CALENDAR_SYNC_MAX_AGE_SECONDS: int = 60  # fraîcheur max de la copie locale
+    CALENDAR_SYNC_MAX_AGE_WATCHED_SECONDS: int = 900  # idem quand un canal push est actif
+    CALENDAR_SYNC_LOOKBACK_DAYS: int = 1  # la synchro complète démarre un peu avant "maintenant"
+    CALENDAR_SYNC_HORIZON_DAYS: int = 30  # ... et s'arrête là (timeMax) ; > horizon du planning
+    CALENDAR_SYNC_PAGE_SIZE: int = 1000  # maxResults (Google : 2500 max)
+    CALENDAR_SYNC_LOCK_TIMEOUT_SECONDS: float = 120.0  # durée de vie max du verrou Redis de synchro
+    CALENDAR_SYNC_LOCK_WAIT_SECONDS: float = 30.0  # attente max de la synchro d'un autre process
+    CALENDAR_UPCOMING_LIMIT: int = 50  # GET /calendar/events (sans fenêtre de planning)
+    CALENDAR_WINDOW_MAX_EVENTS: int = 2000  # garde-fou sur la fenêtre envoyée à l'optimiseur
+    GOOGLE_CALENDAR_WATCH_ENABLED: bool = False  # nécessite un BASE_URL public en HTTPS
+
+    # Création en masse d'événements (POST /calendar/sync)
+    GOOGLE_BULK_CONCURRENCY: int = 8  # requêtes simultanées max vers Google par synchro
+    GOOGLE_BULK_MAX_ATTEMPTS: int = 4  # tentatives par événement (429 / 5xx / réseau)
+    GOOGLE_BULK_BACKOFF_SECONDS: float = 0.5
+    GOOGLE_BULK_MAX_BACKOFF_SECONDS: float = 8.0
+
+    # Cache d'identité utilisateur (deps.get_current_user)
+    USER_CACHE_TTL_SECONDS: int = 30  # niveau local (LRU en mémoire, par process)
+    USER_CACHE_MAX_ENTRIES: int = 10000
+    USER_CACHE_REDIS_ENABLED: bool = False  # niveau partagé entre process / conteneurs
+    USER_CACHE_REDIS_TTL_SECONDS: int = 300
+    TOKEN_CACHE_TTL_SECONDS: int = 300  # JWT déjà vérifiés (borné par leur expiration)
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+
+    # Modèles Gemini et politique d'appel (statistiques par modèle gardées dans chaque process worker)
+    LLM_MODEL: str = "gemini-2.5-flash-lite"  # modèle principal
+    LLM_FAST_MODEL: str = "gemini-2.0-flash-lite"  # petites demandes ("" = toujours le principal)
+    LLM_FALLBACK_MODELS: List[str] = ["gemini-2.5-flash"]  # essayés ensuite si le modèle échoue ou répond mal
+    LLM_FAST_MAX_TASKS: int = 3  # jusqu'à N tâches et LLM_FAST_MAX_PROMPT_TOKENS : modèle rapide
+    LLM_FAST_MAX_PROMPT_TOKENS: int = 1500
+    LLM_DETERMINISTIC_MAX_TASKS: int = 1  # jusqu'à N tâches : solveur seul, sans appel (0 = jamais)
+    LLM_DEADLINE_SECONDS: float = 45.0  # au-delà, planning du solveur plutôt qu'attendre le time_limit Celery
+    LLM_HEDGE_ENABLED: bool = True  # 2e appel si le 1er dépasse le p95 du modèle
+    LLM_HEDGE_MIN_DELAY_MS: int = 1000
+    LLM_HEDGE_DEFAULT_DELAY_MS: int = 10000  # tant que le p95 du modèle n'est pas connu
+    LLM_STATS_WINDOW: int = 200  # derniers appels gardés par modèle
+    LLM_STATS_MIN_SAMPLES: int = 20  # en dessous, p95 et taux de succès ne sont pas utilisés
+    LLM_STATS_MAX_AGE_SECONDS: int = 300  # appels plus anciens oubliés : un modèle écarté est réessayé ensuite
+    LLM_MIN_SUCCESS_RATE: float = 0.5  # en dessous, le modèle passe en fin de chaîne
+
+    # Cache des plannings IA (Redis, adressé par le contenu de la demande)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 3600
+    LLM_CACHE_MAX_ENTRIES: int = 10000
+    LLM_CACHE_NOW_BUCKET_SECONDS: int = 300  # "maintenant" arrondi : un planning reste valable ~5 min
+
+    # Taille des prompts envoyés à Gemini (latence et facture dépendent des tokens en entrée)
+    LLM_PROMPT_TOKEN_BUDGET: int = 4000  # au-delà, le temps occupé le plus lointain est retiré
+    LLM_CHARS_PER_TOKEN: float = 4.0  # estimation locale (pas d'appel au tokenizer Gemini)
+
+    # Micro-batching (worker) : les demandes de plusieurs utilisateurs dans un seul appel à Gemini.
+    # N'a d'effet que si un process traite plusieurs tâches à la fois (ex: celery worker -P threads -c 16).
+    LLM_BATCH_ENABLED: bool = False
+    LLM_BATCH_MAX_WAIT_MS: int = 200  # latence ajoutée au pire à la première demande d'un lot
+    LLM_BATCH_MAX_SIZE: int = 8  # le lot part dès qu'il est plein
+
+    # Notifications de fin d'optimisation poussées (SSE / WebSocket) au lieu du polling
+    TASK_EVENTS_MAX_CONNECTIONS: int = 1000  # par process API ; au-delà, retour au polling
+    TASK_EVENTS_TIMEOUT_SECONDS: int = 300  # au-delà, le client repasse au polling
+    TASK_EVENTS_HEARTBEAT_SECONDS: int = 15
+
+    # Messages et résultats Celery (mémoire Redis du broker et du backend)
+    TASK_PAYLOAD_BY_REFERENCE: bool = True  # gros arguments stockés une fois dans Redis, seule la clé passe par le broker
+    TASK_PAYLOAD_MIN_BYTES: int = 2048  # en dessous, l'argument reste dans le message
+    TASK_PAYLOAD_TTL_SECONDS: int = 3600  # doit couvrir l'attente dans la file
+    CELERY_RESULT_SERIALIZER: str = "kairos-msgpack"  # "json" pour revenir au format Celery par défaut
+    CELERY_RESULT_COMPRESSION_MIN_BYTES: int = 1024  # résultats compressés (zlib) au-delà ; 0 = jamais
+    CELERY_RESULT_EXPIRES_SECONDS: int = 3600  # un résultat non relu est effacé du backend (Celery : 1 jour)
+    CELERY_PREFETCH_MULTIPLIER: int = 1  # tâches longues (LLM) : pas de réserve bloquée chez un worker occupé
+    # Mode asynchrone du worker : un seul process, des threads légers qui attendent chacun leur
+    # optimisation sur la boucle asyncio partagée (au lieu d'un process prefork par tâche en vol)
+    WORKER_ASYNC_MODE: bool = False
+    WORKER_MAX_IN_FLIGHT: int = 64  # optimisations simultanées par process (= messages réservés, prefetch 1)
+
+    # Admission à /optimize/start selon l'abonnement : une file Celery par offre (workers dédiés),
+    # seaux à jetons Redis par utilisateur et par offre, délestage quand la file déborde
+    OPTIMIZE_ADMISSION_ENABLED: bool = True
+    OPTIMIZE_QUEUES: Dict[str, str] = {"FOUNDER": "optimize-founder", "PRO": "optimize-pro", "FREE": "optimize-free"}
+    OPTIMIZE_USER_RATE_PER_MINUTE: Dict[str, float] = {"FOUNDER": 20, "PRO": 10, "FREE": 3}
+    OPTIMIZE_USER_BURST: Dict[str, int] = {"FOUNDER": 10, "PRO": 5, "FREE": 2}
+    OPTIMIZE_TIER_RATE_PER_MINUTE: Dict[str, float] = {"FOUNDER": 0, "PRO": 0, "FREE": 300}  # 0 = pas de plafond
+    OPTIMIZE_TIER_BURST: Dict[str, int] = {"FOUNDER": 0, "PRO": 0, "FREE": 50}
+    OPTIMIZE_QUEUE_MAX_DEPTH: Dict[str, int] = {"FOUNDER": 5000, "PRO": 2000, "FREE": 300}
+    OPTIMIZE_SHED_RETRY_AFTER_SECONDS: int = 15
+    # Demandes identiques encore en cours (double tap, retry) : on renvoie le task_id existant
+    OPTIMIZE_COALESCING_ENABLED: bool = True
+    OPTIMIZE_COALESCE_QUEUE_GRACE_SECONDS: int = 600  # attente max en file, ajoutée au time_limit pour le TTL
+
+    # Planning persistant (tâches et créneaux en base) et re-planification incrémentale
+    PLAN_HORIZON_DAYS: int = 28  # <= CALENDAR_SYNC_HORIZON_DAYS (agenda connu localement)
+
+    # Créneaux communs à plusieurs personnes (bitmaps NumPy du temps occupé)
+    AVAILABILITY_RESOLUTION_MINUTES: int = 15  # 5 ou 15 (doit diviser 60)
+    AVAILABILITY_MAX_PARTICIPANTS: int = 500
+    AVAILABILITY_MAX_RESULTS: int = 10
+    AVAILABILITY_CORE_START_HOUR: int = 9  # heures "confortables" (locales) : critère de classement
+    AVAILABILITY_CORE_END_HOUR: int = 18
+    AVAILABILITY_FETCH_CONCURRENCY: int = 10  # agendas chargés en parallèle (une session DB chacun)
+
+    # Pré-calcul nocturne des plannings du lendemain (Celery beat, fenêtre creuse en UTC)
+    PRECOMPUTE_ENABLED: bool = True
+    PRECOMPUTE_WINDOW_START_HOUR: int = 1
+    PRECOMPUTE_WINDOW_HOURS: int = 4
+    PRECOMPUTE_TICK_MINUTES: int = 5  # un petit lot toutes les 5 min : pas de pic sur les quotas
+    PRECOMPUTE_MAX_PER_TICK: int = 60  # plafond global par lot (quotas Google / Gemini)
+    PRECOMPUTE_TIER_PER_TICK: Dict[str, int] = {"FOUNDER": 30, "PRO": 20, "FREE": 10}  # ordre = priorité
+    PRECOMPUTE_ACTIVE_DAYS: int = 7  # utilisateur "actif" = a demandé une optimisation IA récemment
+    PRECOMPUTE_PLAN_TTL_HOURS: int = 36
+    PRECOMPUTE_RATE_LIMIT: str = "20/m"  # par worker, filet de sécurité en plus des lots
+
+    # Observabilité : logs structurés (échantillonnés), métriques Prometheus
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" (production) ou "text" (lecture humaine)
+    LOG_SAMPLE_RATE: float = 1.0  # part des logs debug / info conservés (warnings et erreurs : toujours)
+    METRICS_ENABLED: bool = True  # GET /metrics côté API, exporteur HTTP côté worker
+    METRICS_WORKER_PORT: int = 9100  # 0 = pas d'exporteur worker
 
     @field_validator("DATABASE_URL", mode="before")
     @classmethod
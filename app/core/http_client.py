@@ -0,0 +1,38 @@
+import httpx
+
+from app.core.config import settings
+
+
+def _http2_available() -> bool:
+    # HTTP/2 nécessite le paquet optionnel 'h2' (httpx[http2])
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_http_client(**overrides) -> httpx.AsyncClient:
+    """
+    Crée le client HTTP longue durée utilisé pour parler à Google.
+    Un seul client par process : les connexions TLS sont réutilisées (keep-alive)
+    au lieu de refaire un handshake à chaque appel.
+    """
+    options = dict(
+        http2=settings.HTTP2_ENABLED and _http2_available(),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+            read=settings.HTTP_READ_TIMEOUT,
+            write=settings.HTTP_READ_TIMEOUT,
+            pool=settings.HTTP_POOL_TIMEOUT,
+        ),
+        # Google ne compresse la réponse que si le User-Agent contient "gzip"
+        headers={"Accept-Encoding": "gzip", "User-Agent": f"{settings.PROJECT_NAME} (gzip)"},
+    )
+    options.update(overrides)
+    return httpx.AsyncClient(**options)
@@ -0,0 +1,102 @@
+import json
+import logging
+import random
+import sys
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Dict
+
+from app.core.config import settings
+
+# Corrélation ajoutée à chaque ligne : request_id (API), task_id (Celery), trace_id (span courant)
+_context: ContextVar[Dict[str, Any]] = ContextVar("kairos_log_context", default={})
+
+
+def bind_context(**fields) -> Token:
+    """Ajoute des champs de corrélation pour la suite du traitement (à annuler avec reset_context)."""
+    return _context.set({**_context.get(), **{key: value for key, value in fields.items() if value is not None}})
+
+
+def reset_context(token: Token) -> None:
+    _context.reset(token)
+
+
+def current_context() -> Dict[str, Any]:
+    return _context.get()
+
+
+class StructuredLogger:
+    """
+    Logs structurés : un événement (identifiant stable), un message court et des champs.
+
+    Rien n'est formaté si le niveau est désactivé ; les niveaux debug / info sont en plus
+    échantillonnés (LOG_SAMPLE_RATE) pour les chemins chauds. Les warnings et erreurs ne
+    sont jamais échantillonnés. Les champs sont passés tels quels : pas de f-string à l'appel.
+    """
+
+    __slots__ = ("_logger",)
+
+    def __init__(self, name: str):
+        self._logger = logging.getLogger(f"kairos.{name}")
+
+    def _log(self, level: int, event: str, msg: str, fields: dict, sampled: bool) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        if sampled and settings.LOG_SAMPLE_RATE < 1.0 and random.random() >= settings.LOG_SAMPLE_RATE:
+            return
+        self._logger.log(level, msg, extra={"event": event, "fields": fields})
+
+    def debug(self, event: str, msg: str = "", **fields) -> None:
+        self._log(logging.DEBUG, event, msg, fields, sampled=True)
+
+    def info(self, event: str, msg: str = "", **fields) -> None:
+        self._log(logging.INFO, event, msg, fields, sampled=True)
+
+    def warning(self, event: str, msg: str = "", **fields) -> None:
+        self._log(logging.WARNING, event, msg, fields, sampled=False)
+
+    def error(self, event: str, msg: str = "", **fields) -> None:
+        self._log(logging.ERROR, event, msg, fields, sampled=False)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(name)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "msg": record.getMessage(),
+            **current_context(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            line["exc"] = self.formatException(record.exc_info)
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Lecture humaine en développement : `HH:MM:SS niveau événement message clé=valeur...`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {**current_context(), **getattr(record, "fields", {})}
+        extras = " ".join(f"{key}={value}" for key, value in fields.items())
+        stamp = time.strftime("%H:%M:%S", time.localtime(record.created))
+        return f"{stamp} {record.levelname:<7} {getattr(record, 'event', record.name)} {record.getMessage()} {extras}".rstrip()
+
+
+def configure_logging() -> None:
+    """Au démarrage de l'API et de chaque process worker (idempotent)."""
+    logger = logging.getLogger("kairos")
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.propagate = False
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        logger.addHandler(handler)
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
+    for handler in logger.handlers:
+        handler.setFormatter(formatter)
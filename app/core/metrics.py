@@ -0,0 +1,107 @@
+import os
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+from app.core.config import settings
+
+# Mode multi-process : chaque métrique ouvre son fichier dès sa définition (import du module),
+# le dossier doit donc exister avant, pas seulement au démarrage de l'exporteur
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Latences réseau / LLM : de quelques ms à la minute
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Calcul local (prompt, parsing) : sous la milliseconde en général
+CPU_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+# --- GOOGLE ---
+GOOGLE_REQUEST_SECONDS = Histogram(
+    "kairos_google_request_seconds", "Appels à l'API Google Calendar (401 rejoué compris)",
+    ["operation", "status"], buckets=LATENCY_BUCKETS,
+)
+GOOGLE_UNAUTHORIZED_RETRIES = Counter(
+    "kairos_google_unauthorized_retries_total", "Appels Google rejoués après un 401 (token révoqué ou expiré)",
+)
+TOKEN_REFRESH_SECONDS = Histogram(
+    "kairos_google_token_refresh_seconds", "Renouvellements de token OAuth (_count = nombre de refresh)",
+    ["outcome"], buckets=LATENCY_BUCKETS,
+)
+
+# --- IA ---
+PROMPT_BUILD_SECONDS = Histogram(
+    "kairos_llm_prompt_build_seconds", "Construction du prompt (encodage compact + budget de tokens)",
+    buckets=CPU_BUCKETS,
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "kairos_llm_request_seconds", "Appels à Gemini", ["mode"], buckets=LATENCY_BUCKETS,
+)
+LLM_PARSE_SECONDS = Histogram(
+    "kairos_llm_parse_seconds", "Parsing de la réponse de Gemini", ["mode"], buckets=CPU_BUCKETS,
+)
+LLM_PARSE_FAILURES = Counter(
+    "kairos_llm_parse_failures_total", "Réponses de Gemini illisibles", ["mode"],
+)
+LLM_ATTEMPTS = Counter(
+    "kairos_llm_attempts_total", "Appels à Gemini par modèle (ok, error, unparsable)", ["model", "outcome"],
+)
+LLM_HEDGED_REQUESTS = Counter(
+    "kairos_llm_hedged_requests_total", "2e appel lancé après le p95 du modèle", ["model"],
+)
+LLM_SOLVER_FALLBACKS = Counter(
+    "kairos_llm_solver_fallbacks_total", "Plannings du solveur à la place de l'IA", ["reason"],
+)
+
+# --- ADMISSION ---
+ADMISSION_REJECTIONS = Counter(
+    "kairos_admission_rejections_total", "Demandes d'optimisation refusées (429)", ["tier", "reason"],
+)
+
+# --- REGROUPEMENT DES DEMANDES ---
+OPTIMIZE_COALESCED = Counter(
+    "kairos_optimize_coalesced_total", "Demandes d'optimisation servies par une tâche déjà en cours", ["reason"],
+)
+
+# --- CELERY ---
+CELERY_QUEUE_WAIT_SECONDS = Histogram(
+    "kairos_celery_queue_wait_seconds", "Attente dans la file (envoi -> début d'exécution)",
+    ["task"], buckets=LATENCY_BUCKETS,
+)
+CELERY_EXECUTION_SECONDS = Histogram(
+    "kairos_celery_execution_seconds", "Durée d'exécution des tâches", ["task", "state"], buckets=LATENCY_BUCKETS,
+)
+
+
+def _registry() -> CollectorRegistry:
+    """Worker prefork : chaque process écrit dans PROMETHEUS_MULTIPROC_DIR, on agrège à la lecture."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Contenu de GET /metrics (format texte Prometheus)."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_worker_exporter() -> None:
+    """Exporteur HTTP du worker (process principal Celery), sur METRICS_WORKER_PORT."""
+    if settings.METRICS_ENABLED and settings.METRICS_WORKER_PORT:
+        start_http_server(settings.METRICS_WORKER_PORT, registry=_registry())
+
+
+def mark_process_dead(pid: int) -> None:
+    """Fin d'un process prefork : ses jauges "live" ne doivent plus être agrégées."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
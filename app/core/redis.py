@@ -0,0 +1,29 @@
+import asyncio
+import weakref
+from redis.asyncio import Redis
+from app.core.config import settings
+
+# Un client par boucle d'événements : le pool de connexions redis.asyncio y est lié
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Redis]" = weakref.WeakKeyDictionary()
+
+
+def get_redis() -> Redis:
+    """Client Redis asynchrone partagé (API et workers)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=2,
+            socket_connect_timeout=2,
+            health_check_interval=30,
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_redis():
+    """Ferme le client de la boucle courante (arrêt de l'application)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,47 @@
+import json
+import zlib
+
+import msgpack
+from kombu.serialization import register
+
+from app.core.config import settings
+
+# Sérialiseur des résultats Celery : msgpack (plus compact que JSON, pas d'échappement des accents),
+# compressé en zlib au-delà de CELERY_RESULT_COMPRESSION_MIN_BYTES. Un octet d'en-tête indique
+# si le contenu est compressé : un seul format, lisible quel que soit le réglage du producteur.
+# Le backend Redis décode chaque résultat avec le sérialiseur configuré (pas avec celui de l'écriture) :
+# un résultat sans en-tête est un ancien résultat JSON (worker pas encore mis à jour), relu tel quel.
+RESULT_SERIALIZER = "kairos-msgpack"
+RESULT_CONTENT_TYPE = "application/x-kairos-msgpack"
+
+_RAW = b"\x00"
+_ZLIB = b"\x01"
+
+
+def packb(value) -> bytes:
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def frame(raw: bytes, compress_min_bytes: int) -> bytes:
+    """msgpack brut -> format stocké (compressé au-delà de `compress_min_bytes`, 0 = jamais)."""
+    if compress_min_bytes and len(raw) >= compress_min_bytes:
+        return _ZLIB + zlib.compress(raw)
+    return _RAW + raw
+
+
+def pack(value) -> bytes:
+    return frame(packb(value), settings.CELERY_RESULT_COMPRESSION_MIN_BYTES)
+
+
+def unpack(data: bytes):
+    if isinstance(data, str):
+        data = data.encode("latin-1")
+    header, body = data[:1], data[1:]
+    if header == _ZLIB:
+        body = zlib.decompress(body)
+    elif header != _RAW:
+        return json.loads(data)  # '{', '[', '"'... : JSON (format Celery par défaut)
+    return msgpack.unpackb(body, raw=False)
+
+
+register(RESULT_SERIALIZER, pack, unpack, content_type=RESULT_CONTENT_TYPE, content_encoding="binary")
@@ -0,0 +1,28 @@
+from typing import Optional
+
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+
+# API OpenTelemetry seule : sans SDK configuré (ex: `opentelemetry-instrument`), les spans sont
+# des no-op et ne coûtent rien. Avec un SDK, ils partent vers l'exporteur choisi (OTLP, Jaeger...).
+tracer = trace.get_tracer("kairos")
+
+# En-tête Celery (et attribut de `task.request`) portant le contexte du span côté API
+TRACE_HEADER = "traceparent"
+
+
+def inject_trace_headers(headers: dict) -> None:
+    """Contexte du span courant dans les en-têtes d'un message Celery (W3C traceparent)."""
+    propagate.inject(headers)
+
+
+def extract_trace_context(traceparent: Optional[str]) -> Optional[Context]:
+    if not traceparent:
+        return None
+    return propagate.extract({TRACE_HEADER: traceparent})
+
+
+def current_trace_id() -> Optional[str]:
+    """trace_id du span courant (pour les logs), None si le traçage est désactivé."""
+    span_context = trace.get_current_span().get_span_context()
+    return format(span_context.trace_id, "032x") if span_context.is_valid else None
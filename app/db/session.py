@@ -1,14 +1,48 @@
-from sqlmodel import create_engine, Session
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
 
-# Création du moteur de connexion
-# echo=True permet de voir les requêtes SQL dans le terminal (utile pour le debug)
-engine = create_engine(settings.DATABASE_URL, echo=True)
 
-def get_db():
+def _async_database_url(url: str):
+    """postgresql://... -> postgresql+asyncpg://... (avec le cache de requêtes préparées)"""
+    parsed = make_url(url)
+    if parsed.drivername in ("postgresql", "postgresql+psycopg2"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    if parsed.drivername == "postgresql+asyncpg":
+        parsed = parsed.update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+        )
+    return parsed
+
+
+_url = _async_database_url(settings.DATABASE_URL)
+_is_production = settings.ENVIRONMENT == "production"
+
+# Création du moteur de connexion (asynchrone : ne bloque jamais la boucle d'événements)
+# DB_ECHO=True permet de voir les requêtes SQL dans le terminal (utile pour le debug, jamais en prod)
+engine = create_async_engine(
+    _url,
+    echo=settings.DB_ECHO and not _is_production,
+    hide_parameters=_is_production,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=(
+        {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+        if _url.drivername == "postgresql+asyncpg" else {}
+    ),
+)
+
+# expire_on_commit=False : les objets restent lisibles après commit sans nouvel aller-retour SQL
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+async def get_db():
     """
     Fonction de dépendance (Dependency Injection).
     Crée une session DB pour une requête, et la ferme après.
     """
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+    async with SessionLocal() as session:
+        yield session
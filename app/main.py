@@ -1,11 +1,17 @@
+import uuid
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from sqlmodel import SQLModel
 
 from app.core.config import settings
+from app.core.logs import bind_context, configure_logging, get_logger, reset_context
+from app.core.metrics import render_metrics
+from app.core.tracing import current_trace_id, tracer
 from app.db.session import engine
+from app.core.redis import close_redis
+from app.services.calendar_service import calendar_service
 
 # IMPORTANT : On doit importer les modèles ici pour que SQLModel les "voie"
 # et puisse créer les tables au démarrage.
@@ -13,8 +19,16 @@ from app.models.user import User
 
 from app.api.v1.endpoints import auth
 from app.models.oauth import OAuthCredential
+from app.models.calendar_event import CalendarEvent, CalendarSyncState
 from app.api.v1.endpoints import calendar
 from app.api.v1.endpoints import optimizer
+from app.models.task import Task, ScheduledSlot
+from app.api.v1.endpoints import planning
+from app.models.availability_share import AvailabilityShare
+from app.api.v1.endpoints import availability
+
+configure_logging()
+log = get_logger("api")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -22,12 +36,17 @@ async def lifespan(app: FastAPI):
     Fonction exécutée au démarrage (avant le yield) 
     et à l'arrêt (après le yield) de l'application.
     """
-    print("🚀 Démarrage de Kairos API...")
-    print("🛠️ Vérification des tables de base de données...")
-    SQLModel.metadata.create_all(engine)
-    print("✅ Tables synchronisées.")
+    log.info("api.startup", "Démarrage de Kairos API")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    log.info("api.tables_ready", "Tables synchronisées")
+    # Client HTTP partagé vers Google (une seule instance, connexions réutilisées)
+    calendar_service.open()
     yield
-    print("🛑 Arrêt de Kairos API.")
+    await calendar_service.aclose()
+    await close_redis()
+    await engine.dispose()
+    log.info("api.shutdown", "Arrêt de Kairos API")
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -50,14 +69,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Corrélation : chaque requête a un request_id (repris du client ou généré), présent dans
+# tous ses logs, renvoyé dans X-Request-ID et transmis aux tâches Celery qu'elle lance
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    with tracer.start_as_current_span(f"{request.method} {request.url.path}") as span:
+        span.set_attribute("kairos.request_id", request_id)
+        token = bind_context(request_id=request_id, trace_id=current_trace_id())
+        try:
+            response = await call_next(request)
+        finally:
+            reset_context(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Inclusion des routes
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(calendar.router, prefix="/api/v1/calendar", tags=["Calendar"])
 app.include_router(optimizer.router, prefix="/api/v1/ai", tags=["AI Optimization"]) 
+app.include_router(planning.router, prefix="/api/v1/plan", tags=["Planning"])
+app.include_router(availability.router, prefix="/api/v1/availability", tags=["Availability"])
 @app.get("/")
 def read_root():
     return {"status": "online", "message": "Kairos API is running with DB connection 🚀"}
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+# Scrape Prometheus (hors documentation OpenAPI)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
\ No newline at end of file
@@ -0,0 +1,15 @@
+from datetime import datetime, timezone
+from uuid import UUID
+from sqlalchemy import DateTime
+from sqlmodel import Field, SQLModel
+
+
+class AvailabilityShare(SQLModel, table=True):
+    """`owner` partage ses disponibilités (libre / occupé, jamais le détail) avec `viewer`."""
+    __tablename__ = "availability_shares"
+
+    owner_id: UUID = Field(foreign_key="users.id", primary_key=True)
+    viewer_id: UUID = Field(foreign_key="users.id", primary_key=True, index=True)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), sa_type=DateTime(timezone=True)
+    )
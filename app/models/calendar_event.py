@@ -0,0 +1,43 @@
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import DateTime, Index
+from sqlmodel import Field, SQLModel, AutoString
+
+class CalendarEvent(SQLModel, table=True):
+    """Copie locale des événements Google d'un utilisateur (alimentée par la synchro incrémentale)."""
+    __tablename__ = "calendar_events"
+    __table_args__ = (
+        # Lecture type "prochains événements de l'utilisateur" : (user_id, start_at)
+        Index("ix_calendar_events_user_start", "user_id", "start_at"),
+    )
+
+    user_id: UUID = Field(foreign_key="users.id", primary_key=True)
+    event_id: str = Field(primary_key=True, sa_type=AutoString)
+
+    title: str = Field(default="Sans titre", sa_type=AutoString)
+    # Valeurs Google brutes (dateTime ISO 8601 ou date "YYYY-MM-DD" pour la journée entière)
+    start: str = Field(sa_type=AutoString)
+    end: str = Field(sa_type=AutoString)
+
+    # Les mêmes bornes, normalisées en UTC, pour les requêtes indexées
+    start_at: datetime = Field(sa_type=DateTime(timezone=True))
+    end_at: datetime = Field(sa_type=DateTime(timezone=True))
+
+
+class CalendarSyncState(SQLModel, table=True):
+    """État de la synchronisation Google Calendar d'un utilisateur (syncToken, fraîcheur, canal push)."""
+    __tablename__ = "calendar_sync_states"
+
+    user_id: UUID = Field(foreign_key="users.id", primary_key=True)
+
+    sync_token: str | None = Field(default=None, sa_type=AutoString)
+    last_synced_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
+    # Fin de la période couverte par la dernière synchro complète (timeMax) ; au-delà, on resynchronise
+    synced_until: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
+    # Passe à True quand Google nous notifie d'un changement (canal "watch")
+    is_stale: bool = Field(default=False)
+
+    # Canal de notifications push (optionnel)
+    channel_id: str | None = Field(default=None, sa_type=AutoString)
+    channel_resource_id: str | None = Field(default=None, sa_type=AutoString)
+    channel_expires_at: datetime | None = Field(default=None, sa_type=DateTime(timezone=True))
@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID, uuid4
+from sqlalchemy import DateTime, Index
+from sqlmodel import Field, SQLModel, AutoString
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Task(SQLModel, table=True):
+    """Tâche à planifier d'un utilisateur (persistée : le mobile n'envoie plus que les changements)."""
+    __tablename__ = "tasks"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    user_id: UUID = Field(foreign_key="users.id", index=True)
+
+    title: str = Field(sa_type=AutoString)
+    duration: int  # minutes
+    priority: int = Field(default=2)  # 1=low, 2=medium, 3=high
+    preferred_time: Optional[str] = Field(default=None, sa_type=AutoString)  # heure locale ("14:00")
+
+    created_at: datetime = Field(default_factory=_utcnow, sa_type=DateTime(timezone=True))
+    updated_at: datetime = Field(default_factory=_utcnow, sa_type=DateTime(timezone=True))
+
+
+class ScheduledSlot(SQLModel, table=True):
+    """Créneau d'une tâche dans le planning courant (au plus un par tâche ; absent = non placée)."""
+    __tablename__ = "scheduled_slots"
+    __table_args__ = (
+        # Lecture type "planning de l'utilisateur à partir de maintenant" : (user_id, start_at)
+        Index("ix_scheduled_slots_user_start", "user_id", "start_at"),
+    )
+
+    task_id: UUID = Field(foreign_key="tasks.id", primary_key=True)
+    user_id: UUID = Field(foreign_key="users.id")
+
+    start_at: datetime = Field(sa_type=DateTime(timezone=True))
+    end_at: datetime = Field(sa_type=DateTime(timezone=True))
+    # Placé par l'utilisateur : jamais déplacé par une re-planification
+    pinned: bool = Field(default=False)
+    reasoning: Optional[str] = Field(default=None, sa_type=AutoString)
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
 # Ce que le mobile envoie pour demander une optimisation
@@ -11,6 +11,14 @@ class TaskRequest(BaseModel):
 class OptimizationRequest(BaseModel):
     tasks: List[TaskRequest]
     user_timezone: str = "UTC"
+    # "deterministic" = solveur seul (instantané, sans Celery)
+    # "llm" = Gemini fait tout
+    # "hybrid" = le solveur place les tâches, Gemini rédige seulement le 'reasoning'
+    engine: Literal["deterministic", "llm", "hybrid"] = "llm"
+    # True = ignore le cache des plannings et force un nouveau calcul
+    bypass_cache: bool = False
+    # True = les créneaux arrivent au fil de l'eau (statut "processing" + "partial", en SSE ou polling)
+    stream: bool = False
 
 # Ce que l'IA renvoie (un créneau planifié)
 class ScheduledItem(BaseModel):
@@ -22,4 +30,20 @@ class ScheduledItem(BaseModel):
 
 # Le modèle qui encapsule la liste de sortie de l'IA
 class OptimizedSchedule(BaseModel):
-    schedule: List[ScheduledItem]
\ No newline at end of file
+    schedule: List[ScheduledItem]
+
+# Micro-batching : les plannings de plusieurs demandes (utilisateurs) dans une seule réponse
+class BatchedSchedule(BaseModel):
+    id: int  # Numéro de la demande dans le lot envoyé à l'IA
+    schedule: List[ScheduledItem]
+
+class BatchedSchedules(BaseModel):
+    schedules: List[BatchedSchedule]
+
+# Mode hybride : l'IA ne fait qu'expliquer le placement calculé par le solveur
+class TaskExplanation(BaseModel):
+    index: int  # Position de la tâche dans la liste envoyée à l'IA
+    reasoning: str
+
+class ScheduleExplanation(BaseModel):
+    explanations: List[TaskExplanation]
\ No newline at end of file
@@ -0,0 +1,23 @@
+from typing import List
+from pydantic import BaseModel, EmailStr, Field
+
+# Une personne invitée (compte Kairos) et son fuseau
+class Participant(BaseModel):
+    email: EmailStr
+    timezone: str = "UTC"
+
+# "Trouve un créneau pour nous tous" : l'utilisateur connecté est toujours inclus,
+# les participants seulement s'ils partagent leurs disponibilités avec lui
+class AvailabilityRequest(BaseModel):
+    participants: List[Participant]
+    user_timezone: str = "UTC"  # fuseau de l'organisateur (et des créneaux renvoyés)
+    duration: int = Field(gt=0)  # minutes
+    horizon_days: int = Field(7, ge=1)  # borné par PLAN_HORIZON_DAYS
+
+# Un créneau commun proposé, dans la plage libre (window_*) qui le contient
+class CommonSlot(BaseModel):
+    start: str  # ISO 8601, fuseau de l'organisateur
+    end: str
+    window_start: str
+    window_end: str
+    comfort: float  # part des participants dans leurs heures "confortables" (AVAILABILITY_CORE_*)
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel
+
+from app.schemas.ai import TaskRequest
+
+# L'utilisateur a déplacé une tâche à la main : le nouveau créneau est épinglé
+class TaskMove(BaseModel):
+    task_id: UUID
+    start: datetime  # sans fuseau = heure locale de l'utilisateur
+
+# Changement d'agenda connu du mobile avant la prochaine synchro Google
+class CalendarChange(BaseModel):
+    event_id: str
+    title: str = "Sans titre"
+    start: Optional[str] = None  # ISO 8601 (comme Google)
+    end: Optional[str] = None
+    deleted: bool = False
+
+# Diff appliqué au planning persistant : seules les tâches touchées sont replacées
+class ReplanRequest(BaseModel):
+    user_timezone: str = "UTC"
+    added: List[TaskRequest] = []
+    removed: List[UUID] = []
+    moved: List[TaskMove] = []
+    calendar: List[CalendarChange] = []
+
+# Une tâche du planning et son créneau (start/end à None : pas de place dans l'horizon)
+class PlannedTask(BaseModel):
+    task_id: UUID
+    title: str
+    duration: int
+    priority: int
+    preferred_time: Optional[str] = None
+    start: Optional[str] = None  # ISO 8601, fuseau de l'utilisateur
+    end: Optional[str] = None
+    pinned: bool = False
+    reasoning: Optional[str] = None
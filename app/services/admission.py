@@ -0,0 +1,128 @@
+import math
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.metrics import ADMISSION_REJECTIONS
+from app.core.redis import get_redis
+from app.models.user import User
+
+log = get_logger("admission")
+
+KEY_PREFIX = "kairos:admission"
+DEFAULT_TIER = "FREE"
+
+# Deux seaux à jetons (utilisateur, offre) vérifiés et débités ensemble, de façon atomique :
+# un refus du seau de l'offre ne consomme pas le jeton de l'utilisateur. Horloge = celle de Redis
+# (identique pour tous les process API). Retour : {0, 0} accepté, {1|2, attente_ms} refusé.
+TOKEN_BUCKETS_LUA = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local state = {}
+for i = 1, 2 do
+    local rate, burst = tonumber(ARGV[2 * i - 1]), tonumber(ARGV[2 * i])
+    if rate > 0 and burst > 0 then
+        local saved = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+        local tokens = tonumber(saved[1]) or burst
+        local ts = tonumber(saved[2]) or now
+        tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+        if tokens < 1 then
+            return {i, math.ceil((1 - tokens) / rate * 1000)}
+        end
+        state[i] = {tokens - 1, math.ceil(burst / rate)}
+    end
+end
+for i = 1, 2 do
+    if state[i] then
+        redis.call('HSET', KEYS[i], 'tokens', state[i][1], 'ts', now)
+        redis.call('EXPIRE', KEYS[i], state[i][2] + 1)
+    end
+end
+return {0, 0}
+"""
+
+REASONS = {1: "user_rate", 2: "tier_rate"}
+
+
+def user_tier(user: User) -> str:
+    tier = (user.subscription_tier or DEFAULT_TIER).upper()
+    return tier if tier in settings.OPTIMIZE_QUEUES else DEFAULT_TIER
+
+
+def queue_for(tier: str) -> str:
+    """File Celery de l'offre (consommée par des workers dédiés, voir docker-compose)."""
+    return settings.OPTIMIZE_QUEUES.get(tier, settings.OPTIMIZE_QUEUES[DEFAULT_TIER])
+
+
+class AdmissionControl:
+    """
+    Admission des demandes d'optimisation IA.
+
+    - seau à jetons par utilisateur (débit et rafale selon l'offre) ;
+    - seau à jetons partagé par offre (ex: plafond global du gratuit) ;
+    - délestage : file Celery de l'offre trop profonde -> 429 tout de suite plutôt qu'une
+      attente de plusieurs minutes.
+    Redis indisponible : on laisse passer (l'admission ne doit pas couper le service).
+    """
+
+    def __init__(self):
+        self._script = None
+
+    async def admit(self, user: User) -> str:
+        """Débite les seaux de l'utilisateur et de son offre ; renvoie l'offre, ou lève un 429."""
+        tier = user_tier(user)
+        if not settings.OPTIMIZE_ADMISSION_ENABLED:
+            return tier
+        redis = get_redis()
+        if self._script is None:
+            # Enregistré une fois (EVALSHA ensuite, rechargé si Redis l'a oublié) ; client de la boucle courante
+            self._script = redis.register_script(TOKEN_BUCKETS_LUA)
+        try:
+            code, wait_ms = await self._script(
+                keys=[f"{KEY_PREFIX}:user:{user.id}", f"{KEY_PREFIX}:tier:{tier}"],
+                args=[
+                    settings.OPTIMIZE_USER_RATE_PER_MINUTE.get(tier, 0) / 60,
+                    settings.OPTIMIZE_USER_BURST.get(tier, 0),
+                    settings.OPTIMIZE_TIER_RATE_PER_MINUTE.get(tier, 0) / 60,
+                    settings.OPTIMIZE_TIER_BURST.get(tier, 0),
+                ],
+                client=redis,
+            )
+        except RedisError as e:
+            log.warning("admission.unavailable", "Seaux à jetons indisponibles, demande acceptée", error=str(e))
+            return tier
+        if code:
+            self._reject(tier, REASONS[int(code)], math.ceil(int(wait_ms) / 1000))
+        return tier
+
+    async def check_backlog(self, tier: str) -> None:
+        """Délestage : 429 si la file de l'offre dépasse OPTIMIZE_QUEUE_MAX_DEPTH."""
+        if not settings.OPTIMIZE_ADMISSION_ENABLED:
+            return
+        limit = settings.OPTIMIZE_QUEUE_MAX_DEPTH.get(tier, 0)
+        if not limit:
+            return
+        try:
+            # Transport Redis de Celery : la file est une liste au nom de la queue
+            depth = await get_redis().llen(queue_for(tier))
+        except RedisError as e:
+            log.warning("admission.unavailable", "Profondeur de file inconnue, demande acceptée", error=str(e))
+            return
+        if depth >= limit:
+            self._reject(tier, "overloaded", settings.OPTIMIZE_SHED_RETRY_AFTER_SECONDS, depth=depth)
+
+    @staticmethod
+    def _reject(tier: str, reason: str, retry_after: int, **fields) -> None:
+        retry_after = max(1, retry_after)
+        ADMISSION_REJECTIONS.labels(tier=tier, reason=reason).inc()
+        log.info("admission.rejected", "Demande refusée", tier=tier, reason=reason, retry_after=retry_after, **fields)
+        raise HTTPException(
+            status_code=429,
+            detail={"reason": reason, "retry_after": retry_after},
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+admission = AdmissionControl()
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar, Union
+
+from app.core.config import settings
+from app.core.logs import get_logger
+
+log = get_logger("ai")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Reçoit le lot de demandes, renvoie un résultat par demande (dans le même ordre) ;
+# une exception à la place d'un résultat n'échoue que la demande concernée.
+RunBatch = Callable[[List[T]], Awaitable[List[Union[R, BaseException]]]]
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Regroupe les demandes qui arrivent presque en même temps dans un seul appel.
+
+    La première demande d'un lot déclenche un minuteur (LLM_BATCH_MAX_WAIT_MS) ; le lot part
+    à l'échéance, ou tout de suite s'il atteint LLM_BATCH_MAX_SIZE. Chaque appelant attend
+    uniquement son propre résultat. Lié à la boucle d'événements qui l'utilise (celle du worker).
+    """
+
+    def __init__(self, run_batch: RunBatch, name: str = "lot"):
+        self._run_batch = run_batch
+        self._name = name
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.counts = Counter()  # batches, requests, full (lots partis pleins)
+
+    async def submit(self, payload: T) -> R:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Nouvelle boucle : l'état précédent (minuteur, futures) ne lui appartient pas
+            self._pending, self._timer, self._running = [], None, set()
+            self._loop = loop
+
+        future = loop.create_future()
+        self._pending.append((payload, future))
+        if len(self._pending) >= settings.LLM_BATCH_MAX_SIZE:
+            self.counts["full"] += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(settings.LLM_BATCH_MAX_WAIT_MS / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        # Appelant annulé pendant l'attente (timeout Celery...) : inutile de l'envoyer
+        batch = [(payload, future) for payload, future in batch if not future.done()]
+        if not batch:
+            return
+        task = self._loop.create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        self.counts.update(batches=1, requests=len(batch))
+        started = time.perf_counter()
+        try:
+            results = await self._run_batch([payload for payload, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        log.info(
+            "llm.batch", "Lot traité",
+            name=self._name, size=len(batch), duration_ms=round((time.perf_counter() - started) * 1000),
+        )
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        batches = self.counts["batches"]
+        return {
+            "batches": batches,
+            "requests": self.counts["requests"],
+            "full_batches": self.counts["full"],
+            "mean_batch_size": round(self.counts["requests"] / batches, 2) if batches else None,
+        }
@@ -0,0 +1,117 @@
+import math
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.ai_engine.prompt_encoding import EncodedPrompt
+
+
+class LLMUnavailable(RuntimeError):
+    """Aucun modèle n'a répondu correctement avant l'échéance de la demande."""
+
+
+class ModelStats:
+    """
+    Latence et succès des derniers appels, par modèle (fenêtre glissante, en mémoire du process).
+
+    Un échec compte aussi les réponses illisibles ; un appel annulé (hedge perdant,
+    échéance) n'est pas compté. Les appels de plus de LLM_STATS_MAX_AGE_SECONDS sont oubliés :
+    un modèle passé en fin de chaîne n'est plus appelé, ses statistiques ne bougeraient plus
+    et il ne reviendrait jamais devant. Sans échantillons récents, il est de nouveau essayé en premier.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, Deque[Tuple[float, float, bool]]] = defaultdict(self._window)
+
+    @staticmethod
+    def _window() -> Deque[Tuple[float, float, bool]]:
+        return deque(maxlen=settings.LLM_STATS_WINDOW)
+
+    def record(self, model: str, seconds: float, ok: bool) -> None:
+        self._calls[model].append((time.monotonic(), seconds, ok))
+
+    def _recent(self, model: str) -> List[Tuple[float, bool]]:
+        """(durée, succès) des appels encore dans la fenêtre de temps ; les plus anciens sont retirés."""
+        calls = self._calls.get(model)
+        if not calls:
+            return []
+        oldest = time.monotonic() - settings.LLM_STATS_MAX_AGE_SECONDS
+        while calls and calls[0][0] < oldest:
+            calls.popleft()
+        return [(seconds, ok) for _, seconds, ok in calls]
+
+    def p95(self, model: str) -> Optional[float]:
+        """p95 des appels réussis (secondes), None tant qu'il y a trop peu d'échantillons."""
+        latencies = sorted(seconds for seconds, ok in self._recent(model) if ok)
+        if len(latencies) < settings.LLM_STATS_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)]
+
+    def success_rate(self, model: str) -> Optional[float]:
+        calls = self._recent(model)
+        if len(calls) < settings.LLM_STATS_MIN_SAMPLES:
+            return None
+        return sum(ok for _, ok in calls) / len(calls)
+
+    def reset(self) -> None:
+        self._calls.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            model: {
+                "calls": len(self._recent(model)),
+                "success_rate": self.success_rate(model),
+                "p95_ms": round(self.p95(model) * 1000) if self.p95(model) is not None else None,
+            }
+            for model in list(self._calls)
+        }
+
+
+class ModelPolicy:
+    """
+    Choix du modèle pour une demande, à partir de sa taille et des statistiques du process.
+
+    - tiering : petite demande -> solveur seul (LLM_DETERMINISTIC_MAX_TASKS) ou modèle rapide ;
+    - chaîne de repli : modèle choisi, puis le principal et LLM_FALLBACK_MODELS ;
+    - santé : un modèle qui échoue trop (LLM_MIN_SUCCESS_RATE) ou dont le p95 dépasse
+      l'échéance passe en fin de chaîne ;
+    - hedging : 2e appel au même modèle après son p95.
+    """
+
+    def __init__(self, stats: ModelStats):
+        self.stats = stats
+
+    @staticmethod
+    def use_solver(task_count: int) -> bool:
+        return task_count <= settings.LLM_DETERMINISTIC_MAX_TASKS
+
+    def chain(self, encoded: EncodedPrompt) -> List[str]:
+        small = (
+            encoded.task_count <= settings.LLM_FAST_MAX_TASKS
+            and encoded.estimated_tokens <= settings.LLM_FAST_MAX_PROMPT_TOKENS
+        )
+        ordered = [settings.LLM_FAST_MODEL] if small and settings.LLM_FAST_MODEL else []
+        ordered += [settings.LLM_MODEL, *settings.LLM_FALLBACK_MODELS]
+        models = list(dict.fromkeys(ordered))  # sans doublons, ordre conservé
+        # Tri stable : les modèles sains gardent leur ordre, les autres passent derrière
+        return sorted(models, key=lambda model: not self.healthy(model))
+
+    def healthy(self, model: str) -> bool:
+        rate = self.stats.success_rate(model)
+        p95 = self.stats.p95(model)
+        if rate is not None and rate < settings.LLM_MIN_SUCCESS_RATE:
+            return False
+        return p95 is None or p95 < settings.LLM_DEADLINE_SECONDS
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Attente (secondes) avant le 2e appel ; None = pas de hedging."""
+        if not settings.LLM_HEDGE_ENABLED:
+            return None
+        p95 = self.stats.p95(model)
+        delay_ms = settings.LLM_HEDGE_DEFAULT_DELAY_MS if p95 is None else p95 * 1000
+        return max(delay_ms, settings.LLM_HEDGE_MIN_DELAY_MS) / 1000
+
+
+model_stats = ModelStats()
+model_policy = ModelPolicy(model_stats)
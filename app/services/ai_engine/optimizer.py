@@ -1,105 +1,568 @@
+import asyncio
 import json
+import time
+from collections import Counter
 from datetime import datetime
-from zoneinfo import ZoneInfo
-from typing import List
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import PromptTemplate
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.runnables import Runnable
 from app.core.config import settings
-from app.schemas.ai import ScheduledItem, TaskRequest, OptimizedSchedule
+from app.core.logs import get_logger
+from app.core.metrics import (
+    LLM_ATTEMPTS,
+    LLM_HEDGED_REQUESTS,
+    LLM_PARSE_FAILURES,
+    LLM_PARSE_SECONDS,
+    LLM_REQUEST_SECONDS,
+    LLM_SOLVER_FALLBACKS,
+    PROMPT_BUILD_SECONDS,
+)
+from app.core.tracing import tracer
+from app.schemas.ai import ScheduledItem, TaskRequest, OptimizedSchedule, ScheduleExplanation, BatchedSchedules
+from app.services.optimizer import HORIZON_DAYS, deterministic_scheduler, resolve_timezone
+from app.services.schedule_validator import schedule_validator
+from app.services.ai_engine.batching import MicroBatcher
+from app.services.ai_engine.model_policy import LLMUnavailable, model_policy, model_stats
+from app.services.ai_engine.result_cache import schedule_cache
+from app.services.ai_engine.prompt_encoding import EncodedPrompt, encode_schedule_prompt, estimate_tokens
+from app.services.ai_engine.stream_parser import ScheduleStreamParser, StreamStats
+
+log = get_logger("ai")
+
+LLM_MODEL = settings.LLM_MODEL  # modèle principal (les autres : voir model_policy)
+# À incrémenter à chaque modification des prompts : invalide les plannings en cache
+PROMPT_VERSION = "2"
+
+# --- PROMPTS (construits une seule fois, à l'import) ---
+# Les parsers forcent Gemini à répondre en JSON strict compatible avec nos Schemas
+SCHEDULE_PARSER = PydanticOutputParser(pydantic_object=OptimizedSchedule)
+EXPLANATION_PARSER = PydanticOutputParser(pydantic_object=ScheduleExplanation)
+BATCH_SCHEDULE_PARSER = PydanticOutputParser(pydantic_object=BatchedSchedules)
+
+# LE PROMPT (L'instruction magique)
+# Encodage compact (voir prompt_encoding) : minutes relatives, temps occupé fusionné, clés courtes.
+# Les événements fixes ne sont pas redemandés en sortie : le validateur les remet dans le planning.
+SCHEDULE_TEMPLATE = """Tu es KAIROS, un assistant expert en gestion du temps.
+Insère les tâches dans l'agenda de l'utilisateur sans créer de conflit.
+
+CONTEXTE :
+- Fuseau horaire : {timezone}. Maintenant (minute 0) : {now}.
+- Toutes les positions sont en MINUTES à partir de maintenant. Horizon : {horizon} jours.
+- Occupé (événements fixes fusionnés, [début, fin]) : {busy}
+- Tâches (t=titre, d=durée en minutes, p=priorité 1 à 3, at=heure locale préférée) : {tasks}
+
+RÈGLES :
+1. Rien avant la minute 0, rien sur un créneau occupé, rien la nuit (23h-07h locale) sauf nécessité.
+2. 'at' est une heure LOCALE ({timezone}), pas de l'UTC :
+   - créneau libre -> la tâche commence EXACTEMENT à cette heure ;
+   - créneau occupé -> premier créneau libre juste après ;
+   - heure déjà passée -> prochain créneau disponible.
+3. Les autres tâches vont dans les trous restants, priorité haute d'abord.
+4. Une tâche qui ne rentre nulle part peut être omise.
+5. "reasoning" : une explication courte par tâche (ex: "Inséré après le déjeuner").
+
+SORTIE : UNIQUEMENT un objet JSON dont la clé "schedule" liste les TÂCHES placées (pas les événements fixes),
+chacune avec title, start et end (ISO8601 avec décalage horaire), type "task" et reasoning.
+
+{format_instructions}
+"""
+SCHEDULE_PROMPT = PromptTemplate(
+    template=SCHEDULE_TEMPLATE,
+    input_variables=["now", "timezone", "horizon", "busy", "tasks"],
+    # Le schéma JSON ne change jamais : on ne le recalcule pas à chaque appel
+    partial_variables={"format_instructions": SCHEDULE_PARSER.get_format_instructions()}
+)
+
+# Micro-batching : mêmes règles, un seul préambule pour plusieurs demandes indépendantes
+BATCH_SCHEDULE_TEMPLATE = """Tu es KAIROS, un assistant expert en gestion du temps.
+Tu reçois {count} demandes INDÉPENDANTES (utilisateurs différents). Pour chacune, insère ses tâches
+dans son agenda sans créer de conflit, sans jamais mélanger les demandes entre elles.
+
+CONTEXTE (propre à chaque demande) :
+- Fuseau horaire et "maintenant" (minute 0) de la demande.
+- Toutes les positions sont en MINUTES à partir de ce "maintenant". Horizon : {horizon} jours.
+- Occupé (événements fixes fusionnés, [début, fin]).
+- Tâches (t=titre, d=durée en minutes, p=priorité 1 à 3, at=heure locale préférée).
+
+RÈGLES (pour chaque demande) :
+1. Rien avant la minute 0, rien sur un créneau occupé, rien la nuit (23h-07h locale) sauf nécessité.
+2. 'at' est une heure LOCALE (fuseau de la demande), pas de l'UTC :
+   - créneau libre -> la tâche commence EXACTEMENT à cette heure ;
+   - créneau occupé -> premier créneau libre juste après ;
+   - heure déjà passée -> prochain créneau disponible.
+3. Les autres tâches vont dans les trous restants, priorité haute d'abord.
+4. Une tâche qui ne rentre nulle part peut être omise.
+5. "reasoning" : une explication courte par tâche (ex: "Inséré après le déjeuner").
+
+DEMANDES :
+{requests}
+
+SORTIE : UNIQUEMENT un objet JSON dont la clé "schedules" contient un élément par demande : "id" (numéro
+de la demande) et "schedule", la liste de ses TÂCHES placées (pas les événements fixes), chacune avec
+title, start et end (ISO8601 avec décalage horaire), type "task" et reasoning.
+
+{format_instructions}
+"""
+BATCH_SCHEDULE_PROMPT = PromptTemplate(
+    template=BATCH_SCHEDULE_TEMPLATE,
+    input_variables=["count", "horizon", "requests"],
+    partial_variables={"format_instructions": BATCH_SCHEDULE_PARSER.get_format_instructions()}
+)
+# Une demande du lot (mêmes variables que le prompt "planning" unitaire)
+BATCH_REQUEST_TEMPLATE = """### Demande {id} : fuseau {timezone}, maintenant {now}
+Occupé : {busy}
+Tâches : {tasks}"""
+
+EXPLANATION_TEMPLATE = """
+        Tu es KAIROS, un assistant expert en gestion du temps.
+        Un planning a déjà été calculé : tu ne dois RIEN déplacer, seulement expliquer.
+
+        Fuseau horaire de l'utilisateur : {timezone}
+        Agenda complet (événements fixes et tâches placées) : {schedule}
+        Tâches à expliquer (avec leur index) : {tasks}
+
+        Pour chaque tâche, écris une explication courte (une phrase) du choix du créneau
+        (ex: "Inséré après le déjeuner, avant la réunion d'équipe").
+
+        {format_instructions}
+        """
+
+EXPLANATION_PROMPT = PromptTemplate(
+    template=EXPLANATION_TEMPLATE,
+    input_variables=["timezone", "schedule", "tasks"],
+    partial_variables={"format_instructions": EXPLANATION_PARSER.get_format_instructions()}
+)
+
+
+# Appelé pour chaque créneau dès que Gemini l'a écrit (mode streaming)
+OnItem = Callable[[ScheduledItem], Awaitable[None]]
+
+
+class LLMChains(NamedTuple):
+    # prompt -> Gemini, sans parser : on garde le message (comptage des tokens) ou ses morceaux (astream)
+    schedule: Runnable
+    explanation: Runnable  # prompt -> Gemini -> ScheduleExplanation (mode hybride)
+    batch_schedule: Runnable  # prompt multi-demandes -> Gemini (micro-batching)
+
 
 class AIOptimizer:
-    def __init__(self):
-        # On ne fait plus d'initialisation coûteuse ou asynchrone ici.
-        pass
+    def __init__(self, llm: Union[BaseChatModel, Dict[str, BaseChatModel], None] = None):
+        # Rien de coûteux ici : le client LLM et les chaînes sont construits au premier usage
+        # (ou par warm_up() au démarrage d'un worker), puis réutilisés.
+        self._llm_override = llm  # modèle factice pour les benchmarks (un seul, ou un par nom de modèle)
+        self._chains: Optional[LLMChains] = None
+        self._model_chains: Dict[str, Runnable] = {}  # chaîne "planning" des autres modèles
+        self._chains_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stream_stats = StreamStats()
+        self.token_usage = Counter()  # cumul par process : requests, prompt_tokens, response_tokens
+        # Demandes de plusieurs utilisateurs regroupées en un appel (LLM_BATCH_ENABLED)
+        self.batcher: MicroBatcher[EncodedPrompt, List[ScheduledItem]] = MicroBatcher(self._schedule_batch)
 
-    async def optimize_schedule(self, current_events: List[dict], tasks_todo: List[TaskRequest], user_timezone: str = "UTC"):
-        try:
-            # On essaie d'utiliser le fuseau envoyé par le mobile
-            print(f"Zone Info = {user_timezone}")
-            user_tz = ZoneInfo(user_timezone)
-        except Exception:
-            print(f"⚠️ Fuseau inconnu '{user_timezone}', fallback sur UTC")
-            user_tz = ZoneInfo("UTC")
-            
-        now_local = datetime.now(user_tz).isoformat()
-        
-        # --- Initialisation "Lazy" du client et du parser ---
-        # On initialise le client LLM ici, à l'intérieur de la coroutine.
-        # Cela garantit qu'il est créé dans la même boucle d'événements que celle où il est utilisé.
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-lite", # Utilisons le modèle le plus récent et efficace
+    def _build_llm(self, model: str = LLM_MODEL) -> BaseChatModel:
+        if isinstance(self._llm_override, dict):
+            return self._llm_override[model]
+        if self._llm_override is not None:
+            return self._llm_override
+        return ChatGoogleGenerativeAI(
+            model=model,
             google_api_key=settings.GOOGLE_API_KEY,
             temperature=0.1,
             convert_system_message_to_human=True,
-            transport="rest"
+            transport="rest",
+            base_url=settings.GEMINI_BASE_URL
         )
-        # Le Parser force Gemini à répondre en JSON strict compatible avec notre Schema
-        parser = PydanticOutputParser(pydantic_object=OptimizedSchedule)
-
-        # LE PROMPT (L'instruction magique)
-        template = """
-        Tu es un assistant expert (ton nom est KAIROS) en gestion du temps (Time Management).
-        Ton objectif est d'insérer une liste de tâches dans un agenda existant sans créer de conflits.
-
-        CONTEXTE TEMPOREL :
-        - Fuseau horaire de l'utilisateur : {timezone}
-        - Heure actuelle de l'utilisateur : {now} (Ne planifie RIEN avant cette heure précise pour aujourd'hui).
-
-        DONNÉES D'ENTRÉE :
-        1. Agenda existant (ÉVÉNEMENTS FIXES) : {events}
-        2. Tâches à insérer (FLEXIBLES) : {tasks}
-        
-        RÈGLES D'OR :
-        1. CRITIQUE : Aucune tâche ne doit commencer dans le passé (avant l'heure actuelle).
-        2. RÈGLE IMPÉRATIVE POUR 'preferred_time' :
-           Si une tâche a une heure préférée (ex: "14:00") :
-           - CAS A : Le créneau de 14:00 est LIBRE ? -> Tu DOIS planifier la tâche à 14:00:00 précises. Pas 14:05, pas 13:55.
-           - NOTE IMPORTANTE : La valeur de 'preferred_time' est une heure locale dans le fuseau de l'utilisateur ({timezone}). Ne la traite PAS comme de l'UTC.
-           - CAS B : Le créneau est DÉJÀ PRIS par un événement ? -> Alors, et seulement alors, cherche le prochain créneau libre juste après.
-           - CAS C : L'heure préférée est DÉJÀ PASSÉE par rapport à l'heure actuelle ({now}) ? -> Planifie-la au prochain créneau disponible.
-        3. Tâches sans heure préférée :
-           - Insère-les intelligemment dans les créneaux libres restants.
-        4. Les événements 'google' sont fixes.
-
-        RÈGLES STRICTES :
-        1. Ne modifie jamais l'heure des événements fixes.
-        2. Trouve les trous (gaps) entre les événements fixes pour y insérer les tâches.
-        3. Si une tâche est trop longue pour un trou, tu peux ne pas la planifier (mais essaie de tout caser).
-        4. Ne planifie rien la nuit (entre 23h et 07h) sauf si nécessaire.
-        5. Ajoute une petite explication courte dans le champ "reasoning" pour chaque tâche ajoutée (ex: "Inséré après le déjeuner").
-
-        FORMAT DE SORTIE ATTENDU :
-        Tu dois répondre UNIQUEMENT avec un objet JSON. Cet objet doit contenir une clé "schedule" qui est une liste d'objets.
-        Chaque objet dans la liste "schedule" doit avoir : title, start (ISO8601), end (ISO8601), type ("event" ou "task"), reasoning.
-        Inclue les événements originaux ET les nouvelles tâches dans la liste "schedule" finale.
-        
-        {format_instructions}
+
+    # --- CHAÎNES LLM (une par process) ---
+    def warm_up(self) -> None:
+        """Construit le client et les chaînes d'avance (worker_process_init), hors du chemin critique."""
+        if self._chains is None:
+            self._chains = self._build_chains()
+            self._model_chains = {}
+            self._chains_loop = None  # liées à la première boucle qui les utilise
+
+    def _build_chains(self) -> LLMChains:
+        llm = self._build_llm()
+        return LLMChains(
+            schedule=SCHEDULE_PROMPT | llm,
+            explanation=EXPLANATION_PROMPT | llm | EXPLANATION_PARSER,
+            batch_schedule=BATCH_SCHEDULE_PROMPT | llm,
+        )
+
+    @property
+    def chains(self) -> LLMChains:
         """
+        Chaînes LLM ("planning", "explications"), construites une seule fois.
+        Le client Gemini garde des connexions liées à une boucle d'événements : si on est
+        appelé depuis une autre boucle (ex: asyncio.run() hors worker), on le reconstruit.
+        """
+        loop = asyncio.get_running_loop()
+        stale = self._chains_loop is not None and self._chains_loop is not loop
+        if self._chains is None or stale:
+            self._chains = self._build_chains()
+            self._model_chains = {}
+        self._chains_loop = loop
+        return self._chains
+
+    def _schedule_chain(self, model: str) -> Runnable:
+        """Chaîne "planning" d'un modèle de la chaîne de repli (construite au premier appel)."""
+        chains = self.chains
+        if model == LLM_MODEL:
+            return chains.schedule
+        chain = self._model_chains.get(model)
+        if chain is None:
+            chain = self._model_chains[model] = SCHEDULE_PROMPT | self._build_llm(model)
+        return chain
 
-        prompt = PromptTemplate(
-            template=template,
-            input_variables=["now", "events", "tasks", "timezone"],
-            partial_variables={"format_instructions": parser.get_format_instructions()}
+    # --- CACHE DES RÉSULTATS ---
+    def cache_key(self, current_events: List[dict], tasks_todo: list, user_timezone: str, engine: str) -> str:
+        return schedule_cache.key(
+            current_events, tasks_todo, user_timezone,
+            engine=engine, model=LLM_MODEL, prompt_version=PROMPT_VERSION,
         )
 
-        # Création de la chaîne
-        chain = prompt | llm | parser
-
-        # Exécution
-        print("🧠 IA : Préparation des données...")
-        
-        # On convertit simplement les listes de dictionnaires en texte JSON string
-        events_str = json.dumps(current_events, default=str)
-        tasks_str = json.dumps(tasks_todo, default=str)
-        print("🧠 IA : Réflexion en cours...")
-        result = await chain.ainvoke({
-            "now": now_local,
-            "timezone": user_timezone,
-            "events": events_str,
-            "tasks": tasks_str
-        })
-        print (f"✅ IA : Résultat reçu de Gemini.")
-        return result.schedule
+    async def cached_schedule(
+        self, current_events: List[dict], tasks_todo: list, user_timezone: str, engine: str
+    ) -> Optional[List[ScheduledItem]]:
+        """Planning déjà calculé pour exactement la même demande (None si absent)."""
+        return await schedule_cache.get(self.cache_key(current_events, tasks_todo, user_timezone, engine))
+
+    async def optimize_schedule(
+        self,
+        current_events: List[dict],
+        tasks_todo: List[TaskRequest],
+        user_timezone: str = "UTC",
+        engine: str = "llm",
+        use_cache: bool = True,
+        on_item: Optional[OnItem] = None,
+        now: Optional[datetime] = None,
+    ):
+        """
+        `on_item` active le streaming : chaque créneau est transmis dès qu'il est connu
+        (aperçu non validé ; le planning final, réparé, reste la valeur de retour).
+        `now` planifie à partir d'un autre instant que maintenant (pré-calcul du lendemain) ;
+        le cache des résultats, indexé sur l'heure courante, est alors ignoré.
+        """
+        # On essaie d'utiliser le fuseau envoyé par le mobile
+        log.debug("ai.optimize", "Optimisation demandée", timezone=user_timezone, engine=engine, tasks=len(tasks_todo))
+
+        if engine == "deterministic":
+            return deterministic_scheduler.schedule(current_events, tasks_todo, user_timezone, now=now)
+
+        # Les modes IA passent par le cache : même demande = pas de nouvel appel à Gemini.
+        # use_cache=False saute seulement la lecture ; le nouveau résultat est toujours stocké.
+        key = self.cache_key(current_events, tasks_todo, user_timezone, engine) if now is None else None
+        if use_cache and key is not None:
+            cached = await schedule_cache.get(key)
+            if cached is not None:
+                return cached
+
+        started = time.perf_counter()
+        if engine == "hybrid":
+            schedule = deterministic_scheduler.schedule(current_events, tasks_todo, user_timezone, now=now)
+            first_item_ms = None
+            if on_item is not None:
+                # Le placement du solveur est définitif : on peut le montrer avant les explications
+                for item in schedule:
+                    await on_item(item)
+                first_item_ms = (time.perf_counter() - started) * 1000
+            schedule, explained = await self._explain_schedule(schedule, user_timezone)
+            if on_item is not None:
+                self.stream_stats.record(first_item_ms, (time.perf_counter() - started) * 1000)
+            if not explained:
+                return schedule  # réponse dégradée : on ne la garde pas en cache
+        else:
+            schedule, complete = await self._generate_schedule(current_events, tasks_todo, user_timezone, on_item, now)
+            if not complete:
+                return schedule  # planning du solveur : on ne le garde pas dans le cache des plannings IA
+        if key is not None:
+            await schedule_cache.set(key, schedule, (time.perf_counter() - started) * 1000)
+        return schedule
+
+    async def _generate_schedule(
+        self,
+        current_events: List[dict],
+        tasks_todo: List[TaskRequest],
+        user_timezone: str,
+        on_item: Optional[OnItem] = None,
+        now: Optional[datetime] = None,
+    ) -> Tuple[List[ScheduledItem], bool]:
+        """
+        Mode "llm" : Gemini place toutes les tâches, le validateur répare sa réponse.
+        Petite demande, ou pas de réponse exploitable avant LLM_DEADLINE_SECONDS : le solveur
+        s'en charge et renvoie (planning, False), pour qu'il ne soit pas mis en cache comme un planning IA.
+        """
+        user_tz = resolve_timezone(user_timezone)
+        now = (now or datetime.now(user_tz)).astimezone(user_tz)
+
+        # Petite demande : le solveur suffit, pas d'appel à Gemini
+        if model_policy.use_solver(len(tasks_todo)):
+            LLM_SOLVER_FALLBACKS.labels(reason="small_request").inc()
+            return await self._solver_schedule(current_events, tasks_todo, user_timezone, now, on_item), False
+
+        # Encodage compact (minutes relatives, temps occupé fusionné), borné par le budget de tokens
+        with tracer.start_as_current_span("llm.prompt_build"), PROMPT_BUILD_SECONDS.time():
+            encoded = encode_schedule_prompt(
+                lambda inputs: SCHEDULE_PROMPT.format(**inputs), current_events, tasks_todo, user_timezone, now
+            )
+        deadline = asyncio.get_running_loop().time() + settings.LLM_DEADLINE_SECONDS
+        try:
+            if on_item is not None:
+                # Flux : modèle principal seul (les créneaux déjà montrés viennent de lui), borné par l'échéance
+                items, text, usage = await asyncio.wait_for(
+                    self._stream_schedule(encoded.inputs, on_item), settings.LLM_DEADLINE_SECONDS
+                )
+                self._record_tokens(encoded, text, usage)
+            elif settings.LLM_BATCH_ENABLED:
+                # Regroupée avec les demandes d'autres utilisateurs : un seul appel à Gemini pour le lot
+                items = await asyncio.wait_for(self.batcher.submit(encoded), settings.LLM_DEADLINE_SECONDS)
+            else:
+                items = await self._schedule_once(encoded, deadline)
+        except Exception as e:
+            reason = "deadline" if isinstance(e, asyncio.TimeoutError) else "unavailable"
+            LLM_SOLVER_FALLBACKS.labels(reason=reason).inc()
+            log.warning("llm.solver_fallback", "Pas de réponse exploitable de l'IA, planning du solveur", reason=reason, error=str(e))
+            return await self._solver_schedule(current_events, tasks_todo, user_timezone, now, on_item), False
+
+        # Le LLM n'est pas fiable à 100% : on vérifie et on répare (chevauchements, passé, nuit...)
+        schedule, _ = schedule_validator.repair(
+            items, current_events, tasks_todo, user_timezone, now=now
+        )
+        return schedule, True
+
+    @staticmethod
+    async def _solver_schedule(
+        current_events: List[dict], tasks_todo: List[TaskRequest], user_timezone: str, now: datetime,
+        on_item: Optional[OnItem],
+    ) -> List[ScheduledItem]:
+        schedule = deterministic_scheduler.schedule(current_events, tasks_todo, user_timezone, now=now)
+        if on_item is not None:
+            for item in schedule:
+                await on_item(item)
+        return schedule
+
+    # --- APPELS MESURÉS (latence Gemini, parsing, échecs) ---
+    @staticmethod
+    async def _invoke(chain: Runnable, inputs: dict, mode: str):
+        started = time.perf_counter()
+        with tracer.start_as_current_span(f"llm.{mode}"):
+            try:
+                return await chain.ainvoke(inputs)
+            finally:
+                LLM_REQUEST_SECONDS.labels(mode=mode).observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _parse(parser: PydanticOutputParser, text: str, mode: str):
+        started = time.perf_counter()
+        try:
+            return parser.parse(text)
+        except OutputParserException:
+            LLM_PARSE_FAILURES.labels(mode=mode).inc()
+            raise
+        finally:
+            LLM_PARSE_SECONDS.labels(mode=mode).observe(time.perf_counter() - started)
+
+    async def _schedule_once(self, encoded: EncodedPrompt, deadline: Optional[float] = None) -> List[ScheduledItem]:
+        """
+        Une seule demande, selon model_policy : modèles essayés dans l'ordre de la chaîne de
+        repli (erreur ou réponse illisible -> modèle suivant), chaque essai doublé s'il dépasse
+        le p95 du modèle. Lève LLMUnavailable si rien n'a abouti avant `deadline` (heure de la boucle).
+        """
+        loop = asyncio.get_running_loop()
+        if deadline is None:
+            deadline = loop.time() + settings.LLM_DEADLINE_SECONDS
+        errors = []
+        for model in model_policy.chain(encoded):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                return await asyncio.wait_for(self._hedged_call(model, encoded), remaining)
+            except asyncio.TimeoutError:
+                errors.append(f"{model}: échéance dépassée")
+                break
+            except Exception as e:
+                errors.append(f"{model}: {e}")
+                log.warning("llm.model_failed", "Modèle en échec, passage au suivant", model=model, error=str(e))
+        raise LLMUnavailable("; ".join(errors) or "échéance dépassée")
+
+    async def _hedged_call(self, model: str, encoded: EncodedPrompt) -> List[ScheduledItem]:
+        """Appel à `model` ; sans réponse après son p95, 2e appel identique : le premier qui aboutit gagne."""
+        calls = [asyncio.ensure_future(self._attempt(model, encoded))]
+        try:
+            delay = model_policy.hedge_delay(model)
+            done, _ = await asyncio.wait(calls, timeout=delay)
+            if not done:
+                LLM_HEDGED_REQUESTS.labels(model=model).inc()
+                log.info("llm.hedged", "Réponse lente, 2e appel lancé", model=model, delay_ms=round(delay * 1000))
+                calls.append(asyncio.ensure_future(self._attempt(model, encoded)))
+            pending = set(calls)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for call in done:
+                    if call.exception() is None:
+                        return call.result()
+                    error = call.exception()
+            raise error
+        finally:
+            for call in calls:
+                call.cancel()
+
+    async def _attempt(self, model: str, encoded: EncodedPrompt) -> List[ScheduledItem]:
+        """Un appel à `model`, compté dans ses statistiques (latence, succès)."""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            message = await self._invoke(self._schedule_chain(model), encoded.inputs, "single")
+            outcome = "unparsable"
+            items = self._parse(SCHEDULE_PARSER, message.text, "single").schedule
+        except asyncio.CancelledError:
+            raise  # hedge perdant ou échéance : ni succès ni échec
+        except Exception:
+            model_stats.record(model, time.perf_counter() - started, ok=False)
+            LLM_ATTEMPTS.labels(model=model, outcome=outcome).inc()
+            raise
+        model_stats.record(model, time.perf_counter() - started, ok=True)
+        LLM_ATTEMPTS.labels(model=model, outcome="ok").inc()
+        self._record_tokens(encoded, message.text, message.usage_metadata)
+        return items
+
+    async def _schedule_batch(self, batch: List[EncodedPrompt]) -> list:
+        """
+        Un appel à Gemini pour tout un lot : le préambule (règles, schéma JSON) n'est envoyé
+        qu'une fois, la réponse est redécoupée par numéro de demande. Une demande absente de
+        la réponse, ou une réponse illisible, est relancée seule (une par demande).
+        """
+        if len(batch) == 1:
+            return [await self._schedule_once(batch[0])]
+
+        requests = "\n\n".join(
+            BATCH_REQUEST_TEMPLATE.format(id=i, **encoded.inputs) for i, encoded in enumerate(batch)
+        )
+        message = await self._invoke(
+            self.chains.batch_schedule, {"count": len(batch), "horizon": HORIZON_DAYS, "requests": requests}, "batch"
+        )
+        self._record_batch_tokens(batch, requests, message.text, message.usage_metadata)
+        try:
+            parsed = self._parse(BATCH_SCHEDULE_PARSER, message.text, "batch")
+            schedules = {entry.id: entry.schedule for entry in parsed.schedules}
+        except OutputParserException as e:
+            log.warning("llm.batch_invalid", "Réponse du lot invalide, demandes relancées une par une", error=str(e))
+            schedules = {}
+
+        missing = [i for i in range(len(batch)) if i not in schedules]
+        if missing:
+            if len(missing) < len(batch):
+                log.warning(
+                    "llm.batch_incomplete", "Demandes absentes de la réponse du lot, relancées seules",
+                    missing=len(missing), batch=len(batch),
+                )
+            retried = await asyncio.gather(
+                *(self._schedule_once(batch[i]) for i in missing), return_exceptions=True
+            )
+            schedules.update(zip(missing, retried))
+        return [schedules[i] for i in range(len(batch))]
+
+    async def _stream_schedule(
+        self, inputs: dict, on_item: OnItem
+    ) -> Tuple[List[ScheduledItem], str, Optional[dict]]:
+        """
+        Lit la réponse de Gemini au fil de l'eau (astream) : chaque créneau part vers le
+        client dès que son objet JSON est complet. Le document entier est ensuite parsé
+        strictement, comme en mode normal. Renvoie (créneaux, texte brut, usage des tokens).
+        """
+        parser = ScheduleStreamParser()
+        started = time.perf_counter()
+        first_item_ms = None
+        usage = None
+        with tracer.start_as_current_span("llm.stream"):
+            async for chunk in self.chains.schedule.astream(inputs):
+                if chunk.usage_metadata:
+                    usage = chunk.usage_metadata  # envoyé avec le dernier morceau
+                for item in parser.feed(chunk.text):
+                    if first_item_ms is None:
+                        first_item_ms = (time.perf_counter() - started) * 1000
+                    await on_item(item)
+        LLM_REQUEST_SECONDS.labels(mode="stream").observe(time.perf_counter() - started)
+        self.stream_stats.record(first_item_ms, (time.perf_counter() - started) * 1000)
+
+        try:
+            return self._parse(SCHEDULE_PARSER, parser.text, "stream").schedule, parser.text, usage
+        except OutputParserException as e:
+            if not parser.items:
+                raise
+            # Document final mal formé (ex: coupé) : on garde les créneaux déjà reconnus
+            log.warning(
+                "llm.stream_invalid", "Réponse finale invalide, créneaux déjà reconnus conservés",
+                recovered=len(parser.items), error=str(e),
+            )
+            return parser.items, parser.text, usage
+
+    def _record_tokens(self, encoded: EncodedPrompt, response_text: str, usage: Optional[dict]) -> None:
+        """Tokens du prompt et de la réponse : réels si Gemini les renvoie, estimés sinon."""
+        prompt_tokens = (usage or {}).get("input_tokens") or encoded.estimated_tokens
+        response_tokens = (usage or {}).get("output_tokens") or estimate_tokens(response_text)
+        self.token_usage.update(requests=1, prompt_tokens=prompt_tokens, response_tokens=response_tokens)
+        log.info(
+            "llm.tokens", "Tokens consommés",
+            prompt_tokens=prompt_tokens, response_tokens=response_tokens, measured=usage is not None,
+            busy_blocks=encoded.busy_blocks, busy_dropped=encoded.busy_dropped,
+        )
+
+    def _record_batch_tokens(
+        self, batch: List[EncodedPrompt], requests: str, response_text: str, usage: Optional[dict]
+    ) -> None:
+        prompt_tokens = (usage or {}).get("input_tokens") or estimate_tokens(
+            BATCH_SCHEDULE_PROMPT.format(count=len(batch), horizon=HORIZON_DAYS, requests=requests)
+        )
+        response_tokens = (usage or {}).get("output_tokens") or estimate_tokens(response_text)
+        self.token_usage.update(
+            requests=1, batched_requests=len(batch), prompt_tokens=prompt_tokens, response_tokens=response_tokens
+        )
+        log.info(
+            "llm.tokens", "Tokens consommés (lot)",
+            batch=len(batch), prompt_tokens=prompt_tokens, response_tokens=response_tokens, measured=usage is not None,
+        )
+
+    async def _explain_schedule(
+        self, schedule: List[ScheduledItem], user_timezone: str
+    ) -> Tuple[List[ScheduledItem], bool]:
+        """
+        Mode hybride : le placement vient du solveur, Gemini ne rédige que le champ 'reasoning'.
+        Si l'IA échoue, on garde les explications (plus sèches) du solveur (et on renvoie False).
+        """
+        placed = [item for item in schedule if item.type == "task"]
+        if not placed:
+            return schedule, True
+
+
+        tasks_str = json.dumps([
+            {"index": i, "title": item.title, "start": item.start, "end": item.end}
+            for i, item in enumerate(placed)
+        ])
+        schedule_str = json.dumps([
+            {"title": item.title, "start": item.start, "end": item.end, "type": item.type}
+            for item in schedule
+        ])
+        try:
+            result = await asyncio.wait_for(self._invoke(self.chains.explanation, {
+                "timezone": user_timezone,
+                "schedule": schedule_str,
+                "tasks": tasks_str,
+            }, "explanation"), settings.LLM_DEADLINE_SECONDS)
+        except Exception as e:
+            if isinstance(e, OutputParserException):
+                LLM_PARSE_FAILURES.labels(mode="explanation").inc()
+            log.warning("llm.explanation_failed", "Explications indisponibles, on garde celles du solveur", error=str(e))
+            return schedule, False
+
+        for explanation in result.explanations:
+            if 0 <= explanation.index < len(placed) and explanation.reasoning:
+                placed[explanation.index].reasoning = explanation.reasoning
+        return schedule, True
 
 ai_optimizer = AIOptimizer()
\ No newline at end of file
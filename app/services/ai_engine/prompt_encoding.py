@@ -0,0 +1,116 @@
+import json
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.services.optimizer import HORIZON_DAYS, busy_index, resolve_timezone
+
+log = get_logger("ai")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimation locale du nombre de tokens (sans appel réseau au tokenizer Gemini).
+    Les vrais chiffres, quand Gemini les renvoie, sont lus dans `usage_metadata`.
+    """
+    return math.ceil(len(text) / settings.LLM_CHARS_PER_TOKEN)
+
+
+def _compact(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+@dataclass
+class EncodedPrompt:
+    inputs: dict  # variables du prompt (now, timezone, horizon, busy, tasks)
+    busy_blocks: int  # blocs occupés envoyés à Gemini
+    busy_dropped: int  # blocs retirés pour tenir dans le budget (les plus lointains)
+    estimated_tokens: int  # taille estimée du prompt complet
+    task_count: int = 0  # tâches à placer (choix du modèle, voir model_policy)
+
+
+def encode_busy(current_events: List[dict], user_timezone: str, now: datetime) -> List[List[int]]:
+    """
+    Temps occupé en blocs fusionnés [début, fin], en minutes à partir de `now`.
+    Le passé est ignoré, un bloc en cours commence à 0 ; au-delà de l'horizon du
+    planificateur, rien n'est envoyé (le validateur couvre de toute façon l'agenda complet).
+    """
+    index = busy_index(current_events, resolve_timezone(user_timezone))
+    now_ts = now.timestamp()
+    horizon = HORIZON_DAYS * 24 * 60
+    blocks: List[List[int]] = []
+    for start, end in zip(index.starts, index.ends):
+        start_min = max(0, math.floor((start - now_ts) / 60))
+        end_min = math.ceil((end - now_ts) / 60)
+        if end_min <= 0:
+            continue
+        if start_min >= horizon:
+            break
+        if blocks and start_min <= blocks[-1][1]:
+            blocks[-1][1] = max(blocks[-1][1], end_min)  # contigus après arrondi
+        else:
+            blocks.append([start_min, end_min])
+    return blocks
+
+
+def encode_tasks(tasks_todo: list) -> List[dict]:
+    """Clés courtes (t, d, p, at) ; `at` n'apparaît que si la tâche a une heure préférée."""
+    encoded = []
+    for task in tasks_todo:
+        task = task.dict() if hasattr(task, "dict") else task
+        item = {"t": task["title"], "d": task["duration"], "p": task["priority"]}
+        if task.get("preferred_time"):
+            item["at"] = task["preferred_time"]
+        encoded.append(item)
+    return encoded
+
+
+def encode_schedule_prompt(
+    render: Callable[[dict], str],
+    current_events: List[dict],
+    tasks_todo: list,
+    user_timezone: str,
+    now: datetime,
+    token_budget: Optional[int] = None,
+) -> EncodedPrompt:
+    """
+    Variables du prompt "planning" en encodage compact, dans la limite du budget de tokens.
+    Si le budget est dépassé, on retire d'abord le temps occupé le plus lointain :
+    c'est lui qui influence le moins le placement des tâches (et le validateur
+    corrigera un éventuel conflit avec ce qui n'a pas été envoyé).
+    """
+    token_budget = settings.LLM_PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    blocks = encode_busy(current_events, user_timezone, now)
+    inputs = {
+        "now": now.isoformat(timespec="minutes"),
+        "timezone": user_timezone,
+        "horizon": HORIZON_DAYS,
+        "tasks": _compact(encode_tasks(tasks_todo)),
+        "busy": "[]",
+    }
+    # Tout sauf le temps occupé, puis le coût de chaque bloc ("[a,b]" + virgule)
+    base_chars = len(render(inputs))
+    block_chars = [len(_compact(block)) + 1 for block in blocks]
+    total_chars = base_chars + sum(block_chars)
+    kept = len(blocks)
+    budget_chars = token_budget * settings.LLM_CHARS_PER_TOKEN
+    while kept and total_chars > budget_chars:
+        kept -= 1
+        total_chars -= block_chars[kept]
+
+    inputs["busy"] = _compact(blocks[:kept])
+    dropped = len(blocks) - kept
+    if dropped:
+        log.info("llm.prompt_trimmed", "Blocs occupés lointains retirés", token_budget=token_budget, dropped=dropped)
+    if total_chars > budget_chars:
+        log.warning("llm.prompt_over_budget", "Les tâches seules dépassent le budget de tokens", token_budget=token_budget)
+    return EncodedPrompt(
+        inputs=inputs,
+        busy_blocks=kept,
+        busy_dropped=dropped,
+        estimated_tokens=math.ceil(total_chars / settings.LLM_CHARS_PER_TOKEN),
+        task_count=len(tasks_todo),
+    )
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import time
+from typing import List, Optional
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.redis import get_redis
+from app.schemas.ai import ScheduledItem
+
+log = get_logger("ai")
+
+KEY_PREFIX = "kairos:schedule-cache"
+INDEX_KEY = f"{KEY_PREFIX}:index"  # sorted set clé -> date d'insertion (éviction des plus anciennes)
+STATS_KEY = f"{KEY_PREFIX}:stats"  # compteurs partagés API + workers
+
+
+def canonical_events(current_events: List[dict]) -> List[dict]:
+    # Seuls ces champs influencent le planning ; l'ordre renvoyé par Google non plus
+    events = [
+        {"title": e.get("title"), "start": e.get("start"), "end": e.get("end")}
+        for e in current_events
+    ]
+    return sorted(events, key=lambda e: (str(e["start"]), str(e["end"]), str(e["title"])))
+
+
+def canonical_tasks(tasks_todo: list) -> List[dict]:
+    tasks = [task.dict() if hasattr(task, "dict") else dict(task) for task in tasks_todo]
+    return sorted(tasks, key=lambda t: json.dumps(t, sort_keys=True, default=str))
+
+
+class ScheduleResultCache:
+    """
+    Cache des plannings calculés par l'IA, adressé par le contenu de la demande.
+
+    La clé est un hash canonique de : événements (normalisés et triés), tâches, fuseau,
+    moteur, modèle, version du prompt et "maintenant" arrondi à un créneau
+    (LLM_CACHE_NOW_BUCKET_SECONDS). Deux clics sur "optimiser" sans rien changer entre-temps
+    donnent la même clé, et donc un seul appel à Gemini.
+
+    Stockage Redis : TTL par entrée + nombre d'entrées borné (les plus anciennes sont évincées).
+    Redis indisponible = simple miss, jamais une erreur.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved_ms = 0.0
+
+    def key(self, current_events: List[dict], tasks_todo: list, user_timezone: str, **versions) -> str:
+        bucket = int(time.time() // settings.LLM_CACHE_NOW_BUCKET_SECONDS)
+        payload = {
+            "events": canonical_events(current_events),
+            "tasks": canonical_tasks(tasks_todo),
+            "timezone": user_timezone,
+            "now_bucket": bucket,
+            **versions,
+        }
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{KEY_PREFIX}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+    async def get(self, key: str) -> Optional[List[ScheduledItem]]:
+        if not settings.LLM_CACHE_ENABLED:
+            return None
+        try:
+            raw = await get_redis().get(key)
+            if raw is None:
+                self.misses += 1
+                await get_redis().hincrby(STATS_KEY, "misses", 1)
+                return None
+            entry = json.loads(raw)
+            self.hits += 1
+            self.latency_saved_ms += entry["compute_ms"]
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.hincrby(STATS_KEY, "hits", 1)
+                pipe.hincrbyfloat(STATS_KEY, "latency_saved_ms", entry["compute_ms"])
+                await pipe.execute()
+        except RedisError as e:
+            log.warning("llm_cache.unavailable", "Cache IA indisponible", error=str(e))
+            return None
+        log.info("llm_cache.hit", "Planning réutilisé", saved_ms=round(entry["compute_ms"]))
+        return [ScheduledItem(**item) for item in entry["schedule"]]
+
+    async def set(self, key: str, schedule: List[ScheduledItem], compute_ms: float) -> None:
+        if not settings.LLM_CACHE_ENABLED:
+            return
+        entry = json.dumps({
+            "schedule": [item.dict() for item in schedule],
+            "compute_ms": round(compute_ms, 1),
+        })
+        try:
+            redis = get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, entry, ex=settings.LLM_CACHE_TTL_SECONDS)
+                pipe.zadd(INDEX_KEY, {key: time.time()})
+                # Les entrées expirées par TTL sortent aussi de l'index
+                pipe.zremrangebyscore(INDEX_KEY, 0, time.time() - settings.LLM_CACHE_TTL_SECONDS)
+                pipe.zcard(INDEX_KEY)
+                *_, size = await pipe.execute()
+            overflow = size - settings.LLM_CACHE_MAX_ENTRIES
+            if overflow > 0:
+                evicted = [member for member, _ in await redis.zpopmin(INDEX_KEY, overflow)]
+                if evicted:
+                    await redis.delete(*evicted)
+        except RedisError as e:
+            log.warning("llm_cache.unavailable", "Cache IA indisponible", error=str(e))
+
+    async def stats(self) -> dict:
+        """Compteurs agrégés (tous les process), avec repli sur ceux du process courant."""
+        hits, misses, saved = self.hits, self.misses, self.latency_saved_ms
+        try:
+            shared = await get_redis().hgetall(STATS_KEY)
+            if shared:
+                hits = int(shared.get(b"hits", 0))
+                misses = int(shared.get(b"misses", 0))
+                saved = float(shared.get(b"latency_saved_ms", 0))
+        except RedisError:
+            pass
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_ms": round(saved, 1),
+        }
+
+
+schedule_cache = ScheduleResultCache()
@@ -0,0 +1,138 @@
+import json
+from collections import deque
+from typing import List, Optional
+
+from pydantic import ValidationError
+
+from app.core.logs import get_logger
+from app.schemas.ai import ScheduledItem
+
+log = get_logger("ai")
+
+
+class ScheduleStreamParser:
+    """
+    Parser JSON incrémental pour la réponse de Gemini en streaming.
+
+    On lui donne les morceaux de texte au fil de l'eau ; il renvoie chaque ScheduledItem
+    dès que son objet `{...}` est refermé dans le tableau "schedule", sans attendre la fin
+    du document. Le texte complet reste disponible (`text`) pour le parsing final strict.
+    """
+
+    def __init__(self, array_key: str = "schedule"):
+        self._key = f'"{array_key}"'
+        self._parts: List[str] = []
+        self._buffer = ""
+        self._pos = 0  # prochain caractère à examiner dans _buffer
+        self._in_array = False
+        self._done = False
+        self._depth = 0  # profondeur des objets à l'intérieur du tableau
+        self._in_string = False
+        self._escaped = False
+        self._item_start: Optional[int] = None
+        self.items: List[ScheduledItem] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> List[ScheduledItem]:
+        self._parts.append(chunk)
+        if self._done:
+            return []
+        self._buffer += chunk
+        if not self._in_array and not self._find_array():
+            return []
+
+        emitted = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+            elif char == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._parse_item(buffer[self._item_start:i + 1])
+                    if item is not None:
+                        self.items.append(item)
+                        emitted.append(item)
+                    self._item_start = None
+            elif char == "]" and self._depth == 0:
+                self._done = True  # fin du tableau : le reste ne nous intéresse pas
+                self._buffer = ""
+                return emitted
+
+        # On ne garde que l'objet en cours (le début du buffer est déjà traité)
+        if self._item_start is not None:
+            self._buffer = buffer[self._item_start:]
+            self._item_start = 0
+        else:
+            self._buffer = ""
+        self._pos = len(self._buffer)
+        return emitted
+
+    def _find_array(self) -> bool:
+        key = self._buffer.find(self._key)
+        if key < 0:
+            return False
+        bracket = self._buffer.find("[", key + len(self._key))
+        if bracket < 0:
+            return False
+        self._in_array = True
+        self._buffer = self._buffer[bracket + 1:]
+        self._pos = 0
+        return True
+
+    @staticmethod
+    def _parse_item(raw: str) -> Optional[ScheduledItem]:
+        try:
+            return ScheduledItem(**json.loads(raw))
+        except (ValueError, TypeError, ValidationError):
+            return None  # objet incomplet ou invalide : le parsing final tranchera
+
+
+class StreamStats:
+    """Délai avant le premier créneau (ce que l'utilisateur ressent) et durée totale, par process."""
+
+    def __init__(self, window: int = 500):
+        self.runs = 0
+        self.first_item_ms: deque = deque(maxlen=window)
+        self.total_ms: deque = deque(maxlen=window)
+
+    def record(self, first_item_ms: Optional[float], total_ms: float) -> None:
+        self.runs += 1
+        if first_item_ms is not None:
+            self.first_item_ms.append(first_item_ms)
+        self.total_ms.append(total_ms)
+        log.info(
+            "llm.stream", "Planning streamé",
+            first_item_ms=round(first_item_ms) if first_item_ms is not None else None, total_ms=round(total_ms),
+        )
+
+    @staticmethod
+    def _percentile(samples, pct: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))], 1)
+
+    def summary(self) -> dict:
+        return {
+            "runs": self.runs,
+            "first_item_p50_ms": self._percentile(self.first_item_ms, 50),
+            "first_item_p95_ms": self._percentile(self.first_item_ms, 95),
+            "total_p50_ms": self._percentile(self.total_ms, 50),
+        }
@@ -0,0 +1,299 @@
+import asyncio
+import math
+import time as timer
+from datetime import datetime, time, timedelta, timezone
+from typing import List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from fastapi import HTTPException
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.tracing import tracer
+from app.db.session import SessionLocal
+from app.models.availability_share import AvailabilityShare
+from app.models.user import User
+from app.schemas.availability import AvailabilityRequest, CommonSlot
+from app.services.calendar_service import calendar_service
+from app.services.optimizer import DAY_END, DAY_START, resolve_timezone, round_up
+
+log = get_logger("availability")
+
+
+def _minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _utc_offset_minutes(moment: datetime, zone: ZoneInfo) -> int:
+    return int(moment.astimezone(zone).utcoffset().total_seconds() // 60)
+
+
+def epoch_minutes(values: List[str], rows: np.ndarray, zones: List[ZoneInfo]) -> np.ndarray:
+    """
+    Dates ISO 8601 -> minutes depuis l'époque Unix (NaN : journée entière, vide ou illisible).
+
+    Chemin vectorisé pour le format des dateTime Google ("2026-03-02T09:30:00+01:00" ou
+    "...Z") ; fromisoformat pour le reste (une date sans fuseau est dans celui du participant `rows[i]`).
+    """
+    minutes = np.full(len(values), np.nan)
+    if not values:
+        return minutes
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    width = max(25, int(lengths.max()))
+    codes = np.array(values, dtype=f"U{width}").view(np.uint32).reshape(len(values), width)
+    signed = (lengths == 25) & ((codes[:, 19] == ord("+")) | (codes[:, 19] == ord("-"))) & (codes[:, 22] == ord(":"))
+    fast = signed | ((lengths == 20) & (codes[:, 19] == ord("Z")))
+    try:
+        # Heure murale (à la seconde) convertie en bloc, puis décalage lu dans les caractères
+        wall = codes[fast, :19].copy().view("U19").ravel().astype("datetime64[s]").astype(np.int64) / 60
+    except ValueError:
+        fast[:] = False
+    else:
+        digits = codes[fast].astype(np.int64) - ord("0")
+        offset = digits[:, 20] * 600 + digits[:, 21] * 60 + digits[:, 23] * 10 + digits[:, 24]
+        offset = np.where(codes[fast, 19] == ord("-"), -offset, offset)
+        minutes[fast] = wall - np.where(signed[fast], offset, 0)
+
+    for i in np.flatnonzero(~fast & (lengths > 10)):
+        try:
+            parsed = datetime.fromisoformat(values[i])
+        except ValueError:
+            continue
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=zones[rows[i]])
+        minutes[i] = parsed.timestamp() / 60
+    return minutes
+
+
+class AvailabilityFinder:
+    """
+    Créneaux libres communs à N personnes ("trouve un créneau pour nous tous").
+
+    Un bitmap NumPy par participant sur une grille UTC commune (pas de
+    AVAILABILITY_RESOLUTION_MINUTES) : libre = ni événement, ni nuit locale (DAY_START / DAY_END
+    dans le fuseau du participant). Tout est vectorisé : événements posés par somme cumulée,
+    intersection sur l'axe des participants, découpage en plages libres. Quelques ms pour des
+    centaines de personnes sur plusieurs semaines.
+
+    Classement : nombre de participants dans leurs heures confortables (AVAILABILITY_CORE_*)
+    pendant toute la réunion, puis le plus tôt ; un seul créneau proposé par plage libre.
+    """
+
+    def __init__(self, resolution_minutes: Optional[int] = None):
+        self.resolution = resolution_minutes or settings.AVAILABILITY_RESOLUTION_MINUTES
+        if 60 % self.resolution:
+            raise ValueError("AVAILABILITY_RESOLUTION_MINUTES doit diviser 60")
+
+    async def find(self, organizer: User, request: AvailabilityRequest, db: AsyncSession) -> dict:
+        """
+        Participants résolus seulement s'ils partagent leurs disponibilités avec l'organisateur
+        (AvailabilityShare) : les autres, inscrits ou non, sont renvoyés dans `unknown` sans distinction.
+        Un agenda illisible (pas d'accès Google, token révoqué...) met son participant dans
+        `unavailable` : les créneaux sont calculés sans lui.
+        """
+        started = timer.perf_counter()
+        others = {str(p.email): p.timezone for p in request.participants if str(p.email) != organizer.email}
+        if len(others) + 1 > settings.AVAILABILITY_MAX_PARTICIPANTS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Trop de participants (max {settings.AVAILABILITY_MAX_PARTICIPANTS})",
+            )
+        rows = (await db.exec(
+            select(User.id, User.email)
+            .join(AvailabilityShare, AvailabilityShare.owner_id == User.id)
+            .where(
+                User.email.in_(list(others)),
+                User.is_active,
+                AvailabilityShare.viewer_id == organizer.id,
+            )
+        )).all() if others else []
+        user_ids = {email: user_id for user_id, email in rows}
+        unknown = [email for email in others if email not in user_ids]
+
+        horizon_days = min(request.horizon_days, settings.PLAN_HORIZON_DAYS)
+        now = datetime.now(timezone.utc)
+        until = now + timedelta(days=horizon_days)
+        participants = [(organizer.email, organizer.id, request.user_timezone)] + [
+            (email, user_ids[email], tz) for email, tz in others.items() if email in user_ids
+        ]
+        # Une session par agenda : une synchro Google éventuelle n'en bloque pas d'autres
+        gate = asyncio.Semaphore(settings.AVAILABILITY_FETCH_CONCURRENCY)
+
+        async def load(email: str, user_id, tz: str) -> Optional[Tuple[str, List[dict]]]:
+            try:
+                async with gate, SessionLocal() as session:
+                    events = await calendar_service.get_upcoming_events(
+                        user_id, session, user_timezone=tz, now=now, until=until
+                    )
+            except Exception as e:
+                # Ex: 401 "Non connecté à Google Calendar" : ce participant seulement, pas toute la demande
+                log.warning("availability.calendar_unavailable", "Agenda d'un participant illisible",
+                            user_id=user_id, error=str(e))
+                return None
+            return tz, events
+
+        with tracer.start_as_current_span("availability.find"):
+            loaded = await asyncio.gather(*(load(*participant) for participant in participants))
+            unavailable = [email for (email, _, _), calendar in zip(participants, loaded) if calendar is None]
+            calendars = [calendar for calendar in loaded if calendar is not None]
+            slots = self.common_slots(
+                calendars, request.duration, horizon_days, now=now, output_timezone=request.user_timezone
+            )
+
+        duration_ms = round((timer.perf_counter() - started) * 1000, 2)
+        log.info(
+            "availability.found", "Créneaux communs calculés",
+            participants=len(calendars), unknown=len(unknown), unavailable=len(unavailable),
+            slots=len(slots), duration_ms=duration_ms,
+        )
+        return {
+            "participants": len(calendars),
+            "slots": slots,
+            "unknown": unknown,
+            "unavailable": unavailable,
+            "duration_ms": duration_ms,
+        }
+
+    # --- PARTAGE DES DISPONIBILITÉS ---
+    @staticmethod
+    async def shares(user: User, db: AsyncSession) -> dict:
+        """Avec qui l'utilisateur partage ses disponibilités, et qui les partage avec lui."""
+        shared_with = (await db.exec(
+            select(User.email).join(AvailabilityShare, AvailabilityShare.viewer_id == User.id)
+            .where(AvailabilityShare.owner_id == user.id)
+        )).all()
+        shared_by = (await db.exec(
+            select(User.email).join(AvailabilityShare, AvailabilityShare.owner_id == User.id)
+            .where(AvailabilityShare.viewer_id == user.id, User.is_active)
+        )).all()
+        return {"shared_with": sorted(shared_with), "shared_by": sorted(shared_by)}
+
+    @staticmethod
+    async def share(owner: User, viewer_email: str, db: AsyncSession) -> None:
+        viewer = (await db.exec(
+            select(User).where(User.email == viewer_email, User.is_active)
+        )).first()
+        if viewer is None or viewer.id == owner.id:
+            raise HTTPException(status_code=404, detail="Utilisateur inconnu")
+        if await db.get(AvailabilityShare, (owner.id, viewer.id)) is None:
+            db.add(AvailabilityShare(owner_id=owner.id, viewer_id=viewer.id))
+            await db.commit()
+
+    @staticmethod
+    async def unshare(owner: User, viewer_email: str, db: AsyncSession) -> None:
+        viewer_id = (await db.exec(select(User.id).where(User.email == viewer_email))).first()
+        share = await db.get(AvailabilityShare, (owner.id, viewer_id)) if viewer_id else None
+        if share is not None:
+            await db.delete(share)
+            await db.commit()
+
+    def common_slots(
+        self,
+        calendars: Sequence[Tuple[str, List[dict]]],
+        duration: int,
+        horizon_days: int,
+        now: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        output_timezone: str = "UTC",
+    ) -> List[CommonSlot]:
+        """`calendars` : (fuseau, événements nettoyés de get_upcoming_events) par participant."""
+        res = self.resolution
+        origin = round_up((now or datetime.now(timezone.utc)).astimezone(timezone.utc), res)
+        size = horizon_days * 24 * 60 // res
+        length = math.ceil(duration / res)
+        if not calendars or length > size:
+            return []
+
+        zones = [resolve_timezone(tz) for tz, _ in calendars]
+        busy = self._busy(calendars, zones, origin, size)
+
+        # Nuit et heures confortables : un masque par fuseau distinct, partagé par ses participants
+        distinct = list(dict.fromkeys(zones))
+        tz_index = np.array([distinct.index(zone) for zone in zones])
+        day, core = map(np.array, zip(*(self._local_masks(zone, origin, size) for zone in distinct)))
+
+        # Intersection des bitmaps : libre pour tous
+        free = ~busy
+        free &= day[tz_index]
+        common = free.all(axis=0)
+
+        # Plages libres assez longues pour la réunion
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], common.astype(np.int8), [0]))))
+        window_starts, window_ends = edges[0::2], edges[1::2]
+        long_enough = window_ends - window_starts >= length
+
+        # Confort d'un début de réunion : participants en heures confortables sur toute sa durée
+        in_core = np.bincount(tz_index, minlength=len(distinct)) @ core.astype(np.int32)
+        comfort = sliding_window_view(in_core, length).min(axis=1)
+
+        candidates = []
+        for window_start, window_end in zip(window_starts[long_enough], window_ends[long_enough]):
+            segment = comfort[window_start:window_end - length + 1]
+            best = int(np.argmax(segment))  # premier maximum = le plus tôt
+            candidates.append((-int(segment[best]), int(window_start) + best, int(window_start), int(window_end)))
+        candidates.sort()
+
+        out_tz = resolve_timezone(output_timezone)
+
+        def at(index: int) -> str:
+            return (origin + timedelta(minutes=index * res)).astimezone(out_tz).isoformat()
+
+        return [
+            CommonSlot(
+                start=at(start), end=(origin + timedelta(minutes=start * res + duration)).astimezone(out_tz).isoformat(),
+                window_start=at(window_start), window_end=at(window_end),
+                comfort=round(-score / len(calendars), 3),
+            )
+            for score, start, window_start, window_end in candidates[:limit or settings.AVAILABILITY_MAX_RESULTS]
+        ]
+
+    def _busy(self, calendars, zones: List[ZoneInfo], origin: datetime, size: int) -> np.ndarray:
+        """Bitmap du temps occupé (participants x pas de temps) : +1 au début, -1 à la fin, somme cumulée."""
+        res = self.resolution
+        rows, starts, ends = [], [], []
+        for row, (_, events) in enumerate(calendars):
+            rows += [row] * len(events)
+            starts += [event.get("start") or "" for event in events]
+            ends += [event.get("end") or "" for event in events]
+        rows = np.asarray(rows, dtype=np.int64)
+        first, last = epoch_minutes(starts, rows, zones), epoch_minutes(ends, rows, zones)
+        # Les journées entières (NaN) ne bloquent pas l'agenda
+        dated = np.isfinite(first) & np.isfinite(last) & (last > first)
+        rows, first, last = rows[dated], first[dated], last[dated]
+
+        origin_minutes = origin.timestamp() / 60
+        first = np.floor((first - origin_minutes) / res).clip(0, size).astype(np.int64)
+        last = np.ceil((last - origin_minutes) / res).clip(0, size).astype(np.int64)
+        keep = last > first  # terminés avant l'origine, ou commençant après l'horizon
+
+        # int16 : deux fois moins de mémoire à parcourir que les entiers par défaut
+        marks = np.zeros((len(calendars), size + 1), dtype=np.int16)
+        np.add.at(marks, (rows[keep], first[keep]), 1)
+        np.add.at(marks, (rows[keep], last[keep]), -1)
+        return np.cumsum(marks, axis=1, dtype=np.int16)[:, :size] > 0
+
+    def _local_masks(self, zone: ZoneInfo, origin: datetime, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(pas de jour, pas en heures confortables) dans le fuseau `zone`, changements d'heure compris."""
+        res = self.resolution
+        per_hour = 60 // res
+        hours = -(-size // per_hour)
+        # Décalage UTC jour par jour ; heure par heure les jours de changement d'heure
+        daily = [_utc_offset_minutes(origin + timedelta(days=day), zone) for day in range(-(-hours // 24) + 1)]
+        offsets = np.repeat(np.array(daily[:-1], dtype=np.int64), 24)[:hours]
+        for day in np.flatnonzero(np.diff(daily)):
+            for hour in range(day * 24, min((day + 1) * 24, hours)):
+                offsets[hour] = _utc_offset_minutes(origin + timedelta(hours=int(hour)), zone)
+        utc = origin.hour * 60 + origin.minute + np.arange(size, dtype=np.int64) * res
+        local = (utc + np.repeat(offsets, per_hour)[:size]) % (24 * 60)
+        day = (local >= _minute_of_day(DAY_START)) & (local + res <= _minute_of_day(DAY_END))
+        core = (local >= settings.AVAILABILITY_CORE_START_HOUR * 60) & (
+            local + res <= settings.AVAILABILITY_CORE_END_HOUR * 60
+        )
+        return day, core
+
+
+availability_finder = AvailabilityFinder()
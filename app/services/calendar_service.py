@@ -1,26 +1,101 @@
-from datetime import datetime
-from uuid import UUID
+import asyncio
+import random
+import time as clock
+import weakref
+from contextlib import asynccontextmanager
+from datetime import datetime, date, time, timedelta, timezone
+from typing import AsyncIterator, List, Optional
+from uuid import UUID, uuid4
 import httpx
 from fastapi import HTTPException
-from sqlmodel import Session, select
+from redis.exceptions import LockError, RedisError
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.calendar_event import CalendarEvent, CalendarSyncState
 from app.models.oauth import OAuthCredential
 from app.core.config import settings
+from app.core.http_client import build_http_client
+from app.core.logs import get_logger
+from app.core.metrics import GOOGLE_REQUEST_SECONDS, GOOGLE_UNAUTHORIZED_RETRIES, TOKEN_REFRESH_SECONDS
+from app.core.redis import get_redis
+from app.core.tracing import tracer
+from app.db.session import SessionLocal
+from app.services.optimizer import planning_window
+
+log = get_logger("calendar")
+
+# Réponses Google qui méritent une nouvelle tentative (quota / erreur temporaire)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Réponse partielle de events.list : seulement ce que la copie locale garde
+# (status : pour reconnaître les annulations pendant la synchro incrémentale)
+EVENT_LIST_FIELDS = "items(id,status,summary,start(date,dateTime),end(date,dateTime)),nextPageToken,nextSyncToken"
+
+
+class SyncTokenExpired(Exception):
+    """Google a répondu 410 : le syncToken n'est plus valable, il faut une synchro complète."""
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Délai avant la tentative suivante : Retry-After si Google le donne, sinon exponentiel + jitter."""
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), settings.GOOGLE_BULK_MAX_BACKOFF_SECONDS)
+    delay = settings.GOOGLE_BULK_BACKOFF_SECONDS * (2 ** (attempt - 1))
+    return min(delay, settings.GOOGLE_BULK_MAX_BACKOFF_SECONDS) * random.uniform(0.5, 1.0)
+
 
 class GoogleCalendarService:
-    
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Un verrou par utilisateur, libéré automatiquement quand plus personne ne l'attend
+        self._refresh_locks: "weakref.WeakValueDictionary[UUID, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._sync_locks: "weakref.WeakValueDictionary[UUID, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    # --- CLIENT HTTP PARTAGÉ ---
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Client HTTP longue durée (pool keep-alive, HTTP/2, gzip).
+        Les connexions d'un pool sont liées à une boucle d'événements : si on est appelé
+        depuis une autre boucle (ex: asyncio.run() dans un worker), on repart d'un pool neuf.
+        """
+        loop = asyncio.get_running_loop()
+        stale = self._client_loop is not None and self._client_loop is not loop
+        if self._client is None or self._client.is_closed or stale:
+            self._client = build_http_client()
+        self._client_loop = loop
+        return self._client
+
+    def open(self):
+        """Crée le client au démarrage (lifespan FastAPI / worker Celery)."""
+        if self._client is None or self._client.is_closed:
+            self._client = build_http_client()
+            self._client_loop = None  # lié à la première boucle qui l'utilise
+        return self._client
+
+    async def aclose(self):
+        """Ferme proprement les connexions à l'arrêt."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+
     # --- MÉTHODE INTERNE POUR RENOUVELER LE TOKEN ---
-    async def _refresh_google_token(self, credential: OAuthCredential, db: Session) -> str:
+    async def _refresh_google_token(self, credential: OAuthCredential) -> str:
         """
         Utilise le Refresh Token pour obtenir un nouvel Access Token
         et le sauvegarde en base.
         """
         if not credential.refresh_token:
-            print("❌ Pas de refresh token disponible.")
+            log.warning("oauth.refresh_missing", "Pas de refresh token disponible", user_id=credential.user_id)
+            TOKEN_REFRESH_SECONDS.labels(outcome="missing").observe(0)
             raise HTTPException(status_code=401, detail="Session expirée, veuillez vous reconnecter.")
 
-        print("🔄 Token expiré. Tentative de renouvellement...")
+        log.info("oauth.refresh", "Token expiré (ou sur le point de l'être), renouvellement", user_id=credential.user_id)
 
-        token_url = "https://oauth2.googleapis.com/token"
         payload = {
             "client_id": settings.GOOGLE_CLIENT_ID,
             "client_secret": settings.GOOGLE_CLIENT_SECRET,
@@ -28,119 +103,550 @@ class GoogleCalendarService:
             "grant_type": "refresh_token",
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(token_url, data=payload)
-            
-            if response.status_code != 200:
-                print(f"❌ Échec du refresh Google: {response.text}")
-                # Si le refresh échoue (ex: l'utilisateur a révoqué l'accès), on doit le déconnecter
-                raise HTTPException(status_code=401, detail="Impossible de renouveler l'accès Google.")
-
-            new_tokens = response.json()
-        
-        # Mise à jour en base de données
-        credential.access_token = new_tokens["access_token"]
+        started = clock.perf_counter()
+        with tracer.start_as_current_span("google.token_refresh"):
+            response = await self.client.post(settings.GOOGLE_TOKEN_URL, data=payload)
+        outcome = "ok" if response.status_code == 200 else "error"
+        TOKEN_REFRESH_SECONDS.labels(outcome=outcome).observe(clock.perf_counter() - started)
+
+        if response.status_code != 200:
+            log.error(
+                "oauth.refresh_failed", "Échec du refresh Google",
+                user_id=credential.user_id, status=response.status_code, body=response.text[:200],
+            )
+            # Si le refresh échoue (ex: l'utilisateur a révoqué l'accès), on doit le déconnecter
+            raise HTTPException(status_code=401, detail="Impossible de renouveler l'accès Google.")
+
+        new_tokens = response.json()
+        fields = {
+            "access_token": new_tokens["access_token"],
+            "expires_at": int(datetime.now(timezone.utc).timestamp()) + int(new_tokens.get("expires_in", 3600)),
+        }
         # Parfois Google renvoie un nouveau refresh token, parfois non (on garde l'ancien)
         if new_tokens.get("refresh_token"):
-            credential.refresh_token = new_tokens["refresh_token"]
-        
-        db.add(credential)
-        db.commit()
-        db.refresh(credential)
-        
-        print("✅ Token renouvelé avec succès !")
+            fields["refresh_token"] = new_tokens["refresh_token"]
+
+        # Mise à jour en base dans une session à part : un commit sur `db` validerait aussi le travail
+        # en cours de l'appelant (ex: copie locale vidée par une synchro complète pas encore terminée)
+        async with SessionLocal() as session:
+            stored = await session.get(OAuthCredential, credential.id)
+            for key, value in fields.items():
+                setattr(stored, key, value)
+            session.add(stored)
+            await session.commit()
+        # ... et l'objet de l'appelant reflète la ligne commitée, sans être marqué modifié
+        for key, value in fields.items():
+            set_committed_value(credential, key, value)
+
+        log.info("oauth.refreshed", "Token renouvelé", user_id=credential.user_id)
+        return credential.access_token
+
+    # --- REFRESH UNIQUE PAR UTILISATEUR (single-flight) ---
+    @staticmethod
+    def _expires_soon(credential: OAuthCredential) -> bool:
+        if credential.expires_at is None:
+            return False  # inconnu (anciens comptes) : on attendra le 401
+        now = datetime.now(timezone.utc).timestamp()
+        return credential.expires_at - settings.GOOGLE_TOKEN_REFRESH_SKEW_SECONDS <= now
+
+    async def _fresh_token(self, credential: OAuthCredential, db: AsyncSession) -> str:
+        """Token utilisable tout de suite : renouvelé AVANT son expiration plutôt qu'après un 401."""
+        if self._expires_soon(credential):
+            return await self._refresh_once(credential, db, credential.access_token)
         return credential.access_token
 
-    # --- LECTURE DES ÉVÉNEMENTS (Avec retry) ---
-    async def get_upcoming_events(self, user_id: UUID, db: Session):
-        # 1. Récupération Credentials
+    async def _refresh_once(self, credential: OAuthCredential, db: AsyncSession, stale_token: str) -> str:
+        """
+        Renouvelle `stale_token` une seule fois, même si plusieurs requêtes (API ou worker)
+        le découvrent expiré en même temps :
+        - verrou asyncio par utilisateur dans le process,
+        - verrou Redis par utilisateur entre les process.
+        Après chaque verrou, on relit la ligne en base : si le token a changé, un autre
+        l'a déjà renouvelé et on le réutilise.
+        """
+        user_id = credential.user_id
+        lock = self._refresh_locks.get(user_id)
+        if lock is None:
+            lock = self._refresh_locks[user_id] = asyncio.Lock()
+
+        async with lock:
+            if await self._refreshed_elsewhere(credential, db, stale_token):
+                return credential.access_token
+
+            redis_lock = get_redis().lock(
+                f"kairos:oauth-refresh:{user_id}",
+                timeout=settings.GOOGLE_TOKEN_REFRESH_LOCK_TIMEOUT_SECONDS,
+                blocking_timeout=settings.GOOGLE_TOKEN_REFRESH_WAIT_SECONDS,
+            )
+            try:
+                acquired = await redis_lock.acquire()
+            except RedisError as e:
+                # Redis indisponible : on se contente du verrou local
+                log.warning("oauth.lock_unavailable", "Verrou Redis indisponible pour le refresh OAuth", error=str(e))
+                acquired = False
+            try:
+                if await self._refreshed_elsewhere(credential, db, stale_token):
+                    return credential.access_token
+                return await self._refresh_google_token(credential)
+            finally:
+                if acquired:
+                    try:
+                        await redis_lock.release()
+                    except (LockError, RedisError):
+                        pass  # verrou expiré entre-temps : rien à libérer
+
+    @staticmethod
+    async def _refreshed_elsewhere(credential: OAuthCredential, db: AsyncSession, stale_token: str) -> bool:
+        await db.refresh(credential)
+        return credential.access_token != stale_token
+
+    # --- APPEL GOOGLE MESURÉ (latence par opération, span) ---
+    async def _timed_request(self, operation: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = clock.perf_counter()
+        status = "error"
+        with tracer.start_as_current_span(f"google.{operation}") as span:
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                status = str(response.status_code)
+                span.set_attribute("http.status_code", response.status_code)
+                return response
+            finally:
+                GOOGLE_REQUEST_SECONDS.labels(operation=operation, status=status).observe(clock.perf_counter() - started)
+
+    # --- APPEL GOOGLE AUTHENTIFIÉ (Avec retry sur 401) ---
+    async def _google_request(
+        self, method: str, url: str, cred: OAuthCredential, db: AsyncSession, operation: str = "calendar", **kwargs
+    ) -> httpx.Response:
+        token = await self._fresh_token(cred, db)
+        headers = {"Authorization": f"Bearer {token}"}
+        response = await self._timed_request(operation, method, url, headers=headers, **kwargs)
+
+        # --- DÉTECTION DU 401 (Révoqué ou expiré malgré tout) ---
+        if response.status_code == 401:
+            # On lance le refresh, puis on REJOUE la requête avec le nouveau token
+            GOOGLE_UNAUTHORIZED_RETRIES.inc()
+            new_token = await self._refresh_once(cred, db, token)
+            headers = {"Authorization": f"Bearer {new_token}"}
+            response = await self._timed_request(operation, method, url, headers=headers, **kwargs)
+        return response
+
+    async def _get_credential(self, user_id: UUID, db: AsyncSession) -> Optional[OAuthCredential]:
         statement = select(OAuthCredential).where(
             OAuthCredential.user_id == user_id,
             OAuthCredential.provider == "google"
         )
-        cred = db.exec(statement).first()
+        return (await db.exec(statement)).first()
+
+    # --- LECTURE DES ÉVÉNEMENTS (Depuis la copie locale) ---
+    async def get_upcoming_events(
+        self,
+        user_id: UUID,
+        db: AsyncSession,
+        user_timezone: Optional[str] = None,
+        now: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ):
+        """
+        Les événements sont servis depuis la table locale `calendar_events`.
+        On ne parle à Google que si la copie locale est trop ancienne (ou marquée
+        périmée par une notification push), et alors seulement pour les changements.
+
+        Avec `user_timezone` : TOUS les événements de la fenêtre de planification
+        (maintenant -> fin de l'horizon, dans le fuseau de l'utilisateur), pas seulement
+        les CALENDAR_UPCOMING_LIMIT prochains. `until` allonge la fenêtre (planning de plusieurs semaines).
+        """
+        with tracer.start_as_current_span("calendar.upcoming_events"):
+            window_start, window_end = (
+                planning_window(user_timezone, now) if user_timezone else (now or datetime.now(timezone.utc), None)
+            )
+            if until is not None:
+                window_end = until
+            state = await db.get(CalendarSyncState, user_id)
+            if self._needs_sync(state, window_end):
+                async with self._sync_lock(user_id):
+                    # Une synchro concurrente a pu rafraîchir la copie pendant l'attente du verrou
+                    state = await self._sync_state(user_id, db)
+                    if self._needs_sync(state, window_end):
+                        await self._sync_events(user_id, db, full=not self._covers(state, window_end), until=window_end)
+
+            statement = select(CalendarEvent).where(
+                CalendarEvent.user_id == user_id, CalendarEvent.end_at > window_start.astimezone(timezone.utc)
+            )
+            if window_end is None:
+                statement = statement.order_by(CalendarEvent.start_at).limit(settings.CALENDAR_UPCOMING_LIMIT)
+            else:
+                statement = (
+                    statement.where(CalendarEvent.start_at < window_end.astimezone(timezone.utc))
+                    .order_by(CalendarEvent.start_at)
+                    .limit(settings.CALENDAR_WINDOW_MAX_EVENTS)
+                )
+            return [self._to_clean_event(event) for event in (await db.exec(statement)).all()]
+
+    @staticmethod
+    def _covers(state: Optional[CalendarSyncState], window_end: Optional[datetime]) -> bool:
+        """La dernière synchro complète (bornée par timeMax) couvre-t-elle la fenêtre demandée ?"""
+        if window_end is None or state is None or state.sync_token is None:
+            return True
+        return state.synced_until is not None and _aware(state.synced_until) >= window_end
+
+    def _needs_sync(self, state: Optional[CalendarSyncState], window_end: Optional[datetime] = None) -> bool:
+        if state is None or state.last_synced_at is None or state.is_stale:
+            return True
+        if not self._covers(state, window_end):
+            return True
+        # Avec un canal push actif, Google nous prévient des changements : on peut attendre plus longtemps
+        if self._is_watched(state):
+            max_age = settings.CALENDAR_SYNC_MAX_AGE_WATCHED_SECONDS
+        else:
+            max_age = settings.CALENDAR_SYNC_MAX_AGE_SECONDS
+        return datetime.now(timezone.utc) - _aware(state.last_synced_at) > timedelta(seconds=max_age)
+
+    # --- SYNCHRO UNIQUE PAR UTILISATEUR ---
+    @asynccontextmanager
+    async def _sync_lock(self, user_id: UUID):
+        """
+        Une seule synchro à la fois par utilisateur (API et workers) : deux synchros concurrentes
+        inséreraient les mêmes lignes `calendar_events` / `calendar_sync_states` (IntegrityError).
+        Même schéma que le refresh OAuth : verrou asyncio dans le process, verrou Redis entre les process.
+        """
+        lock = self._sync_locks.get(user_id)
+        if lock is None:
+            lock = self._sync_locks[user_id] = asyncio.Lock()
+
+        async with lock:
+            redis_lock = get_redis().lock(
+                f"kairos:calendar-sync:{user_id}",
+                timeout=settings.CALENDAR_SYNC_LOCK_TIMEOUT_SECONDS,
+                blocking_timeout=settings.CALENDAR_SYNC_LOCK_WAIT_SECONDS,
+            )
+            try:
+                acquired = await redis_lock.acquire()
+            except RedisError as e:
+                # Redis indisponible : on se contente du verrou local
+                log.warning("calendar.sync_lock_unavailable", "Verrou Redis indisponible pour la synchro", error=str(e))
+                acquired = False
+            try:
+                yield
+            finally:
+                if acquired:
+                    try:
+                        await redis_lock.release()
+                    except (LockError, RedisError):
+                        pass  # verrou expiré entre-temps : rien à libérer
 
+    @staticmethod
+    async def _sync_state(user_id: UUID, db: AsyncSession) -> Optional[CalendarSyncState]:
+        """État de synchro relu en base (pas la copie de la session, peut-être écrite par un autre process)."""
+        state = await db.get(CalendarSyncState, user_id)
+        if state is not None:
+            await db.refresh(state)
+        return state
+
+    # --- SYNCHRONISATION INCRÉMENTALE (syncToken) ---
+    async def sync_events(
+        self, user_id: UUID, db: AsyncSession, full: bool = False, until: Optional[datetime] = None
+    ):
+        """Synchro avec Google, sous le verrou de synchro de l'utilisateur."""
+        async with self._sync_lock(user_id):
+            await self._sync_events(user_id, db, full=full, until=until)
+
+    async def _sync_events(
+        self, user_id: UUID, db: AsyncSession, full: bool = False, until: Optional[datetime] = None
+    ):
+        """
+        Première fois : synchro complète (toutes les pages), Google nous donne un `nextSyncToken`.
+        Ensuite : on renvoie ce token et Google ne renvoie QUE les événements modifiés/supprimés.
+        Si Google répond 410 (token expiré), on vide la copie locale et on refait une synchro complète.
+
+        La synchro complète est bornée (timeMin / timeMax) : quand la fenêtre de planification
+        dépasse `synced_until`, on en refait une (`full=True`).
+        """
+        cred = await self._get_credential(user_id, db)
         if not cred or not cred.access_token:
             raise HTTPException(status_code=401, detail="Non connecté à Google Calendar")
 
-        # 2. Préparation requête
-        url = "https://www.googleapis.com/calendar/v3/calendars/primary/events"
-        now = datetime.utcnow().isoformat() + "Z"
-        params = {
-            "timeMin": now,
-            "maxResults": 50,
-            "singleEvents": True,
-            "orderBy": "startTime",
-        }
-        
-        # 3. Tentative d'appel (Boucle de retry)
-        async with httpx.AsyncClient() as client:
-            headers = {"Authorization": f"Bearer {cred.access_token}"}
-            response = await client.get(url, params=params, headers=headers)
-
-            # --- DÉTECTION DU 401 (Expiré) ---
-            if response.status_code == 401:
-                # On lance le refresh
-                new_token = await self._refresh_google_token(cred, db)
-                # On met à jour les headers avec le nouveau token
-                headers = {"Authorization": f"Bearer {new_token}"}
-                # On REJOUE la requête
-                response = await client.get(url, params=params, headers=headers)
+        state = (await db.get(CalendarSyncState, user_id)) or CalendarSyncState(user_id=user_id)
+        url = f"{settings.GOOGLE_CALENDAR_API_URL}/calendars/primary/events"
+
+        full_sync = full or state.sync_token is None
+        params = {"singleEvents": True, "maxResults": settings.CALENDAR_SYNC_PAGE_SIZE, "fields": EVENT_LIST_FIELDS}
+        if full_sync:
+            # Note : syncToken est incompatible avec timeMin/timeMax/orderBy, on ne les met qu'à la synchro complète
+            now = datetime.now(timezone.utc)
+            synced_until = max(now + timedelta(days=settings.CALENDAR_SYNC_HORIZON_DAYS), until or now)
+            params["timeMin"] = _rfc3339(now - timedelta(days=settings.CALENDAR_SYNC_LOOKBACK_DAYS))
+            params["timeMax"] = _rfc3339(synced_until)
+            # Token renouvelé si besoin AVANT de vider la copie locale
+            await self._fresh_token(cred, db)
+            await self._clear_local_events(user_id, db)
+        else:
+            params["syncToken"] = state.sync_token
+
+        changes = 0
+        last_page = {}
+        try:
+            # Page par page : chaque page est appliquée dès réception (mémoire bornée, même pour un gros agenda)
+            async for page in self._event_pages(url, params, cred, db):
+                changes += await self._apply_changes(user_id, page.get("items", []), db)
+                last_page = page
+        except SyncTokenExpired:
+            log.info("calendar.sync_token_expired", "syncToken expiré (410), synchro complète", user_id=user_id)
+            state.sync_token = None
+            db.add(state)
+            await db.commit()
+            return await self._sync_events(user_id, db, until=until)
+
+        state.sync_token = last_page.get("nextSyncToken")
+        if full_sync:
+            state.synced_until = synced_until
+        state.last_synced_at = datetime.now(timezone.utc)
+        state.is_stale = False
+        db.add(state)
+        await db.commit()
+        log.info(
+            "calendar.synced", "Synchro Google Calendar",
+            user_id=user_id, mode="full" if full_sync else "incremental", changes=changes,
+        )
+
+        if settings.GOOGLE_CALENDAR_WATCH_ENABLED and not self._is_watched(state):
+            await self.watch_events(user_id, db)
 
+    async def _event_pages(
+        self, url: str, params: dict, cred: OAuthCredential, db: AsyncSession
+    ) -> AsyncIterator[dict]:
+        """Toutes les pages de events.list (suivi de nextPageToken), au fil de l'eau."""
+        page_token = None
+        while True:
+            page_params = dict(params, pageToken=page_token) if page_token else params
+            response = await self._google_request("GET", url, cred, db, operation="events.list", params=page_params)
+            if response.status_code == 410 and "syncToken" in params:
+                raise SyncTokenExpired()
             # Si ça échoue encore après le refresh, c'est une vraie erreur
             if response.status_code != 200:
                 raise HTTPException(status_code=response.status_code, detail="Erreur Google API")
 
-            data = response.json()
-
-        # 4. Nettoyage des données
-        clean_events = []
-        for item in data.get("items", []):
-            start = item.get("start", {}).get("dateTime") or item.get("start", {}).get("date")
-            end = item.get("end", {}).get("dateTime") or item.get("end", {}).get("date")
-            
-            clean_events.append({
-                "id": item.get("id"),
-                "title": item.get("summary", "Sans titre"),
-                "start": start,
-                "end": end,
-                "is_fixed": True,
-                "source": "google"
-            })
-            
-        return clean_events
+            page = response.json()
+            yield page
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
 
-    # --- CRÉATION D'ÉVÉNEMENT (Avec retry) ---
-    async def create_event(self, user_id: UUID, task: dict, db: Session):
-        statement = select(OAuthCredential).where(
-            OAuthCredential.user_id == user_id,
-            OAuthCredential.provider == "google"
+    async def _apply_changes(self, user_id: UUID, items: List[dict], db: AsyncSession) -> int:
+        """Upsert des événements reçus, suppression des événements annulés."""
+        ids = [item["id"] for item in items if item.get("id")]
+        if not ids:
+            return 0
+        statement = select(CalendarEvent).where(
+            CalendarEvent.user_id == user_id, CalendarEvent.event_id.in_(ids)
         )
-        cred = db.exec(statement).first()
-        if not cred: return
+        existing = {event.event_id: event for event in (await db.exec(statement)).all()}
+        for item in items:
+            event_id = item.get("id")
+            if not event_id:
+                continue
+            current = existing.get(event_id)
+            if item.get("status") == "cancelled":
+                if current is not None:
+                    await db.delete(current)
+                continue
+            fields = self._event_fields(item)
+            if fields is None:
+                continue
+            if current is None:
+                current = CalendarEvent(user_id=user_id, event_id=event_id, **fields)
+                existing[event_id] = current
+            else:
+                for key, value in fields.items():
+                    setattr(current, key, value)
+            db.add(current)
+        return len(ids)
+
+    async def _clear_local_events(self, user_id: UUID, db: AsyncSession):
+        await db.execute(delete(CalendarEvent).where(CalendarEvent.user_id == user_id))
 
-        url = "https://www.googleapis.com/calendar/v3/calendars/primary/events"
-        
+    # --- NOTIFICATIONS PUSH (optionnel) ---
+    def _is_watched(self, state: CalendarSyncState) -> bool:
+        return state.channel_expires_at is not None and _aware(state.channel_expires_at) > datetime.now(timezone.utc)
+
+    async def watch_events(self, user_id: UUID, db: AsyncSession):
+        """
+        Abonne notre webhook aux changements du calendrier principal.
+        Google appellera POST /api/v1/calendar/webhook à chaque modification.
+        """
+        cred = await self._get_credential(user_id, db)
+        if not cred:
+            return
+        url = f"{settings.GOOGLE_CALENDAR_API_URL}/calendars/primary/events/watch"
         body = {
+            "id": str(uuid4()),
+            "type": "web_hook",
+            "address": f"{settings.BASE_URL}/api/v1/calendar/webhook",
+            "token": str(user_id),
+        }
+        response = await self._google_request("POST", url, cred, db, operation="events.watch", json=body)
+        if response.status_code != 200:
+            log.warning(
+                "calendar.watch_refused", "Canal push Google refusé",
+                user_id=user_id, status=response.status_code, body=response.text[:200],
+            )
+            return
+
+        data = response.json()
+        state = (await db.get(CalendarSyncState, user_id)) or CalendarSyncState(user_id=user_id)
+        state.channel_id = data.get("id")
+        state.channel_resource_id = data.get("resourceId")
+        if data.get("expiration"):
+            state.channel_expires_at = datetime.fromtimestamp(int(data["expiration"]) / 1000, timezone.utc)
+        db.add(state)
+        await db.commit()
+
+    async def mark_stale(self, user_id: UUID, channel_id: str, db: AsyncSession) -> bool:
+        """Appelé par le webhook : la prochaine lecture repassera par Google."""
+        state = await db.get(CalendarSyncState, user_id)
+        if state is None or state.channel_id != channel_id:
+            return False
+        state.is_stale = True
+        db.add(state)
+        await db.commit()
+        return True
+
+    # --- CONVERSIONS ---
+    @staticmethod
+    def _event_fields(item: dict) -> Optional[dict]:
+        start = item.get("start", {}).get("dateTime") or item.get("start", {}).get("date")
+        end = item.get("end", {}).get("dateTime") or item.get("end", {}).get("date")
+        if not start or not end:
+            return None
+        return {
+            "title": item.get("summary", "Sans titre"),
+            "start": start,
+            "end": end,
+            "start_at": _to_utc(start),
+            "end_at": _to_utc(end),
+        }
+
+    @staticmethod
+    def _to_clean_event(event: CalendarEvent) -> dict:
+        return {
+            "id": event.event_id,
+            "title": event.title,
+            "start": event.start,
+            "end": event.end,
+            "is_fixed": True,
+            "source": "google"
+        }
+
+    # --- CRÉATION D'ÉVÉNEMENT (Avec retry) ---
+    @staticmethod
+    def _event_body(task: dict) -> dict:
+        return {
             "summary": f"⚡ {task['title']}", 
             "description": f"Généré par Kairos AI.\nRaison: {task.get('reasoning', 'Aucune')}",
             "start": {"dateTime": task['start'], "timeZone": "Europe/Paris"},
             "end": {"dateTime": task['end'], "timeZone": "Europe/Paris"}
         }
 
-        async with httpx.AsyncClient() as client:
-            headers = {"Authorization": f"Bearer {cred.access_token}"}
-            response = await client.post(url, json=body, headers=headers)
+    async def create_event(self, user_id: UUID, task: dict, db: AsyncSession):
+        cred = await self._get_credential(user_id, db)
+        if not cred: return
 
-            # --- DÉTECTION DU 401 POUR L'ÉCRITURE AUSSI ---
-            if response.status_code == 401:
-                new_token = await self._refresh_google_token(cred, db)
-                headers = {"Authorization": f"Bearer {new_token}"}
-                response = await client.post(url, json=body, headers=headers)
+        url = f"{settings.GOOGLE_CALENDAR_API_URL}/calendars/primary/events"
+        body = self._event_body(task)
+
+        response = await self._google_request("POST", url, cred, db, operation="events.insert", json=body)
+
+        if response.status_code == 200:
+            log.info("calendar.event_created", "Événement ajouté à Google Calendar", user_id=user_id)
+            # On l'ajoute tout de suite à la copie locale (la prochaine synchro le confirmera)
+            await self._apply_changes(user_id, [response.json()], db)
+            await db.commit()
+        else:
+            log.error("calendar.event_failed", "Erreur Google", user_id=user_id, status=response.status_code, body=response.text[:200])
+
+    # --- CRÉATION EN MASSE (POST /calendar/sync) ---
+    async def create_events_bulk(self, user_id: UUID, tasks: List[dict], db: AsyncSession) -> List[dict]:
+        """
+        Pousse plusieurs tâches dans Google en parallèle (sémaphore borné).
+        Les credentials sont lus une seule fois ; les 429/5xx sont rejoués avec un backoff
+        exponentiel. Retourne un rapport par tâche : status, nombre de tentatives, id Google.
+        """
+        cred = await self._get_credential(user_id, db)
+        if not cred or not cred.access_token:
+            return [
+                {"title": task["title"], "status": "failed", "attempts": 0, "event_id": None,
+                 "error": "Non connecté à Google Calendar"}
+                for task in tasks
+            ]
+
+        url = f"{settings.GOOGLE_CALENDAR_API_URL}/calendars/primary/events"
+        semaphore = asyncio.Semaphore(settings.GOOGLE_BULK_CONCURRENCY)
+        await self._fresh_token(cred, db)
+
+        async def push(task: dict) -> dict:
+            report = {"title": task["title"], "status": "failed", "attempts": 0, "event_id": None, "error": None}
+            body = self._event_body(task)
+            token = cred.access_token
+            refreshed = False
+            async with semaphore:
+                while report["attempts"] < settings.GOOGLE_BULK_MAX_ATTEMPTS:
+                    report["attempts"] += 1
+                    try:
+                        response = await self._timed_request(
+                            "events.insert", "POST", url, json=body, headers={"Authorization": f"Bearer {token}"}
+                        )
+                    except httpx.TransportError as e:
+                        report["error"] = f"Réseau : {e.__class__.__name__}"
+                        await asyncio.sleep(_backoff_delay(report["attempts"]))
+                        continue
+
+                    if response.status_code == 401 and not refreshed:
+                        # Un seul refresh même si plusieurs requêtes reçoivent un 401 en même temps
+                        GOOGLE_UNAUTHORIZED_RETRIES.inc()
+                        token = await self._refresh_once(cred, db, token)
+                        refreshed = True
+                        continue
+                    if response.status_code in RETRYABLE_STATUSES:
+                        report["error"] = f"Google {response.status_code}"
+                        await asyncio.sleep(_backoff_delay(report["attempts"], response.headers.get("Retry-After")))
+                        continue
+                    if response.status_code == 200:
+                        event = response.json()
+                        created.append(event)
+                        report.update(status="created", error=None, event_id=event.get("id"))
+                    else:
+                        report["error"] = f"Google {response.status_code}: {response.text[:200]}"
+                    break
+            return report
+
+        created: List[dict] = []
+        reports = await asyncio.gather(*(push(task) for task in tasks))
+
+        # Mise à jour de la copie locale en une fois (la session DB n'est pas partagée entre coroutines)
+        if created:
+            await self._apply_changes(user_id, created, db)
+            await db.commit()
+
+        log.info("calendar.bulk_created", "Événements créés dans Google Calendar", user_id=user_id, created=len(created), total=len(tasks))
+        return list(reports)
+
+
+def _rfc3339(value: datetime) -> str:
+    return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _aware(value: datetime) -> datetime:
+    """Certains drivers rendent des datetimes naïfs : ils sont stockés en UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _to_utc(value: str) -> datetime:
+    """dateTime Google (ou date "journée entière") -> datetime UTC."""
+    if len(value) == 10:
+        return datetime.combine(date.fromisoformat(value), time.min, tzinfo=timezone.utc)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
 
-            if response.status_code == 200:
-                print(f"✅ Google Calendar: Ajout de {task['title']}")
-            else:
-                print(f"❌ Erreur Google ({response.status_code}): {response.text}")
 
 calendar_service = GoogleCalendarService()
\ No newline at end of file
@@ -0,0 +1,143 @@
+import hashlib
+import json
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.metrics import OPTIMIZE_COALESCED
+from app.core.redis import get_redis
+from app.schemas.ai import OptimizationRequest
+from app.services.ai_engine.result_cache import canonical_events, canonical_tasks
+
+log = get_logger("inflight")
+
+KEY_PREFIX = "kairos:inflight"
+# En-tête Celery : clé du registre à libérer quand la tâche se termine (voir workers/ai_task.py)
+INFLIGHT_HEADER = "kairos_inflight_key"
+
+# Réserve la clé pour `task_id` si elle est libre ; sinon renvoie la valeur déjà enregistrée
+CLAIM_LUA = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    return current
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return false
+"""
+
+# Libère la clé seulement si elle désigne encore cette tâche (valeur "task_id:empreinte")
+RELEASE_LUA = """
+local current = redis.call('GET', KEYS[1])
+if current and string.sub(current, 1, #ARGV[1] + 1) == ARGV[1] .. ':' then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _digest(payload: dict) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def body_fingerprint(request: OptimizationRequest) -> str:
+    """Empreinte du corps de la demande (ce que le client envoie et renvoie en cas de retry)."""
+    return _digest({
+        "tasks": canonical_tasks(request.tasks),
+        "timezone": request.user_timezone,
+        "engine": request.engine,
+        "stream": request.stream,
+    })
+
+
+def request_fingerprint(google_events: List[dict], request: OptimizationRequest) -> str:
+    """Corps + agenda (même normalisation que le cache des plannings) : ce qui détermine le planning."""
+    return _digest({"body": body_fingerprint(request), "events": canonical_events(google_events)})
+
+
+class InflightRegistry:
+    """
+    Regroupement des demandes d'optimisation identiques encore en cours (double tap, retry client).
+
+    Registre Redis par utilisateur -> `task_id` de la tâche Celery déjà envoyée. Une demande
+    qui retrouve son entrée reçoit ce `task_id` au lieu d'envoyer une nouvelle tâche.
+    - sans en-tête : clé = empreinte de la demande et de l'agenda ; entrée libérée par le
+      worker à la fin de la tâche, TTL = attente max en file + time_limit (filet si le worker meurt) ;
+    - `Idempotency-Key` : entrée gardée aussi longtemps que le résultat (CELERY_RESULT_EXPIRES_SECONDS),
+      la même clé renvoie toujours le même `task_id` ; réutilisée avec un autre corps -> 422.
+    Redis indisponible : pas de regroupement, la demande part normalement.
+    """
+
+    def __init__(self):
+        self._claim = None
+        self._release = None
+
+    async def claim(
+        self,
+        user_id: UUID,
+        google_events: List[dict],
+        request: OptimizationRequest,
+        task_id: str,
+        time_limit: int,
+        idempotency_key: Optional[str] = None,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Réserve l'entrée de la demande pour `task_id`.
+
+        Renvoie (clé réservée ou None, `task_id` déjà en vol si c'est un doublon). La clé est à
+        libérer si l'envoi échoue, et par le worker en fin de tâche (sauf Idempotency-Key).
+        """
+        if not settings.OPTIMIZE_COALESCING_ENABLED:
+            return None, None
+        if idempotency_key:
+            key = f"{KEY_PREFIX}:{user_id}:key:{hashlib.sha256(idempotency_key.encode()).hexdigest()[:32]}"
+            fingerprint = body_fingerprint(request)
+            ttl = settings.CELERY_RESULT_EXPIRES_SECONDS
+        else:
+            fingerprint = request_fingerprint(google_events, request)
+            key = f"{KEY_PREFIX}:{user_id}:{fingerprint}"
+            ttl = settings.OPTIMIZE_COALESCE_QUEUE_GRACE_SECONDS + time_limit
+
+        redis = get_redis()
+        if self._claim is None:
+            self._claim = redis.register_script(CLAIM_LUA)
+        try:
+            current = await self._claim(keys=[key], args=[f"{task_id}:{fingerprint}", ttl], client=redis)
+        except RedisError as e:
+            log.warning("inflight.unavailable", "Registre des demandes en cours indisponible", error=str(e))
+            return None, None
+        if current is None:
+            return key, None
+
+        existing_id, existing_fingerprint = self._parse(current)
+        if existing_fingerprint != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key déjà utilisée pour une autre demande")
+        reason = "idempotency_key" if idempotency_key else "fingerprint"
+        OPTIMIZE_COALESCED.labels(reason=reason).inc()
+        log.info("inflight.coalesced", "Demande identique déjà en cours", task_id=existing_id, reason=reason)
+        return None, existing_id
+
+    async def release(self, key: str, task_id: str) -> None:
+        """Fin de tâche (worker) ou envoi impossible (API) : une nouvelle demande identique relancera un calcul."""
+        redis = get_redis()
+        if self._release is None:
+            self._release = redis.register_script(RELEASE_LUA)
+        try:
+            await self._release(keys=[key], args=[task_id], client=redis)
+        except RedisError as e:
+            # L'entrée expirera d'elle-même (TTL)
+            log.warning("inflight.release_failed", "Entrée du registre non libérée", key=key, error=str(e))
+
+    @staticmethod
+    def _parse(value) -> Tuple[str, str]:
+        if isinstance(value, bytes):
+            value = value.decode()
+        task_id, _, fingerprint = value.rpartition(":")
+        return task_id, fingerprint
+
+
+inflight_requests = InflightRegistry()
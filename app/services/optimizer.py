@@ -0,0 +1,253 @@
+from datetime import datetime, date, time, timedelta
+from typing import List, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from app.core.logs import get_logger
+from app.schemas.ai import ScheduledItem, TaskRequest
+from app.services.interval_index import BusyIntervalIndex
+
+log = get_logger("solver")
+
+# Fenêtre "jour" : on ne planifie rien entre 23h et 07h (heure locale de l'utilisateur)
+DAY_START = time(7, 0)
+DAY_END = time(23, 0)
+
+# Horizon de planification et granularité des créneaux
+HORIZON_DAYS = 7
+SLOT_MINUTES = 5
+
+PREFERRED_TIME_FORMATS = ("%H:%M", "%H:%M:%S", "%Hh%M", "%Hh")
+
+
+def resolve_timezone(user_timezone: str) -> ZoneInfo:
+    """Retourne le fuseau de l'utilisateur, ou UTC s'il est inconnu."""
+    try:
+        return ZoneInfo(user_timezone)
+    except Exception:
+        log.warning("solver.unknown_timezone", "Fuseau inconnu, fallback sur UTC", timezone=user_timezone)
+        return ZoneInfo("UTC")
+
+
+def parse_event_datetime(value: Optional[str], user_tz: ZoneInfo) -> Optional[datetime]:
+    """
+    Convertit une date Google (dateTime ISO 8601 ou date "YYYY-MM-DD") en datetime
+    dans le fuseau de l'utilisateur. Retourne None pour les dates "journée entière".
+    """
+    if not value or len(value) == 10:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=user_tz)
+    return parsed.astimezone(user_tz)
+
+
+def parse_preferred_time(value: Optional[str]) -> Optional[time]:
+    """Lit une heure préférée envoyée par le mobile (ex: "14:00", "14h30")."""
+    if not value:
+        return None
+    for fmt in PREFERRED_TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def _all_day_start(value: Optional[str], user_tz: ZoneInfo) -> Optional[datetime]:
+    """Minuit (heure locale) pour un événement "journée entière" ("YYYY-MM-DD")."""
+    try:
+        return datetime.combine(date.fromisoformat(value[:10]), time.min, tzinfo=user_tz)
+    except (TypeError, ValueError):
+        return None
+
+
+def round_up(moment: datetime, minutes: int) -> datetime:
+    """Arrondit au prochain multiple de `minutes` (ex: 10:02 -> 10:05)."""
+    moment = moment.replace(second=0, microsecond=0) + (
+        timedelta(minutes=1) if moment.second or moment.microsecond else timedelta(0)
+    )
+    remainder = moment.minute % minutes
+    if remainder:
+        moment += timedelta(minutes=minutes - remainder)
+    return moment
+
+
+def busy_index(current_events: List[dict], user_tz: ZoneInfo) -> BusyIntervalIndex:
+    """Construit l'index du temps occupé à partir des événements Google nettoyés."""
+    busy = []
+    for event in current_events:
+        start = parse_event_datetime(event.get("start"), user_tz)
+        end = parse_event_datetime(event.get("end"), user_tz)
+        # Les événements "journée entière" (anniversaires, jours fériés...) ne bloquent pas l'agenda
+        if start is not None and end is not None and end > start:
+            busy.append((start, end, event.get("title")))
+    return BusyIntervalIndex(busy)
+
+
+def event_items(
+    current_events: List[dict], user_tz: ZoneInfo, now_local: datetime
+) -> List[Tuple[datetime, ScheduledItem]]:
+    """Les événements Google, tels quels, avec leur clé de tri chronologique."""
+    items = []
+    for event in current_events:
+        start = parse_event_datetime(event.get("start"), user_tz)
+        sort_key = start or _all_day_start(event.get("start"), user_tz) or now_local
+        items.append((sort_key, ScheduledItem(
+            title=event.get("title", "Sans titre"),
+            start=event.get("start") or "",
+            end=event.get("end") or "",
+            type="event",
+        )))
+    return items
+
+
+class DeterministicScheduler:
+    """
+    Planificateur déterministe : place les tâches dans les trous de l'agenda
+    en quelques millisecondes, sans appel au LLM.
+
+    Règles (identiques à celles données à Gemini) :
+    1. Rien avant "maintenant", rien la nuit (23h-07h).
+    2. Une tâche avec 'preferred_time' est placée à cette heure précise si le créneau est libre,
+       sinon au prochain créneau libre juste après.
+    3. Les autres tâches sont insérées par priorité décroissante au premier créneau libre.
+    4. Les événements Google sont fixes.
+    """
+
+    def __init__(self, horizon_days: int = HORIZON_DAYS, slot_minutes: int = SLOT_MINUTES):
+        self.horizon_days = horizon_days
+        self.slot_minutes = slot_minutes
+
+    def schedule(
+        self,
+        current_events: List[dict],
+        tasks_todo: List[Union[TaskRequest, dict]],
+        user_timezone: str = "UTC",
+        now: Optional[datetime] = None,
+    ) -> List[ScheduledItem]:
+        user_tz = resolve_timezone(user_timezone)
+        now_local = (now or datetime.now(user_tz)).astimezone(user_tz)
+        earliest = round_up(now_local, self.slot_minutes)
+        horizon_end = self.horizon_end(now_local)
+
+        # 1. Les événements fixes deviennent du temps occupé
+        items = event_items(current_events, user_tz, now_local)
+        timeline = busy_index(current_events, user_tz)
+
+        # 2. Ordre de placement : d'abord les heures préférées (ancrées), puis le reste par priorité
+        tasks = [TaskRequest(**t) if isinstance(t, dict) else t for t in tasks_todo]
+        for task in self.placement_order(tasks):
+            placement = self.place(task, timeline, earliest, horizon_end, now_local)
+            if placement is None:
+                log.warning("solver.no_slot", "Aucun créneau pour la tâche", task=task.title, duration=task.duration)
+                continue
+            start, reasoning = placement
+            end = start + timedelta(minutes=task.duration)
+            timeline.add(start, end, task.title)
+            items.append((start, ScheduledItem(
+                title=task.title,
+                start=start.isoformat(),
+                end=end.isoformat(),
+                type="task",
+                reasoning=reasoning,
+            )))
+
+        items.sort(key=lambda pair: pair[0])
+        return [item for _, item in items]
+
+    def horizon_end(self, now_local: datetime) -> datetime:
+        return datetime.combine(
+            now_local.date() + timedelta(days=self.horizon_days), DAY_END, tzinfo=now_local.tzinfo
+        )
+
+    @staticmethod
+    def placement_order(tasks: list) -> list:
+        """Heures préférées (ancrées) d'abord, puis le reste ; priorité décroissante dans chaque groupe."""
+        anchored = [t for t in tasks if parse_preferred_time(t.preferred_time)]
+        flexible = [t for t in tasks if not parse_preferred_time(t.preferred_time)]
+        anchored.sort(key=lambda t: -t.priority)
+        flexible.sort(key=lambda t: -t.priority)
+        return anchored + flexible
+
+    def place(
+        self,
+        task: TaskRequest,
+        timeline: BusyIntervalIndex,
+        earliest: datetime,
+        horizon_end: datetime,
+        now_local: datetime,
+    ) -> Optional[Tuple[datetime, str]]:
+        duration = timedelta(minutes=task.duration)
+        preferred = parse_preferred_time(task.preferred_time)
+
+        if preferred is None:
+            start = self.next_free_slot(timeline, earliest, duration, horizon_end)
+            if start is None:
+                return None
+            return start, f"Priorité {task.priority} : premier créneau libre disponible."
+
+        target = datetime.combine(now_local.date(), preferred, tzinfo=now_local.tzinfo)
+        if target < now_local:
+            # CAS C : l'heure préférée est déjà passée -> prochain créneau disponible
+            start = self.next_free_slot(timeline, earliest, duration, horizon_end)
+            if start is None:
+                return None
+            return start, f"Heure préférée ({task.preferred_time}) déjà passée : prochain créneau libre."
+
+        start = self.next_free_slot(timeline, target, duration, horizon_end)
+        if start is None:
+            return None
+        if start == target:
+            # CAS A : le créneau préféré est libre
+            return start, f"Planifiée à l'heure préférée ({task.preferred_time})."
+        day_start = datetime.combine(target.date(), DAY_START, tzinfo=target.tzinfo)
+        day_end = datetime.combine(target.date(), DAY_END, tzinfo=target.tzinfo)
+        if target < day_start or target + duration > day_end:
+            # CAS D : la tâche ne tient pas avant la nuit (ou l'heure préférée est déjà la nuit)
+            return start, (
+                f"Heure préférée ({task.preferred_time}) : la tâche ne tient pas hors de la nuit "
+                f"({DAY_END.strftime('%H:%M')}-{DAY_START.strftime('%H:%M')}), premier créneau libre ensuite."
+            )
+        # CAS B : créneau déjà pris -> juste après
+        return start, f"Heure préférée ({task.preferred_time}) occupée : premier créneau libre juste après."
+
+    def next_free_slot(
+        self,
+        timeline: BusyIntervalIndex,
+        start: datetime,
+        duration: timedelta,
+        horizon_end: datetime,
+    ) -> Optional[datetime]:
+        """Premier début >= start où la tâche tient entière, hors nuit et hors temps occupé."""
+        tz = start.tzinfo
+        day_length = datetime.combine(date.min, DAY_END) - datetime.combine(date.min, DAY_START)
+        if duration <= timedelta(0) or duration > day_length:
+            return None
+
+        while start < horizon_end:
+            day_start = datetime.combine(start.date(), DAY_START, tzinfo=tz)
+            day_end = datetime.combine(start.date(), DAY_END, tzinfo=tz)
+            if start < day_start:
+                start = day_start
+            if start + duration > day_end:
+                start = datetime.combine(start.date() + timedelta(days=1), DAY_START, tzinfo=tz)
+                continue
+
+            conflict = timeline.conflict(start, start + duration)
+            if conflict is None:
+                return start
+            start = round_up(timeline.busy_until(conflict, tz), self.slot_minutes)
+        return None
+
+
+deterministic_scheduler = DeterministicScheduler()
+
+
+def planning_window(user_timezone: str, now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """[maintenant, fin de l'horizon] dans le fuseau de l'utilisateur : les événements utiles au planning."""
+    user_tz = resolve_timezone(user_timezone)
+    now_local = now.astimezone(user_tz) if now else datetime.now(user_tz)
+    return now_local, deterministic_scheduler.horizon_end(now_local)
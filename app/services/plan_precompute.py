@@ -0,0 +1,227 @@
+import hashlib
+import json
+import math
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from redis.exceptions import RedisError
+from sqlalchemy import or_
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.redis import get_redis
+from app.db.session import SessionLocal
+from app.models.oauth import OAuthCredential
+from app.models.user import User
+from app.schemas.ai import OptimizationRequest, ScheduledItem
+from app.services.ai_engine.optimizer import ai_optimizer
+from app.services.ai_engine.result_cache import canonical_events, canonical_tasks
+from app.services.calendar_service import calendar_service
+from app.services.optimizer import DAY_START, parse_event_datetime, resolve_timezone
+
+log = get_logger("precompute")
+
+KEY_PREFIX = "kairos:precompute"
+REQUESTS_KEY = f"{KEY_PREFIX}:requests"  # hash user_id -> dernière demande IA (tâches, fuseau, moteur)
+PLAN_PREFIX = f"{KEY_PREFIX}:plan"  # un planning pré-calculé par utilisateur
+DISPATCHED_PREFIX = f"{KEY_PREFIX}:dispatched"  # utilisateurs déjà envoyés aux workers cette nuit
+
+
+def _digest(value) -> str:
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _event_end_ts(event: dict, user_tz) -> float:
+    end = event.get("end")
+    moment = parse_event_datetime(end, user_tz)
+    if moment is None and end:
+        try:  # journée entière : "YYYY-MM-DD" (exclusif), minuit local
+            moment = datetime.combine(date.fromisoformat(end[:10]), datetime.min.time(), tzinfo=user_tz)
+        except ValueError:
+            moment = None
+    return moment.timestamp() if moment is not None else math.inf
+
+
+def _calendar_entries(current_events: List[dict], user_tz) -> List[List]:
+    """[fin, empreinte] par événement : on pourra ignorer ceux déjà terminés au moment de servir."""
+    return [
+        [_event_end_ts(event, user_tz), _digest(event)]
+        for event in canonical_events(current_events)
+    ]
+
+
+def _calendar_fingerprint(entries: List[List], since_ts: float) -> str:
+    return _digest(sorted(entry_digest for end_ts, entry_digest in entries if end_ts > since_ts))
+
+
+def _inputs_fingerprint(tasks_todo: list, user_timezone: str, engine: str) -> str:
+    return _digest({"tasks": canonical_tasks(tasks_todo), "timezone": user_timezone, "engine": engine})
+
+
+def next_day_start(user_tz, now: Optional[datetime] = None) -> datetime:
+    """Début de la prochaine journée de l'utilisateur (DAY_START local) : aujourd'hui si on est avant."""
+    now_local = (now or datetime.now(user_tz)).astimezone(user_tz)
+    start = datetime.combine(now_local.date(), DAY_START, tzinfo=user_tz)
+    return start if now_local < start else start + timedelta(days=1)
+
+
+class PlanPrecompute:
+    """
+    Pré-calcul, pendant la nuit, du planning de la journée suivante des utilisateurs actifs.
+
+    - `/optimize/start` mémorise la dernière demande IA de chaque utilisateur (ses tâches) ;
+    - Celery beat appelle `select_batch()` toutes les PRECOMPUTE_TICK_MINUTES pendant la fenêtre
+      creuse : un petit lot, par ordre de priorité des abonnements et borné par abonnement,
+      étalé sur la durée du tick (pas de pic sur les quotas Google / Gemini) ;
+    - le worker lit l'agenda, calcule le planning à partir du début de journée et le stocke
+      avec l'empreinte de l'agenda et des tâches ;
+    - le matin, `/optimize/start` sert ce planning si l'empreinte correspond toujours
+      (événements encore à venir, tâches, fuseau, moteur) et qu'aucune tâche n'est déjà passée.
+    """
+
+    def __init__(self):
+        self.served = 0
+        self.stale = 0
+
+    # --- CÔTÉ API ---
+    async def remember(self, user_id: UUID, request: OptimizationRequest) -> None:
+        entry = json.dumps({
+            "tasks": [task.dict() for task in request.tasks],
+            "timezone": request.user_timezone,
+            "engine": request.engine,
+            "seen_at": time.time(),
+        })
+        try:
+            await get_redis().hset(REQUESTS_KEY, str(user_id), entry)
+        except RedisError as e:
+            log.warning("precompute.remember_failed", "Demande non mémorisée", user_id=user_id, error=str(e))
+
+    async def get_plan(
+        self, user_id: UUID, current_events: List[dict], request: OptimizationRequest
+    ) -> Optional[List[ScheduledItem]]:
+        """Planning pré-calculé encore valable pour cette demande (None sinon)."""
+        try:
+            raw = await get_redis().get(f"{PLAN_PREFIX}:{user_id}")
+        except RedisError as e:
+            log.warning("precompute.unavailable", "Pré-calcul indisponible", error=str(e))
+            return None
+        if raw is None:
+            return None
+
+        entry = json.loads(raw)
+        user_tz = resolve_timezone(request.user_timezone)
+        now = datetime.now(user_tz)
+        schedule = [ScheduledItem(**item) for item in entry["schedule"]]
+        valid = (
+            entry["day"] <= now.date().isoformat()  # pas avant la journée prévue
+            and entry["inputs"] == _inputs_fingerprint(request.tasks, request.user_timezone, request.engine)
+            # Les événements déjà terminés ne comptent plus, des deux côtés
+            and _calendar_fingerprint(entry["calendar"], now.timestamp())
+            == _calendar_fingerprint(_calendar_entries(current_events, user_tz), now.timestamp())
+            and all(
+                (parse_event_datetime(item.start, user_tz) or now) >= now
+                for item in schedule if item.type == "task"
+            )
+        )
+        if not valid:
+            self.stale += 1
+            return None
+        self.served += 1
+        log.info("precompute.served", "Planning de la nuit servi", user_id=user_id)
+        return schedule
+
+    # --- CÔTÉ BEAT ---
+    async def select_batch(self, now: Optional[datetime] = None) -> List[Tuple[str, float]]:
+        """
+        Lot du tick courant : [(user_id, délai en secondes)], délais répartis sur tout le tick.
+        Un utilisateur n'est envoyé qu'une fois par nuit.
+        """
+        now = now or datetime.now(timezone.utc)
+        dispatched_key = f"{DISPATCHED_PREFIX}:{now.date().isoformat()}"
+        redis = get_redis()
+        stored = await redis.hgetall(REQUESTS_KEY)
+        dispatched = {member.decode() for member in await redis.smembers(dispatched_key)}
+
+        active_since = now.timestamp() - settings.PRECOMPUTE_ACTIVE_DAYS * 86400
+        inactive, candidates = [], []
+        for user_id, raw in stored.items():
+            user_id = user_id.decode()
+            if json.loads(raw)["seen_at"] < active_since:
+                inactive.append(user_id)
+            elif user_id not in dispatched:
+                candidates.append(UUID(user_id))
+        if inactive:
+            await redis.hdel(REQUESTS_KEY, *inactive)
+        if not candidates:
+            return []
+
+        tiers = await self._eligible_tiers(candidates, now)
+        selected: List[str] = []
+        for tier, limit in settings.PRECOMPUTE_TIER_PER_TICK.items():
+            room = max(0, settings.PRECOMPUTE_MAX_PER_TICK - len(selected))
+            selected += [user_id for user_id, user_tier in tiers.items() if user_tier == tier][:min(limit, room)]
+        if not selected:
+            return []
+
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.sadd(dispatched_key, *selected)
+            pipe.expire(dispatched_key, 2 * 86400)
+            await pipe.execute()
+        spacing = settings.PRECOMPUTE_TICK_MINUTES * 60 / len(selected)
+        log.info("precompute.dispatch", "Plannings programmés", selected=len(selected), pending=len(candidates))
+        return [(user_id, round(i * spacing, 1)) for i, user_id in enumerate(selected)]
+
+    @staticmethod
+    async def _eligible_tiers(user_ids: List[UUID], now: datetime) -> Dict[str, str]:
+        """Utilisateurs actifs dont l'accès Google est encore utilisable -> abonnement."""
+        statement = (
+            select(User.id, User.subscription_tier)
+            .join(OAuthCredential, OAuthCredential.user_id == User.id)
+            .where(
+                User.id.in_(user_ids),
+                User.is_active,
+                OAuthCredential.provider == "google",
+                # Renouvelable, ou pas encore expiré : pas de réauthentification nécessaire
+                or_(OAuthCredential.refresh_token.is_not(None), OAuthCredential.expires_at > now.timestamp()),
+            )
+        )
+        async with SessionLocal() as db:
+            rows = (await db.exec(statement)).all()
+        return {str(user_id): tier for user_id, tier in rows}
+
+    # --- CÔTÉ WORKER ---
+    async def precompute(self, user_id: UUID) -> bool:
+        raw = await get_redis().hget(REQUESTS_KEY, str(user_id))
+        if raw is None:
+            return False
+        request = json.loads(raw)
+        user_tz = resolve_timezone(request["timezone"])
+        day_start = next_day_start(user_tz)
+
+        async with SessionLocal() as db:
+            current_events = await calendar_service.get_upcoming_events(
+                user_id=user_id, db=db, user_timezone=request["timezone"], now=day_start
+            )
+        schedule = await ai_optimizer.optimize_schedule(
+            current_events=current_events,
+            tasks_todo=request["tasks"],
+            user_timezone=request["timezone"],
+            engine=request["engine"],
+            use_cache=False,
+            now=day_start,
+        )
+        entry = json.dumps({
+            "day": day_start.date().isoformat(),
+            "inputs": _inputs_fingerprint(request["tasks"], request["timezone"], request["engine"]),
+            "calendar": _calendar_entries(current_events, user_tz),
+            "schedule": [item.dict() for item in schedule],
+        })
+        await get_redis().set(f"{PLAN_PREFIX}:{user_id}", entry, ex=settings.PRECOMPUTE_PLAN_TTL_HOURS * 3600)
+        return True
+
+
+plan_precompute = PlanPrecompute()
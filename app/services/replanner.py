@@ -0,0 +1,222 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import or_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.tracing import tracer
+from app.models.task import ScheduledSlot, Task
+from app.schemas.planning import CalendarChange, PlannedTask, ReplanRequest
+from app.services.calendar_service import calendar_service
+from app.services.optimizer import DAY_START, DeterministicScheduler, busy_index, resolve_timezone, round_up
+
+log = get_logger("planning")
+
+
+def _aware(value: datetime) -> datetime:
+    """Certains drivers (SQLite) rendent des datetimes naïfs : ils sont stockés en UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _utc(value: datetime) -> datetime:
+    """Les créneaux sont écrits en UTC (SQLite garde l'heure murale et perd le fuseau)."""
+    return value.astimezone(timezone.utc)
+
+
+def apply_calendar_changes(events: List[dict], changes: List[CalendarChange]) -> List[dict]:
+    """Agenda local + changements connus du mobile mais pas encore synchronisés (par event_id)."""
+    if not changes:
+        return events
+    by_id = {event["id"]: event for event in events}
+    for change in changes:
+        if change.deleted:
+            by_id.pop(change.event_id, None)
+        elif change.start and change.end:
+            by_id[change.event_id] = {
+                "id": change.event_id, "title": change.title, "start": change.start, "end": change.end,
+                "is_fixed": True, "source": "google",
+            }
+    return list(by_id.values())
+
+
+class IncrementalPlanner:
+    """
+    Planning persistant (tables `tasks` / `scheduled_slots`) mis à jour par diffs.
+
+    Un diff (tâches ajoutées, supprimées, déplacées, changements d'agenda) ne replace que :
+    - les tâches ajoutées ;
+    - les créneaux devenus impossibles (chevauchent un événement ou un créneau épinglé) ;
+    - les tâches encore sans place, qui peuvent profiter d'un trou libéré.
+    Tout le reste garde son créneau. Un créneau délogé est cherché d'abord dans sa journée.
+    Solveur déterministe sur l'index du temps occupé : quelques ms, même sur plusieurs semaines.
+    """
+
+    def __init__(self):
+        self.scheduler = DeterministicScheduler(horizon_days=settings.PLAN_HORIZON_DAYS)
+
+    async def get_plan(self, user_id: UUID, db: AsyncSession, user_timezone: str = "UTC") -> List[PlannedTask]:
+        """Créneaux à venir (ordre chronologique), puis les tâches sans place."""
+        user_tz = resolve_timezone(user_timezone)
+        tasks, slots = await self._load(user_id, db, datetime.now(timezone.utc))
+        planned = sorted(
+            (self._planned(task, slots.get(task_id), user_tz) for task_id, task in tasks.items()),
+            key=lambda item: (item.start is None, item.start or ""),
+        )
+        return planned
+
+    async def replan(
+        self, user_id: UUID, diff: ReplanRequest, db: AsyncSession, now: Optional[datetime] = None
+    ) -> dict:
+        started = time.perf_counter()
+        user_tz = resolve_timezone(diff.user_timezone)
+        now_local = (now or datetime.now(user_tz)).astimezone(user_tz)
+        horizon_end = self.scheduler.horizon_end(now_local)
+
+        with tracer.start_as_current_span("planning.replan"):
+            events = await calendar_service.get_upcoming_events(
+                user_id, db, user_timezone=diff.user_timezone, now=now, until=horizon_end
+            )
+            events = apply_calendar_changes(events, diff.calendar)
+            tasks, slots = await self._load(user_id, db, now_local)
+            changed = set()
+
+            # 1. Suppressions : le trou libéré pourra servir aux tâches à replacer
+            removed_tasks = []
+            for task_id in diff.removed:
+                task = tasks.pop(task_id, None) or await self._owned(db, user_id, task_id)
+                if task is None:
+                    continue
+                slot = slots.pop(task_id, None) or await db.get(ScheduledSlot, task_id)
+                if slot is not None:
+                    await db.delete(slot)
+                removed_tasks.append(task)
+            # Créneaux d'abord, tâches ensuite : sans relation entre les deux modèles, l'ordre
+            # des écritures n'est garanti que par ces flush (clés étrangères vérifiées sur Postgres)
+            if removed_tasks:
+                await db.flush()
+            for task in removed_tasks:
+                await db.delete(task)
+            removed = [task.id for task in removed_tasks]
+
+            # 2. Déplacements à la main : créneau imposé et épinglé
+            for move in diff.moved:
+                task = tasks.get(move.task_id) or await self._owned(db, user_id, move.task_id)
+                if task is None:
+                    continue
+                start = move.start if move.start.tzinfo else move.start.replace(tzinfo=user_tz)
+                slot = slots.get(task.id) or await db.get(ScheduledSlot, task.id)
+                if slot is None:
+                    slot = ScheduledSlot(task_id=task.id, user_id=user_id, start_at=_utc(start), end_at=_utc(start))
+                slot.start_at, slot.end_at = _utc(start), _utc(start + timedelta(minutes=task.duration))
+                slot.pinned = True
+                slot.reasoning = "Placée par l'utilisateur."
+                tasks[task.id], slots[task.id] = task, slot
+                changed.add(task.id)
+
+            # 3. Ajouts
+            for request in diff.added:
+                task = Task(user_id=user_id, **request.dict())
+                db.add(task)
+                tasks[task.id] = task
+                changed.add(task.id)
+            # ... et les tâches ajoutées avant leurs créneaux
+            if diff.added:
+                await db.flush()
+
+            # 4. Temps occupé = agenda + créneaux gardés (épinglés d'abord : ils s'imposent aux autres)
+            timeline = busy_index(events, user_tz)
+            displaced: Dict[UUID, datetime] = {}
+            for slot in sorted(slots.values(), key=lambda s: (not s.pinned, _aware(s.start_at))):
+                start, end = _aware(slot.start_at), _aware(slot.end_at)
+                if slot.pinned or timeline.conflict(start, end) is None:
+                    timeline.add(start, end, tasks[slot.task_id].title)
+                else:
+                    displaced[slot.task_id] = start
+
+            # 5. Placement des seules tâches touchées, dans les trous restants
+            earliest = round_up(now_local, self.scheduler.slot_minutes)
+            to_place = [task for task_id, task in tasks.items() if task_id in displaced or task_id not in slots]
+            for task in self.scheduler.placement_order(to_place):
+                start_from = earliest
+                if task.id in displaced:
+                    day = displaced[task.id].astimezone(user_tz).date()
+                    start_from = max(earliest, datetime.combine(day, DAY_START, tzinfo=user_tz))
+                placement = self.scheduler.place(task, timeline, start_from, horizon_end, max(now_local, start_from))
+                slot = slots.get(task.id)
+                if placement is None:
+                    if slot is not None:
+                        await db.delete(slot)
+                        del slots[task.id]
+                        changed.add(task.id)
+                    continue
+                start, reasoning = placement
+                end = start + timedelta(minutes=task.duration)
+                timeline.add(start, end, task.title)
+                if slot is None:
+                    slot = slots[task.id] = ScheduledSlot(
+                        task_id=task.id, user_id=user_id, start_at=_utc(start), end_at=_utc(end)
+                    )
+                slot.start_at, slot.end_at, slot.reasoning = _utc(start), _utc(end), reasoning
+                changed.add(task.id)
+
+            for task_id in changed:
+                if task_id in slots:
+                    db.add(slots[task_id])
+            await db.commit()
+
+        unplaced = [task_id for task_id in tasks if task_id not in slots]
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        log.info(
+            "planning.replanned", "Planning mis à jour",
+            changed=len(changed), removed=len(removed), unplaced=len(unplaced),
+            kept=len(slots) - len(changed & set(slots)), duration_ms=duration_ms,
+        )
+        return {
+            "changed": [self._planned(tasks[task_id], slots.get(task_id), user_tz) for task_id in changed],
+            "removed": removed,
+            "unplaced": unplaced,
+            "kept": len(slots) - len(changed & set(slots)),
+            "duration_ms": duration_ms,
+        }
+
+    @staticmethod
+    async def _load(user_id: UUID, db: AsyncSession, now: datetime) -> Tuple[Dict[UUID, Task], Dict[UUID, ScheduledSlot]]:
+        """Créneaux pas encore terminés et leurs tâches, plus les tâches sans créneau (le passé n'est pas relu)."""
+        now_utc = now.astimezone(timezone.utc)
+        slot_rows = (await db.exec(
+            select(ScheduledSlot).where(ScheduledSlot.user_id == user_id, ScheduledSlot.end_at > now_utc)
+        )).all()
+        task_rows = (await db.exec(
+            select(Task)
+            .outerjoin(ScheduledSlot, ScheduledSlot.task_id == Task.id)
+            .where(Task.user_id == user_id, or_(ScheduledSlot.task_id.is_(None), ScheduledSlot.end_at > now_utc))
+        )).all()
+        tasks = {task.id: task for task in task_rows}
+        return tasks, {slot.task_id: slot for slot in slot_rows if slot.task_id in tasks}
+
+    @staticmethod
+    async def _owned(db: AsyncSession, user_id: UUID, task_id: UUID) -> Optional[Task]:
+        task = await db.get(Task, task_id)
+        return task if task is not None and task.user_id == user_id else None
+
+    @staticmethod
+    def _planned(task: Task, slot: Optional[ScheduledSlot], user_tz) -> PlannedTask:
+        return PlannedTask(
+            task_id=task.id,
+            title=task.title,
+            duration=task.duration,
+            priority=task.priority,
+            preferred_time=task.preferred_time,
+            start=_aware(slot.start_at).astimezone(user_tz).isoformat() if slot else None,
+            end=_aware(slot.end_at).astimezone(user_tz).isoformat() if slot else None,
+            pinned=slot.pinned if slot else False,
+            reasoning=slot.reasoning if slot else None,
+        )
+
+
+incremental_planner = IncrementalPlanner()
@@ -0,0 +1,229 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+from app.core.logs import get_logger
+from app.schemas.ai import ScheduledItem, TaskRequest
+from app.services.optimizer import (
+    DAY_END,
+    DAY_START,
+    busy_index,
+    deterministic_scheduler,
+    event_items,
+    parse_event_datetime,
+    parse_preferred_time,
+    resolve_timezone,
+    round_up,
+)
+
+log = get_logger("validator")
+
+
+@dataclass
+class RepairReport:
+    """Ce que la passe de validation a corrigé sur UNE réponse du LLM."""
+    items_checked: int = 0
+    items_repaired: int = 0
+    items_dropped: int = 0
+    issues: Counter = field(default_factory=Counter)  # ex: {"overlap": 2, "past": 1}
+
+    @property
+    def repaired(self) -> bool:
+        return bool(self.items_repaired or self.items_dropped)
+
+
+@dataclass
+class RepairStats:
+    """Compteurs cumulés depuis le démarrage du process (taux d'erreur du modèle)."""
+    schedules_validated: int = 0
+    schedules_repaired: int = 0
+    items_checked: int = 0
+    items_repaired: int = 0
+    items_dropped: int = 0
+    issues: Counter = field(default_factory=Counter)
+
+    @property
+    def repair_rate(self) -> float:
+        """Part des plannings du LLM qui ont dû être corrigés."""
+        if not self.schedules_validated:
+            return 0.0
+        return self.schedules_repaired / self.schedules_validated
+
+    @property
+    def item_repair_rate(self) -> float:
+        if not self.items_checked:
+            return 0.0
+        return (self.items_repaired + self.items_dropped) / self.items_checked
+
+    def record(self, report: RepairReport) -> None:
+        self.schedules_validated += 1
+        self.schedules_repaired += int(report.repaired)
+        self.items_checked += report.items_checked
+        self.items_repaired += report.items_repaired
+        self.items_dropped += report.items_dropped
+        self.issues.update(report.issues)
+
+
+ISSUE_LABELS = {
+    "unparsable": "horaire illisible",
+    "past": "début dans le passé",
+    "night": "placée la nuit (23h-07h)",
+    "overlap": "chevauchement",
+    "preferred": "heure préférée ignorée",
+}
+
+
+class ScheduleValidator:
+    """
+    Passe de validation / réparation du planning renvoyé par Gemini.
+
+    Les événements Google sont remis tels quels (jamais ceux réécrits par le modèle).
+    Chaque tâche est vérifiée contre l'index du temps occupé ; une tâche fautive est
+    décalée au prochain créneau valide (ou à son heure préférée si elle est libre),
+    ou supprimée s'il n'y a plus de place. Le traitement est déterministe :
+    même entrée -> même planning corrigé.
+    """
+
+    def __init__(self):
+        self.stats = RepairStats()
+
+    def repair(
+        self,
+        schedule: List[ScheduledItem],
+        current_events: List[dict],
+        tasks_todo: List[Union[TaskRequest, dict]],
+        user_timezone: str = "UTC",
+        now: Optional[datetime] = None,
+    ) -> Tuple[List[ScheduledItem], RepairReport]:
+        user_tz = resolve_timezone(user_timezone)
+        now_local = (now or datetime.now(user_tz)).astimezone(user_tz)
+        earliest = round_up(now_local, deterministic_scheduler.slot_minutes)
+        horizon_end = deterministic_scheduler.horizon_end(now_local)
+
+        report = RepairReport()
+        items = event_items(current_events, user_tz, now_local)
+        index = busy_index(current_events, user_tz)
+
+        # On retrouve la demande d'origine de chaque tâche (priorité, heure préférée)
+        requests: Dict[str, List[TaskRequest]] = {}
+        for task in tasks_todo:
+            task = TaskRequest(**task) if isinstance(task, dict) else task
+            requests.setdefault(task.title, []).append(task)
+
+        candidates = []
+        for position, item in enumerate(s for s in schedule if s.type == "task"):
+            pending = requests.get(item.title)
+            request = pending.pop(0) if pending else None
+            candidates.append((position, item, request))
+
+        # Ordre déterministe : heures préférées d'abord, puis priorité décroissante, puis ordre du LLM
+        candidates.sort(key=lambda c: (
+            not (c[2] and parse_preferred_time(c[2].preferred_time)),
+            -(c[2].priority if c[2] else 0),
+            c[0],
+        ))
+
+        for _, item, request in candidates:
+            report.items_checked += 1
+            placed = self._check(item, request, index, now_local, earliest, horizon_end, report)
+            if placed is None:
+                report.items_dropped += 1
+                continue
+            start, end, fixes = placed
+            if fixes:
+                report.items_repaired += 1
+                item = ScheduledItem(
+                    title=item.title,
+                    start=start.isoformat(),
+                    end=end.isoformat(),
+                    type="task",
+                    reasoning=f"{item.reasoning or ''} (Kairos : {', '.join(fixes)})".strip(),
+                )
+            index.add(start, end, item.title)
+            items.append((start, item))
+
+        self.stats.record(report)
+        if report.repaired:
+            log.info(
+                "validator.repaired", "Planning corrigé",
+                repaired=report.items_repaired, dropped=report.items_dropped, checked=report.items_checked,
+                issues=dict(report.issues), repair_rate=round(self.stats.repair_rate, 3),
+            )
+
+        items.sort(key=lambda pair: pair[0])
+        return [item for _, item in items], report
+
+    def _check(
+        self,
+        item: ScheduledItem,
+        request: Optional[TaskRequest],
+        index,
+        now_local: datetime,
+        earliest: datetime,
+        horizon_end: datetime,
+        report: RepairReport,
+    ) -> Optional[Tuple[datetime, datetime, List[str]]]:
+        """Retourne (début, fin, corrections appliquées) ou None si la tâche doit être supprimée."""
+        tz = now_local.tzinfo
+        start = parse_event_datetime(item.start, tz)
+        end = parse_event_datetime(item.end, tz)
+        if start is not None and end is not None and end > start:
+            duration = end - start
+        elif request is not None and start is not None:
+            duration = timedelta(minutes=request.duration)
+            end = start + duration
+        else:
+            report.issues["unparsable"] += 1
+            return None
+
+        issues = []
+        if start < now_local:
+            issues.append("past")
+        day_start = datetime.combine(start.date(), DAY_START, tzinfo=tz)
+        day_end = datetime.combine(start.date(), DAY_END, tzinfo=tz)
+        if start < day_start or end > day_end:
+            issues.append("night")
+        conflict = index.conflict(start, end)
+        if conflict is not None:
+            issues.append("overlap")
+
+        # Heure préférée ignorée alors que le créneau était libre ?
+        preferred = parse_preferred_time(request.preferred_time) if request else None
+        target = None
+        if preferred is not None:
+            target = datetime.combine(now_local.date(), preferred, tzinfo=tz)
+            if target < now_local:
+                target = None
+            elif start != target and deterministic_scheduler.next_free_slot(
+                index, target, duration, horizon_end
+            ) == target:
+                issues.append("preferred")
+
+        if not issues:
+            return start, end, []
+        report.issues.update(issues)
+
+        if target is not None:
+            # Au plus près de l'heure demandée : le créneau préféré s'il est libre, sinon juste après
+            new_start = deterministic_scheduler.next_free_slot(
+                index, max(target, earliest), duration, horizon_end
+            )
+        else:
+            new_start = deterministic_scheduler.next_free_slot(
+                index, max(start, earliest), duration, horizon_end
+            )
+        if new_start is None:
+            return None
+
+        fixes = []
+        for issue in issues:
+            label = ISSUE_LABELS[issue]
+            if issue == "overlap" and index.label(conflict):
+                label = f"{label} avec « {index.label(conflict)} »"
+            fixes.append(label)
+        fixes.append(f"déplacée à {new_start.strftime('%d/%m %H:%M')}")
+        return new_start, new_start + duration, fixes
+
+
+schedule_validator = ScheduleValidator()
@@ -0,0 +1,197 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Optional, Set
+
+from celery.result import AsyncResult
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.redis import get_redis
+
+log = get_logger("task_events")
+
+CHANNEL_PREFIX = "kairos:task-events"
+FINAL_STATUSES = {"completed", "failed"}
+
+
+def task_status(task_id: str) -> dict:
+    """État d'une tâche d'optimisation, lu dans le backend de résultats Celery (polling)."""
+    task_result = AsyncResult(task_id, app=celery_app)
+
+    if task_result.state == 'PENDING':
+        return {"status": "processing"}
+    elif task_result.state == 'SUCCESS':
+        return {"status": "completed", "result": task_result.result}
+    elif task_result.state == 'FAILURE':
+        return {"status": "failed", "error": str(task_result.result)}
+    elif task_result.state == 'PROGRESS':
+        # Mode streaming : créneaux déjà proposés par l'IA (aperçu, pas encore validé)
+        return {"status": "processing", "partial": (task_result.info or {}).get("partial", [])}
+
+    return {"status": task_result.state}
+
+
+def poll_url(task_id: str) -> str:
+    return f"/api/v1/ai/optimize/status/{task_id}"
+
+
+class TaskEventHub:
+    """
+    Notifications de fin de tâche poussées aux clients (SSE / WebSocket) au lieu du polling.
+
+    - Côté worker : `publish()` à chaque changement d'état (Redis pub/sub).
+    - Côté API : UNE seule connexion pub/sub par process, abonnée aux seules tâches
+      suivies en ce moment ; un lecteur unique distribue les messages aux clients.
+    - Nombre de connexions ouvertes borné par process ; au-delà, ou si Redis tombe,
+      le client est renvoyé vers le polling (`GET /optimize/status/{task_id}`).
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.rejected = 0
+        self._pubsub: Optional[PubSub] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: Dict[str, Set[asyncio.Queue]] = {}
+        # (dés)abonnements sérialisés : la connexion pub/sub est créée au premier subscribe
+        self._subscription_lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    def channel(task_id: str) -> str:
+        return f"{CHANNEL_PREFIX}:{task_id}"
+
+    # --- CÔTÉ WORKER ---
+    async def publish(self, task_id: str, payload: dict) -> None:
+        try:
+            await get_redis().publish(self.channel(task_id), json.dumps(payload, default=str))
+        except RedisError as e:
+            # Pas grave : les clients finiront par interroger le polling
+            log.warning("task_events.publish_failed", "Notification de la tâche impossible", task_id=task_id, error=str(e))
+
+    # --- CÔTÉ API ---
+    def try_acquire(self) -> bool:
+        if self.active >= settings.TASK_EVENTS_MAX_CONNECTIONS:
+            self.rejected += 1
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+
+    async def follow(self, task_id: str) -> AsyncIterator[Optional[dict]]:
+        """
+        États successifs de la tâche, jusqu'à "completed" / "failed" (ou un renvoi vers le polling).
+        `None` = battement de cœur (rien de nouveau, à utiliser pour garder la connexion ouverte).
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        channel = self.channel(task_id)
+        try:
+            await self._subscribe(channel, queue)
+        except RedisError as e:
+            log.warning("task_events.fallback", "Pub/sub indisponible, renvoi vers le polling", task_id=task_id, error=str(e))
+            yield {"status": "fallback", "poll": poll_url(task_id)}
+            return
+
+        try:
+            # Abonné AVANT de lire l'état : une fin de tâche entre les deux ne peut pas être manquée
+            snapshot = await asyncio.to_thread(task_status, task_id)
+            yield snapshot
+            if snapshot["status"] in FINAL_STATUSES:
+                return
+
+            deadline = asyncio.get_running_loop().time() + settings.TASK_EVENTS_TIMEOUT_SECONDS
+            while True:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    yield {"status": "fallback", "poll": poll_url(task_id)}
+                    return
+                try:
+                    payload = await asyncio.wait_for(
+                        queue.get(), timeout=min(remaining, settings.TASK_EVENTS_HEARTBEAT_SECONDS)
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if payload is None:
+                    # Le lecteur pub/sub a perdu Redis
+                    yield {"status": "fallback", "poll": poll_url(task_id)}
+                    return
+                yield payload
+                if payload.get("status") in FINAL_STATUSES:
+                    return
+        finally:
+            await self._unsubscribe(channel, queue)
+
+    async def _subscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Connexion pub/sub liée à la boucle (comme le client Redis)
+            self._pubsub, self._reader, self._waiters = None, None, {}
+            self._subscription_lock = asyncio.Lock()
+            self._loop = loop
+        if self._pubsub is None:
+            self._pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+
+        waiters = self._waiters.setdefault(channel, set())
+        waiters.add(queue)
+        if len(waiters) > 1:
+            return  # canal déjà suivi pour un autre client
+        try:
+            async with self._subscription_lock:
+                await self._pubsub.subscribe(channel)
+        except RedisError:
+            self._drop(channel, queue)
+            raise
+        # Lecteur démarré seulement une fois la connexion pub/sub établie
+        if self._reader is None or self._reader.done():
+            self._reader = loop.create_task(self._read())
+
+    async def _unsubscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        if self._drop(channel, queue) and self._pubsub is not None:
+            try:
+                async with self._subscription_lock:
+                    if channel not in self._waiters:  # personne ne s'est réabonné entre-temps
+                        await self._pubsub.unsubscribe(channel)
+            except RedisError:
+                pass
+
+    def _drop(self, channel: str, queue: asyncio.Queue) -> bool:
+        """Retire un client ; True si plus personne ne suit ce canal."""
+        waiters = self._waiters.get(channel)
+        if waiters is None:
+            return False
+        waiters.discard(queue)
+        if waiters:
+            return False
+        del self._waiters[channel]
+        return True
+
+    async def _read(self) -> None:
+        pubsub = self._pubsub
+        try:
+            while self._waiters:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                channel = message["channel"].decode()
+                payload = json.loads(message["data"])
+                for queue in list(self._waiters.get(channel, ())):
+                    queue.put_nowait(payload)
+        except (RedisError, OSError) as e:
+            log.warning("task_events.reader_stopped", "Lecteur pub/sub interrompu, clients renvoyés vers le polling", error=str(e))
+            for waiters in self._waiters.values():
+                for queue in waiters:
+                    queue.put_nowait(None)
+            self._waiters = {}
+            self._pubsub = None
+            try:
+                await pubsub.aclose()
+            except (RedisError, OSError):
+                pass
+
+
+task_events = TaskEventHub()
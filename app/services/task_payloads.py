@@ -0,0 +1,54 @@
+import hashlib
+from typing import Any
+
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.redis import get_redis
+from app.core.serialization import frame, packb, unpack
+
+log = get_logger("task_payloads")
+
+KEY_PREFIX = "kairos:payload"
+REF_FIELD = "__payload_ref__"
+
+
+class PayloadExpired(LookupError):
+    """L'argument référencé n'est plus dans Redis (TTL dépassé avant l'exécution de la tâche)."""
+
+
+class TaskPayloadStore:
+    """
+    Arguments de tâches Celery passés par référence.
+
+    Le gros argument (agenda, liste de tâches) est stocké une seule fois dans Redis sous
+    l'empreinte de son contenu (msgpack + zlib) ; le message du broker ne transporte que
+    `{"__payload_ref__": clé}`. Deux demandes identiques partagent la même entrée.
+    """
+
+    async def put(self, value: Any) -> Any:
+        """Côté API : remplace `value` par une référence si elle dépasse TASK_PAYLOAD_MIN_BYTES."""
+        if not settings.TASK_PAYLOAD_BY_REFERENCE:
+            return value
+        raw = packb(value)
+        if len(raw) < settings.TASK_PAYLOAD_MIN_BYTES:
+            return value
+        packed = frame(raw, compress_min_bytes=1)
+        key = f"{KEY_PREFIX}:{hashlib.sha256(packed).hexdigest()[:32]}"
+        # Le TTL est repoussé à chaque dépôt : une demande répétée garde son entrée vivante
+        await get_redis().set(key, packed, ex=settings.TASK_PAYLOAD_TTL_SECONDS)
+        return {REF_FIELD: key}
+
+    async def resolve(self, value: Any) -> Any:
+        """Côté worker : la valeur d'origine, qu'elle soit passée par référence ou non."""
+        if not (isinstance(value, dict) and REF_FIELD in value):
+            return value
+        key = value[REF_FIELD]
+        packed = await get_redis().get(key)
+        if packed is None:
+            log.warning("task_payloads.expired", "Argument de tâche expiré", key=key)
+            raise PayloadExpired(key)
+        # Pas de suppression : une nouvelle livraison (acks_late) ou une demande identique peut la relire
+        return unpack(packed)
+
+
+task_payloads = TaskPayloadStore()
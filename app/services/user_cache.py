@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Awaitable, Callable, Optional, Set
+from uuid import UUID
+
+from redis.exceptions import RedisError
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.core.redis import get_redis
+from app.models.user import User
+
+log = get_logger("user_cache")
+
+# Champs dont le changement doit invalider le cache immédiatement
+SENSITIVE_FIELDS = ("is_active", "subscription_tier")
+# Le hash du mot de passe ne quitte jamais la base
+CACHED_FIELDS = ("id", "email", "full_name", "subscription_tier", "is_active")
+
+
+class UserIdentityCache:
+    """
+    Cache de l'utilisateur authentifié, pour éviter un `db.get(User)` à chaque requête.
+
+    - Niveau 1 : LRU en mémoire avec TTL court (par process).
+    - Niveau 2 (optionnel) : Redis, partagé entre process et conteneurs.
+    - Les JWT déjà vérifiés sont aussi mémorisés (jusqu'à leur expiration au plus tard).
+
+    Invalidation : dès qu'un User est modifié sur `is_active` ou `subscription_tier`
+    (listener SQLAlchemy ci-dessous), ou explicitement via `invalidate()`.
+    """
+
+    def __init__(self):
+        self.users = TTLCache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS)
+        self.tokens = TTLCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL_SECONDS)
+        self.redis_hits = 0
+        self.db_loads = 0
+        self.invalidations = 0
+        self._background: Set[asyncio.Task] = set()
+
+    # --- JWT ---
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_token_subject(self, token: str) -> Optional[UUID]:
+        return self.tokens.get(self._token_key(token))
+
+    def remember_token(self, token: str, user_id: UUID, expires_at: Optional[float]) -> None:
+        ttl = None if expires_at is None else expires_at - time.time()
+        self.tokens.set(self._token_key(token), user_id, ttl)
+
+    # --- UTILISATEURS ---
+    @staticmethod
+    def _redis_key(user_id: UUID) -> str:
+        return f"kairos:user:{user_id}"
+
+    async def get_user(self, user_id: UUID, loader: Callable[[], Awaitable[Optional[User]]]) -> Optional[User]:
+        cached = self.users.get(user_id)
+        if cached is not None:
+            return _from_snapshot(cached)
+
+        if settings.USER_CACHE_REDIS_ENABLED:
+            try:
+                raw = await get_redis().get(self._redis_key(user_id))
+            except RedisError as e:
+                log.warning("user_cache.redis_unavailable", "Cache utilisateur Redis indisponible", error=str(e))
+                raw = None
+            if raw is not None:
+                self.redis_hits += 1
+                snapshot = json.loads(raw)
+                self.users.set(user_id, snapshot)
+                return _from_snapshot(snapshot)
+
+        self.db_loads += 1
+        user = await loader()
+        if user is None:
+            return None
+        snapshot = _to_snapshot(user)
+        self.users.set(user_id, snapshot)
+        if settings.USER_CACHE_REDIS_ENABLED:
+            try:
+                await get_redis().set(
+                    self._redis_key(user_id), json.dumps(snapshot), ex=settings.USER_CACHE_REDIS_TTL_SECONDS
+                )
+            except RedisError as e:
+                log.warning("user_cache.redis_unavailable", "Cache utilisateur Redis indisponible", error=str(e))
+        return user
+
+    async def invalidate(self, user_id: UUID) -> None:
+        self.invalidations += 1
+        self.users.pop(user_id)
+        if settings.USER_CACHE_REDIS_ENABLED:
+            try:
+                await get_redis().delete(self._redis_key(user_id))
+            except RedisError as e:
+                log.warning("user_cache.invalidation_failed", "Invalidation Redis impossible", user_id=user_id, error=str(e))
+
+    def invalidate_soon(self, user_id: UUID) -> None:
+        """Version synchrone (listeners SQLAlchemy) : le local tout de suite, Redis en tâche de fond."""
+        self.users.pop(user_id)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Hors boucle (script, shell) : le TTL Redis borne la durée de la donnée périmée
+            self.invalidations += 1
+            return
+        task = loop.create_task(self.invalidate(user_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self) -> dict:
+        lookups = self.users.hits + self.redis_hits + self.db_loads
+        return {
+            "user_local_hits": self.users.hits,
+            "user_redis_hits": self.redis_hits,
+            "user_db_loads": self.db_loads,
+            "user_hit_rate": round(1 - self.db_loads / lookups, 4) if lookups else 0.0,
+            "token_hits": self.tokens.hits,
+            "token_misses": self.tokens.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def _to_snapshot(user: User) -> dict:
+    return {field: (str(getattr(user, field)) if field == "id" else getattr(user, field)) for field in CACHED_FIELDS}
+
+
+def _from_snapshot(snapshot: dict) -> User:
+    # Objet détaché (hors session) : suffisant pour les routes, qui ne lisent que ces champs
+    return User(**{**snapshot, "id": UUID(snapshot["id"]), "hashed_password": ""})
+
+
+user_cache = UserIdentityCache()
+
+
+# --- INVALIDATION AUTOMATIQUE ---
+@event.listens_for(User, "after_update")
+def _collect_changed_users(mapper, connection, target: User):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in SENSITIVE_FIELDS):
+        session = state.session
+        if session is not None:
+            session.info.setdefault("kairos_invalidate_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session):
+    for user_id in session.info.pop("kairos_invalidate_users", ()):
+        user_cache.invalidate_soon(user_id)
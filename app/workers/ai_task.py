@@ -1,24 +1,92 @@
 import asyncio
+from celery.exceptions import TimeLimitExceeded
+from celery.signals import (
+    task_failure,
+    task_prerun,
+    task_success,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
 from app.core.celery_app import celery_app
+from app.core.logs import get_logger
+from app.core.redis import close_redis
 from app.services.ai_engine.optimizer import ai_optimizer
+from app.services.calendar_service import calendar_service
+from app.services.inflight_requests import INFLIGHT_HEADER, inflight_requests
+from app.services.task_events import task_events
+from app.services.task_payloads import task_payloads
+from app.workers.event_loop import LoopTimeout, worker_loop
 
-@celery_app.task(acks_late=True, time_limit=300) # Ajout d'un timeout de 5 minutes
-def optimize_schedule_task(google_events: list, tasks_todo: list, user_timezone: str):
+log = get_logger("worker")
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    # Chaque process worker (après le fork) a sa propre boucle asyncio longue durée,
+    # son pool de connexions vers Google et sa chaîne LLM (construite une seule fois)
+    worker_loop.start()
+    calendar_service.open()
+    ai_optimizer.warm_up()
+
+async def _close_clients():
+    await calendar_service.aclose()
+    await close_redis()
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    try:
+        worker_loop.stop(_close_clients())
+    except Exception as e:
+        log.warning("worker.shutdown_incomplete", "Fermeture des clients incomplète", error=str(e))
+
+def _runs_tasks_in_main_process(worker) -> bool:
+    """Pool threads (mode asynchrone) : pas de fork, donc ni worker_process_init ni worker_process_shutdown."""
+    pool = getattr(worker, "pool_cls", None)
+    name = pool if isinstance(pool, str) else getattr(pool, "__module__", "")
+    return "thread" in name
+
+@worker_init.connect
+def init_thread_pool_worker(sender=None, **kwargs):
+    if _runs_tasks_in_main_process(sender):
+        init_worker_process()
+
+@worker_shutdown.connect
+def shutdown_thread_pool_worker(sender=None, **kwargs):
+    if _runs_tasks_in_main_process(sender):
+        shutdown_worker_process()
+
+@celery_app.task(bind=True, acks_late=True, time_limit=300) # Ajout d'un timeout de 5 minutes
+def optimize_schedule_task(
+    self,
+    google_events: list,
+    tasks_todo: list,
+    user_timezone: str,
+    engine: str = "llm",
+    use_cache: bool = True,
+    stream: bool = False,
+):
     """
     Cette fonction tourne en arrière-plan dans le conteneur Worker.
     Elle n'a pas de limite de temps HTTP.
+    Avec `stream=True`, les créneaux sont publiés au fil de l'eau (état PROGRESS + pub/sub).
+    `google_events` / `tasks_todo` peuvent arriver par référence (clé Redis, voir task_payloads).
     """
-    print(f"👷 WORKER: Début optimisation pour {len(tasks_todo)} tâches...")
+    log.info("worker.optimize_started", "Début optimisation", engine=engine, stream=stream)
+    on_item = _progress_publisher(self) if stream else None
     
     try:
-        # On appelle notre service IA existant
-        # asyncio.run() est la méthode standard et robuste pour exécuter une coroutine
-        # depuis un contexte synchrone comme une tâche Celery.
-        result = asyncio.run(ai_optimizer.optimize_schedule(
-            current_events=google_events,
-            tasks_todo=tasks_todo,
-            user_timezone=user_timezone
-        ))
+        # On appelle notre service IA existant, sur la boucle persistante du process
+        # (pas de asyncio.run() : la boucle et les clients survivent d'une tâche à l'autre)
+        # Limite appliquée aussi sur la boucle : le pool threads n'applique pas time_limit (prefork seulement),
+        # et la coroutine est annulée au lieu de tuer le process avec les autres optimisations en vol
+        try:
+            result = worker_loop.run(
+                _optimize(google_events, tasks_todo, user_timezone, engine, use_cache, on_item),
+                timeout=self.time_limit,
+            )
+        except LoopTimeout:
+            raise TimeLimitExceeded(self.time_limit)
         
         if isinstance(result, list):
             # Check if items are Pydantic models before calling .dict()
@@ -30,12 +98,74 @@ def optimize_schedule_task(google_events: list, tasks_todo: list, user_timezone:
                 else:
                     serializable_result.append(item)
             
-            print("✅ WORKER: Terminé! Données sous format JSON.")
+            log.info("worker.optimize_done", "Planning calculé", items=len(serializable_result))
             return serializable_result
         
-        print("✅ WORKER: Terminé !")
+        log.info("worker.optimize_done", "Planning calculé")
         return result
     except Exception as e:
-        print(f"❌ WORKER ERROR: {e}")
+        log.error("worker.optimize_failed", "Optimisation impossible", error=str(e))
         # Il est préférable de lever l'exception pour que Celery marque la tâche comme 'FAILURE'
-        raise
\ No newline at end of file
+        raise
+
+async def _optimize(google_events, tasks_todo, user_timezone, engine, use_cache, on_item):
+    # Arguments passés par référence (TASK_PAYLOAD_BY_REFERENCE) : relus dans Redis
+    google_events = await task_payloads.resolve(google_events)
+    tasks_todo = await task_payloads.resolve(tasks_todo)
+    return await ai_optimizer.optimize_schedule(
+        current_events=google_events,
+        tasks_todo=tasks_todo,
+        user_timezone=user_timezone,
+        engine=engine,
+        use_cache=use_cache,
+        on_item=on_item
+    )
+
+def _progress_publisher(task):
+    """Callback de streaming : aperçu partiel visible en polling (PROGRESS) et poussé en SSE."""
+    partial = []
+    # task.request est propre au thread : lu ici (thread Celery), il vaut None dans la boucle
+    # partagée comme dans le thread de to_thread
+    task_id = task.request.id
+
+    async def publish(item):
+        partial.append(item.dict())
+        snapshot = list(partial)
+        # update_state est synchrone (backend Redis) : hors de la boucle partagée
+        await asyncio.to_thread(task.update_state, task_id=task_id, state="PROGRESS", meta={"partial": snapshot})
+        await task_events.publish(task_id, {"status": "processing", "partial": snapshot})
+
+    return publish
+
+# --- NOTIFICATIONS (pub/sub) : l'API pousse ces changements d'état aux clients SSE / WebSocket ---
+def _notify(task_id: str, payload: dict):
+    try:
+        worker_loop.run(task_events.publish(task_id, payload), timeout=5)
+    except Exception as e:
+        # Jamais bloquant : le résultat reste disponible via le polling
+        log.warning("worker.notify_failed", "Notification impossible", task_id=task_id, error=str(e))
+
+@task_prerun.connect(sender=optimize_schedule_task)
+def notify_started(task_id=None, **kwargs):
+    _notify(task_id, {"status": "processing"})
+
+@task_success.connect(sender=optimize_schedule_task)
+def notify_completed(sender=None, result=None, **kwargs):
+    # Le résultat est déjà écrit dans le backend quand ce signal part
+    _notify(sender.request.id, {"status": "completed", "result": result})
+    _release_inflight(sender)
+
+@task_failure.connect(sender=optimize_schedule_task)
+def notify_failed(sender=None, task_id=None, exception=None, **kwargs):
+    _notify(task_id, {"status": "failed", "error": str(exception)})
+    _release_inflight(sender)
+
+def _release_inflight(task):
+    """Demande regroupée (voir services/inflight_requests.py) : la prochaine identique relancera un calcul."""
+    key = getattr(task.request, INFLIGHT_HEADER, None)
+    if not key:
+        return
+    try:
+        worker_loop.run(inflight_requests.release(key, task.request.id), timeout=5)
+    except Exception as e:
+        log.warning("worker.inflight_release_failed", "Entrée du registre non libérée", error=str(e))
@@ -0,0 +1,72 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class LoopTimeout(TimeoutError):
+    """`run(timeout=...)` : la coroutine n'a pas fini à temps (elle a été annulée)."""
+
+
+class WorkerEventLoop:
+    """
+    Boucle asyncio longue durée d'un process worker, qui tourne dans un thread dédié.
+
+    Les tâches Celery (synchrones) y soumettent leurs coroutines au lieu d'appeler
+    asyncio.run() à chaque fois : plus de création / destruction de boucle par tâche,
+    et les ressources liées à la boucle (pool HTTP, client Redis, client Gemini) restent
+    ouvertes d'une tâche à l'autre.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self.start()
+        return self._loop
+
+    def start(self) -> None:
+        """Appelé sur worker_process_init (après le fork) ; paresseux sinon (pool solo, tests)."""
+        with self._lock:
+            if self._loop is not None and not self._loop.is_closed():
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="kairos-event-loop", daemon=True)
+            self._thread.start()
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Exécute `coro` sur la boucle partagée et attend son résultat (bloquant)."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            if future.done():
+                raise  # TimeoutError levée par la coroutine elle-même
+            future.cancel()
+            raise LoopTimeout(timeout) from None
+        except BaseException:
+            # SoftTimeLimitExceeded, arrêt du worker... : on n'abandonne pas la coroutine en vol
+            future.cancel()
+            raise
+
+    def stop(self, cleanup: Optional[Coroutine] = None) -> None:
+        """Arrêt du process : nettoyage éventuel sur la boucle, puis fermeture."""
+        if self._loop is None or self._loop.is_closed():
+            if cleanup is not None:
+                cleanup.close()
+            return
+        try:
+            if cleanup is not None:
+                self.run(cleanup, timeout=10)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+worker_loop = WorkerEventLoop()
@@ -0,0 +1,45 @@
+from uuid import UUID
+
+from celery.exceptions import TimeLimitExceeded
+
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.logs import get_logger
+from app.services.plan_precompute import plan_precompute
+from app.workers.event_loop import LoopTimeout, worker_loop
+
+log = get_logger("worker")
+
+
+# Lancée par Celery beat toutes les PRECOMPUTE_TICK_MINUTES pendant la fenêtre creuse
+@celery_app.task(bind=True, time_limit=60)
+def dispatch_precomputations(self):
+    if not settings.PRECOMPUTE_ENABLED:
+        return 0
+    # Limites appliquées sur la boucle : le pool threads (WORKER_ASYNC_MODE) n'applique pas time_limit
+    try:
+        batch = worker_loop.run(plan_precompute.select_batch(), timeout=self.time_limit)
+    except LoopTimeout:
+        raise TimeLimitExceeded(self.time_limit)
+    for user_id, countdown in batch:
+        # Étalés sur la durée du tick ; un calcul qui n'a pas démarré au tick suivant est abandonné
+        precompute_user_plan.apply_async(
+            args=[user_id], countdown=countdown, expires=countdown + settings.PRECOMPUTE_TICK_MINUTES * 60
+        )
+    return len(batch)
+
+
+@celery_app.task(bind=True, acks_late=True, time_limit=300, rate_limit=settings.PRECOMPUTE_RATE_LIMIT)
+def precompute_user_plan(self, user_id: str):
+    """Planning de la journée suivante d'un utilisateur, calculé hors des heures de pointe."""
+    log.info("worker.precompute_started", "Pré-calcul du planning", user_id=user_id)
+    try:
+        done = worker_loop.run(plan_precompute.precompute(UUID(user_id)), timeout=self.time_limit)
+    except LoopTimeout:
+        # Appel Google / Gemini bloqué : la coroutine est annulée, le créneau du worker libéré
+        raise TimeLimitExceeded(self.time_limit)
+    except Exception as e:
+        # Pas de nouvel essai : le matin, l'utilisateur passera simplement par le calcul normal
+        log.warning("worker.precompute_failed", "Pré-calcul impossible", user_id=user_id, error=str(e))
+        return False
+    return done
@@ -0,0 +1,93 @@
+import os
+import time
+from typing import Dict, Tuple
+
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+)
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+
+from app.core.logs import bind_context, configure_logging, current_context, reset_context
+from app.core.metrics import (
+    CELERY_EXECUTION_SECONDS,
+    CELERY_QUEUE_WAIT_SECONDS,
+    mark_process_dead,
+    start_worker_exporter,
+)
+from app.core.tracing import TRACE_HEADER, current_trace_id, extract_trace_context, inject_trace_headers, tracer
+
+# En-têtes ajoutés aux messages Celery ; côté worker ils deviennent des attributs de `task.request`
+SENT_AT_HEADER = "kairos_sent_at"
+REQUEST_ID_HEADER = "kairos_request_id"
+
+# task_id -> (span, jetons de contexte, début d'exécution) entre prerun et postrun
+_running: Dict[str, Tuple] = {}
+
+
+@worker_init.connect
+def init_worker(**kwargs):
+    # Process principal : l'exporteur agrège aussi les process prefork (PROMETHEUS_MULTIPROC_DIR)
+    configure_logging()
+    start_worker_exporter()
+
+
+@worker_process_init.connect
+def init_worker_logging(**kwargs):
+    configure_logging()
+
+
+@worker_process_shutdown.connect
+def forget_worker_process(pid=None, **kwargs):
+    mark_process_dead(pid or os.getpid())
+
+
+# --- CÔTÉ API (envoi du message) ---
+@before_task_publish.connect
+def stamp_task_headers(headers=None, **kwargs):
+    if headers is None:
+        return
+    headers[SENT_AT_HEADER] = time.time()
+    request_id = current_context().get("request_id")
+    if request_id:
+        headers[REQUEST_ID_HEADER] = request_id
+    # Le span de la requête API devient le parent du span de la tâche
+    inject_trace_headers(headers)
+
+
+# --- CÔTÉ WORKER ---
+@task_prerun.connect
+def start_task_span(task_id=None, task=None, **kwargs):
+    request = task.request
+    sent_at = getattr(request, SENT_AT_HEADER, None)
+    if sent_at is not None:
+        CELERY_QUEUE_WAIT_SECONDS.labels(task=task.name).observe(max(0.0, time.time() - sent_at))
+
+    parent = extract_trace_context(getattr(request, TRACE_HEADER, None))
+    span = tracer.start_span(task.name, context=parent, kind=trace.SpanKind.CONSUMER)
+    span.set_attribute("celery.task_id", task_id)
+    trace_token = otel_context.attach(trace.set_span_in_context(span))
+    log_token = bind_context(
+        task_id=task_id,
+        request_id=getattr(request, REQUEST_ID_HEADER, None),
+        trace_id=current_trace_id(),
+    )
+    _running[task_id] = (span, trace_token, log_token, time.perf_counter())
+
+
+@task_postrun.connect
+def end_task_span(task_id=None, task=None, state=None, **kwargs):
+    running = _running.pop(task_id, None)
+    if running is None:
+        return
+    span, trace_token, log_token, started = running
+    CELERY_EXECUTION_SECONDS.labels(task=task.name, state=state or "UNKNOWN").observe(time.perf_counter() - started)
+    span.set_attribute("celery.state", state or "UNKNOWN")
+    span.end()
+    otel_context.detach(trace_token)
+    reset_context(log_token)
@@ -0,0 +1,118 @@
+"""
+Benchmark : créneaux communs à N personnes (POST /availability/common-slots), bitmaps NumPy
+vs boucle Python sur l'index du temps occupé de chaque participant.
+
+Agendas synthétiques (événements nettoyés, comme get_upcoming_events) : --events-per-day
+réunions par jour ouvré et par personne, fuseaux mélangés (Europe, Amériques, Asie). Seul le
+calcul est mesuré (agendas déjà chargés) : construction des bitmaps, intersection, classement.
+
+    python -m benchmarks.bench_availability --participants 300 --days 28
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from app.services.availability import AvailabilityFinder  # noqa: E402
+from app.services.optimizer import DAY_END, DAY_START, busy_index, resolve_timezone, round_up  # noqa: E402
+from benchmarks.bench_http_client import percentile  # noqa: E402
+
+TIMEZONES = ["Europe/Paris", "Europe/London", "America/New_York", "America/Sao_Paulo", "Asia/Kolkata", "UTC"]
+
+
+def make_calendar(rng: random.Random, now: datetime, days: int, per_day: int, tz_name: str) -> list:
+    tz = resolve_timezone(tz_name)
+    events = []
+    for d in range(days + 1):
+        day = (now.astimezone(tz) + timedelta(days=d)).date()
+        if day.weekday() >= 5:
+            continue
+        for _ in range(per_day):
+            begin = datetime(day.year, day.month, day.day, rng.randint(8, 18), rng.choice([0, 15, 30, 45]), tzinfo=tz)
+            end = begin + timedelta(minutes=rng.choice([30, 45, 60, 90]))
+            events.append({"title": "Réunion", "start": begin.isoformat(), "end": end.isoformat()})
+    if rng.random() < 0.2:  # congés : une journée entière, qui ne bloque pas
+        events.append({"title": "Congés", "start": (now + timedelta(days=3)).date().isoformat(), "end": ""})
+    return events
+
+
+def python_common_windows(calendars: list, duration: int, days: int, now: datetime, resolution: int) -> int:
+    """Référence : chaque pas de temps testé participant par participant (index d'intervalles)."""
+    origin = round_up(now, resolution)
+    people = [(resolve_timezone(tz), busy_index(events, resolve_timezone(tz))) for tz, events in calendars]
+    step = timedelta(minutes=resolution)
+    windows, run = 0, 0
+    needed = -(-duration // resolution)
+    for i in range(days * 24 * 60 // resolution):
+        start = origin + i * step
+        free = True
+        for tz, index in people:
+            local = start.astimezone(tz).time()
+            if local < DAY_START or (start + step).astimezone(tz).time() > DAY_END or local > DAY_END:
+                free = False
+                break
+            if index.conflict(start, start + step) is not None:
+                free = False
+                break
+        run = run + 1 if free else 0
+        if run == needed:
+            windows += 1
+    return windows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--participants", type=int, default=300)
+    parser.add_argument("--days", type=int, default=28)
+    parser.add_argument("--events-per-day", type=int, default=4)
+    parser.add_argument("--duration", type=int, default=60, help="Durée de la réunion (minutes)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--python-participants", type=int, default=50,
+                        help="Participants pour la référence en Python pur (lente)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    # La plupart des équipes partagent quelques fuseaux voisins
+    calendars = [
+        (tz, make_calendar(rng, now, args.days, args.events_per_day, tz))
+        for tz in (rng.choice(TIMEZONES[:3]) if i % 10 else rng.choice(TIMEZONES) for i in range(args.participants))
+    ]
+
+    report = []
+    for resolution in (15, 5):
+        finder = AvailabilityFinder(resolution_minutes=resolution)
+        latencies, slots = [], []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            slots = finder.common_slots(calendars, args.duration, args.days, now=now)
+            latencies.append((time.perf_counter() - started) * 1000)
+        report.append({
+            "engine": "numpy", "resolution_min": resolution, "participants": args.participants,
+            "events": sum(len(events) for _, events in calendars),
+            "p50_ms": round(percentile(latencies, 50), 2), "p95_ms": round(percentile(latencies, 95), 2),
+            "slots": len(slots), "best": slots[0].dict() if slots else None,
+        })
+
+    subset = calendars[:args.python_participants]
+    started = time.perf_counter()
+    python_common_windows(subset, args.duration, args.days, now, 15)
+    python_ms = (time.perf_counter() - started) * 1000
+    finder = AvailabilityFinder(resolution_minutes=15)
+    started = time.perf_counter()
+    finder.common_slots(subset, args.duration, args.days, now=now)
+    numpy_ms = (time.perf_counter() - started) * 1000
+    report.append({
+        "engine": "python vs numpy", "resolution_min": 15, "participants": len(subset),
+        "python_ms": round(python_ms, 1), "numpy_ms": round(numpy_ms, 2),
+    })
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
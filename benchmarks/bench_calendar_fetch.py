@@ -0,0 +1,116 @@
+"""
+Benchmark : synchro complète Google Calendar, octets transférés et événements vus par l'optimiseur.
+
+- "avant" : ressources complètes, maxResults=250, sans timeMax ; l'optimiseur ne recevait
+  que les CALENDAR_UPCOMING_LIMIT (50) prochains événements ;
+- "après" : masque `fields` (id, status, summary, start, end), timeMax à
+  CALENDAR_SYNC_HORIZON_DAYS, pages de CALENDAR_SYNC_PAGE_SIZE ; l'optimiseur reçoit
+  toute la fenêtre de planification.
+
+Chaque variante est mesurée avec et sans gzip, contre le faux Google local
+(un événement toutes les 2 h, ressources complètes comme l'API réelle).
+
+    python -m benchmarks.bench_calendar_fetch --events 600
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from app.core.config import settings  # noqa: E402
+from app.core.http_client import build_http_client  # noqa: E402
+from app.services.calendar_service import EVENT_LIST_FIELDS  # noqa: E402
+from app.services.optimizer import planning_window  # noqa: E402
+from benchmarks.fake_google import BackgroundServer, FakeGoogleConfig, create_fake_google_app  # noqa: E402
+
+
+def rfc3339(value: datetime) -> str:
+    return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+async def full_sync(base_url: str, params: dict, gzip: bool) -> dict:
+    headers = {} if gzip else {"Accept-Encoding": "identity"}
+    wire = decoded = pages = 0
+    items = []
+    started = time.perf_counter()
+    async with build_http_client() as client:
+        page_token = None
+        while True:
+            page_params = dict(params, pageToken=page_token) if page_token else params
+            response = await client.get(f"{base_url}/calendar/v3/calendars/primary/events", params=page_params, headers=headers)
+            page = response.json()
+            wire += response.num_bytes_downloaded
+            decoded += len(response.content)
+            pages += 1
+            items.extend(page.get("items", []))
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                break
+    return {
+        "pages": pages,
+        "events_synced": len(items),
+        "wire_kb": round(wire / 1024, 1),
+        "decoded_kb": round(decoded / 1024, 1),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "items": items,
+    }
+
+
+def in_window(items: list, start: datetime, end: datetime) -> int:
+    count = 0
+    for item in items:
+        begin = datetime.fromisoformat(item["start"]["dateTime"])
+        finish = datetime.fromisoformat(item["end"]["dateTime"])
+        count += finish > start and begin < end
+    return count
+
+
+async def run(args, base_url: str) -> dict:
+    now = datetime.now(timezone.utc)
+    window_start, window_end = planning_window(args.timezone, now)
+    lookback = rfc3339(now - timedelta(days=settings.CALENDAR_SYNC_LOOKBACK_DAYS))
+    variants = {
+        "avant": {"singleEvents": True, "maxResults": 250, "timeMin": lookback},
+        "apres": {
+            "singleEvents": True, "maxResults": settings.CALENDAR_SYNC_PAGE_SIZE, "fields": EVENT_LIST_FIELDS,
+            "timeMin": lookback, "timeMax": rfc3339(now + timedelta(days=settings.CALENDAR_SYNC_HORIZON_DAYS)),
+        },
+    }
+    report = {}
+    for name, params in variants.items():
+        for gzip in (False, True):
+            result = await full_sync(base_url, params, gzip)
+            items = result.pop("items")
+            visible = in_window(items, window_start, window_end)
+            if name == "avant":
+                # Ancienne lecture locale : les N prochains événements, quelle que soit la fenêtre
+                visible = min(visible, settings.CALENDAR_UPCOMING_LIMIT)
+            report[f"{name}{'+gzip' if gzip else ''}"] = {**result, "events_for_optimizer": visible}
+    report["events_in_planning_window"] = in_window(
+        [{"start": {"dateTime": (now + timedelta(hours=2 * i + 1)).isoformat()},
+          "end": {"dateTime": (now + timedelta(hours=2 * i + 1, minutes=45)).isoformat()}} for i in range(args.events)],
+        window_start, window_end,
+    )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=600, help="Événements dans l'agenda (un toutes les 2 h)")
+    parser.add_argument("--timezone", default="Europe/Paris")
+    parser.add_argument("--port", type=int, default=8811)
+    args = parser.parse_args()
+
+    app = create_fake_google_app(FakeGoogleConfig(events_count=args.events))
+    with BackgroundServer(app, args.port) as server:
+        report = asyncio.run(run(args, server.base_url))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark : un httpx.AsyncClient neuf par appel (ancien comportement) contre le
+client partagé de GoogleCalendarService, face à un faux serveur Google local.
+
+    python -m benchmarks.bench_http_client --calls 300 --tls --latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+import httpx  # noqa: E402
+
+from app.core.http_client import build_http_client  # noqa: E402
+from benchmarks.fake_google import BackgroundServer, FakeGoogleConfig, create_fake_google_app  # noqa: E402
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(samples, warmup: int = 0) -> dict:
+    # Les premiers appels (ouverture du pool) sont exclus : on mesure le régime établi
+    samples = samples[warmup:]
+    return {
+        "calls": len(samples),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+
+async def run_fresh(url: str, calls: int, concurrency: int) -> list:
+    samples = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            async with httpx.AsyncClient(verify=False) as client:
+                response = await client.get(url, headers={"Authorization": "Bearer x"})
+            response.raise_for_status()
+            samples.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return samples
+
+
+async def run_shared(url: str, calls: int, concurrency: int) -> list:
+    samples = []
+    sem = asyncio.Semaphore(concurrency)
+    client = build_http_client(verify=False)
+
+    async def one():
+        async with sem:
+            t0 = time.perf_counter()
+            response = await client.get(url, headers={"Authorization": "Bearer x"})
+            response.raise_for_status()
+            samples.append((time.perf_counter() - t0) * 1000)
+
+    try:
+        await asyncio.gather(*(one() for _ in range(calls)))
+    finally:
+        await client.aclose()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20, help="Appels ignorés dans les statistiques")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tls", action="store_true", help="Servir en HTTPS (certificat auto-signé)")
+    args = parser.parse_args()
+
+    app = create_fake_google_app(FakeGoogleConfig(latency_ms=args.latency_ms))
+    with BackgroundServer(app, args.port, tls=args.tls) as server:
+        url = f"{server.base_url}/calendar/v3/calendars/primary/events"
+        fresh = asyncio.run(run_fresh(url, args.calls + args.warmup, args.concurrency))
+        shared = asyncio.run(run_shared(url, args.calls + args.warmup, args.concurrency))
+
+    report = {
+        "tls": args.tls,
+        "latency_ms": args.latency_ms,
+        "concurrency": args.concurrency,
+        "fresh_client_per_call": summarize(fresh, args.warmup),
+        "shared_client": summarize(shared, args.warmup),
+    }
+    report["p50_speedup"] = round(report["fresh_client_per_call"]["p50_ms"] / report["shared_client"]["p50_ms"], 2)
+    report["p99_speedup"] = round(report["fresh_client_per_call"]["p99_ms"] / report["shared_client"]["p99_ms"], 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark : micro-batching des appels à Gemini (LLM_BATCH_*), débit vs latence.
+
+Un process worker reçoit des demandes d'optimisation d'utilisateurs différents (arrivées
+poissoniennes) et les traite en parallèle sur sa boucle, comme avec `celery worker -P threads`.
+Le faux Gemini modélise ce qui coûte dans un vrai appel :
+- un coût fixe par appel (réseau, file d'attente, lecture du préambule) ;
+- un coût par créneau généré dans la réponse ;
+- un nombre limité d'appels simultanés (quota du fournisseur).
+
+On compare "un appel par demande" à plusieurs réglages (attente max, taille max du lot).
+
+    python -m benchmarks.bench_llm_batching --requests 200 --rate 40
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")  # chaque demande doit vraiment appeler le modèle
+
+from app.core.config import settings  # noqa: E402
+from app.services.ai_engine.optimizer import AIOptimizer  # noqa: E402
+from benchmarks.bench_http_client import percentile  # noqa: E402
+from benchmarks.fake_llm import FakeGemini, echo_schedules  # noqa: E402
+
+
+def make_tasks(user: int) -> list:
+    return [
+        {"title": f"Tâche {user}-{i}", "duration": 30 + 15 * (i % 3), "priority": 1 + i % 3, "preferred_time": None}
+        for i in range(4)
+    ]
+
+
+async def run_scenario(args, batch_size: int, max_wait_ms: int) -> dict:
+    """batch_size=0 : micro-batching désactivé (un appel par demande)."""
+    settings.LLM_BATCH_ENABLED = batch_size > 0
+    settings.LLM_BATCH_MAX_SIZE = max(batch_size, 1)
+    settings.LLM_BATCH_MAX_WAIT_MS = max_wait_ms
+    fake_llm = FakeGemini(
+        responder=echo_schedules,
+        latency_ms=args.call_overhead_ms,
+        item_latency_ms=args.item_ms,
+        max_concurrency=args.provider_concurrency,
+    )
+    optimizer = AIOptimizer(llm=fake_llm)
+    rng = random.Random(42)  # mêmes arrivées pour tous les scénarios
+    latencies = []
+
+    async def one(user: int) -> None:
+        t0 = time.perf_counter()
+        await optimizer.optimize_schedule([], make_tasks(user), "Europe/Paris", use_cache=False)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    started = time.perf_counter()
+    running = []
+    with contextlib.redirect_stdout(io.StringIO()):  # les logs du worker fausseraient la mesure
+        for user in range(args.requests):
+            running.append(asyncio.create_task(one(user)))
+            await asyncio.sleep(rng.expovariate(args.rate))
+        await asyncio.gather(*running)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "batching": f"size={batch_size}, wait={max_wait_ms}ms" if batch_size else "off",
+        "llm_calls": fake_llm.calls,
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "prompt_tokens": optimizer.token_usage["prompt_tokens"],
+        "mean_batch_size": optimizer.batcher.stats()["mean_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=40.0, help="Demandes par seconde (moyenne)")
+    parser.add_argument("--call-overhead-ms", type=float, default=400.0)
+    parser.add_argument("--item-ms", type=float, default=15.0, help="Génération d'un créneau")
+    parser.add_argument("--provider-concurrency", type=int, default=8)
+    parser.add_argument(
+        "--settings", default="0:0,4:100,8:200,16:300",
+        help="Réglages testés, taille:attente_ms séparés par des virgules (0 = sans batching)",
+    )
+    args = parser.parse_args()
+
+    results = []
+    for spec in args.settings.split(","):
+        size, wait = (int(value) for value in spec.split(":"))
+        results.append(asyncio.run(run_scenario(args, size, wait)))
+    report = {
+        "requests": args.requests,
+        "arrival_rate_rps": args.rate,
+        "call_overhead_ms": args.call_overhead_ms,
+        "item_ms": args.item_ms,
+        "provider_concurrency": args.provider_concurrency,
+        "scenarios": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark : politique d'appel à Gemini (échéance, hedging, tiering, repli), latence et succès.
+
+Trois faux modèles (interface LangChain, aucun appel réseau) avec des pannes réalistes :
+une part d'appels très lents (file d'attente du fournisseur), des 503 et des réponses
+qui ne sont pas le JSON demandé.
+- "avant" : un seul modèle, ni échéance ni hedging ; une erreur = planning du solveur
+  (avant, la tâche Celery échouait) ;
+- "apres" : réglages LLM_* par défaut (solveur pour 1 tâche, modèle rapide jusqu'à
+  LLM_FAST_MAX_TASKS, hedging au p95, chaîne de repli, échéance LLM_DEADLINE_SECONDS).
+
+Les demandes (1 à 8 tâches) arrivent au rythme --rate sur un seul process, comme dans un
+worker en mode asynchrone. Mêmes pannes tirées pour les deux scénarios.
+
+    python -m benchmarks.bench_llm_policy --requests 300 --rate 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")  # chaque demande doit vraiment appeler le modèle
+
+from app.core.config import settings  # noqa: E402
+from app.core.metrics import LLM_SOLVER_FALLBACKS  # noqa: E402
+from app.services.ai_engine import model_policy as policy_module  # noqa: E402
+from app.services.ai_engine.optimizer import AIOptimizer  # noqa: E402
+from benchmarks.bench_http_client import percentile  # noqa: E402
+from benchmarks.fake_llm import FakeGemini, echo_schedules  # noqa: E402
+
+POLICY_SETTINGS = (
+    "LLM_FAST_MODEL", "LLM_FALLBACK_MODELS", "LLM_DETERMINISTIC_MAX_TASKS", "LLM_DEADLINE_SECONDS", "LLM_HEDGE_ENABLED",
+)
+
+
+def make_models(args) -> dict:
+    common = dict(responder=echo_schedules, slow_latency_ms=args.slow_ms, item_latency_ms=args.item_ms)
+    return {
+        settings.LLM_MODEL: FakeGemini(
+            latency_ms=args.latency_ms, slow_rate=args.slow_rate, failure_rate=args.failure_rate,
+            garbage_rate=args.garbage_rate, seed=1, **common,
+        ),
+        settings.LLM_FAST_MODEL: FakeGemini(
+            latency_ms=args.latency_ms * 0.5, slow_rate=args.slow_rate, failure_rate=args.failure_rate,
+            garbage_rate=args.garbage_rate, seed=2, **common,
+        ),
+        **{
+            model: FakeGemini(latency_ms=args.latency_ms * 1.5, slow_rate=args.slow_rate / 2, seed=3 + i, **common)
+            for i, model in enumerate(settings.LLM_FALLBACK_MODELS)
+        },
+    }
+
+
+def make_tasks(user: int, count: int) -> list:
+    return [
+        {"title": f"Tâche {user}-{i}", "duration": 30 + 15 * (i % 3), "priority": 1 + i % 3, "preferred_time": None}
+        for i in range(count)
+    ]
+
+
+def solver_fallbacks() -> float:
+    return sum(
+        sample.value for metric in LLM_SOLVER_FALLBACKS.collect() for sample in metric.samples
+        if sample.name.endswith("_total") and sample.labels["reason"] != "small_request"
+    )
+
+
+async def run_scenario(args, name: str, overrides: dict) -> dict:
+    models = make_models(args)
+    defaults = {key: getattr(settings, key) for key in POLICY_SETTINGS}
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    # Statistiques neuves : chaque scénario démarre sans historique
+    policy_module.model_stats.reset()
+    optimizer = AIOptimizer(llm=models)
+    rng = random.Random(42)  # mêmes arrivées et mêmes tailles pour tous les scénarios
+    latencies = []
+    fallbacks_before = solver_fallbacks()
+
+    async def one(user: int, task_count: int) -> None:
+        t0 = time.perf_counter()
+        await optimizer.optimize_schedule([], make_tasks(user, task_count), "Europe/Paris", use_cache=False)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    running = []
+    try:
+        # Les logs du worker (un avertissement par repli) fausseraient la mesure
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            for user in range(args.requests):
+                running.append(asyncio.create_task(one(user, rng.randint(1, 8))))
+                await asyncio.sleep(rng.expovariate(args.rate))
+            await asyncio.gather(*running)
+    finally:
+        for key, value in defaults.items():
+            setattr(settings, key, value)
+
+    return {
+        "scenario": name,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies), 1),
+        "solver_fallbacks": int(solver_fallbacks() - fallbacks_before),
+        "llm_calls": {model: fake.calls for model, fake in models.items() if fake.calls},
+        "model_stats": policy_module.model_stats.snapshot(),
+    }
+
+
+async def main_async(args) -> list:
+    before = {
+        "LLM_FAST_MODEL": "", "LLM_FALLBACK_MODELS": [], "LLM_DETERMINISTIC_MAX_TASKS": 0,
+        "LLM_DEADLINE_SECONDS": 300.0, "LLM_HEDGE_ENABLED": False,
+    }
+    return [await run_scenario(args, "avant", before), await run_scenario(args, "apres", {})]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=10, help="Demandes par seconde (arrivées poissoniennes)")
+    parser.add_argument("--latency-ms", type=float, default=1200, help="Coût fixe d'un appel au modèle principal")
+    parser.add_argument("--item-ms", type=float, default=60, help="Coût par créneau généré")
+    parser.add_argument("--slow-rate", type=float, default=0.05, help="Part des appels très lents")
+    parser.add_argument("--slow-ms", type=float, default=60000)
+    parser.add_argument("--failure-rate", type=float, default=0.03, help="Part des appels en erreur (503)")
+    parser.add_argument("--garbage-rate", type=float, default=0.02, help="Part des réponses illisibles")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
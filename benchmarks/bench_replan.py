@@ -0,0 +1,163 @@
+"""
+Benchmark : mise à jour d'un planning de plusieurs semaines, re-planification incrémentale
+(POST /plan/replan) vs recalcul complet (solveur, puis aller-retour LLM).
+
+Le planning (--tasks tâches, --events-per-day réunions par jour ouvré sur PLAN_HORIZON_DAYS)
+est enregistré en base puis modifié --rounds fois par diff :
+- "ajout" : une nouvelle tâche ;
+- "deplacement" : une tâche déplacée à la main (créneau épinglé) ;
+- "agenda" : un nouvel événement qui chevauche un créneau (la tâche est délogée) ;
+- "suppression" : une tâche supprimée (le trou libéré sert aux tâches sans place).
+Le recalcul complet est mesuré une fois : solveur déterministe en mémoire (sans base) et
+faux Gemini à latence réaliste. Agenda local toujours "frais" : Google n'est jamais appelé.
+
+    DATABASE_URL=sqlite+aiosqlite:////tmp/kairos_replan.db \\
+        python -m benchmarks.bench_replan --tasks 200 --rounds 50
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")  # chaque recalcul doit vraiment appeler le modèle
+os.environ.setdefault("LLM_HEDGE_ENABLED", "false")
+os.environ.setdefault("LLM_DEADLINE_SECONDS", "600")  # on mesure l'aller-retour complet, sans repli
+os.environ.setdefault("CALENDAR_SYNC_MAX_AGE_SECONDS", str(10 ** 9))
+
+from sqlmodel import SQLModel  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.calendar_event import CalendarEvent, CalendarSyncState  # noqa: E402
+from app.models.task import ScheduledSlot, Task  # noqa: E402,F401
+from app.models.user import User  # noqa: E402
+from app.schemas.ai import TaskRequest  # noqa: E402
+from app.schemas.planning import CalendarChange, ReplanRequest, TaskMove  # noqa: E402
+from app.services.ai_engine.optimizer import AIOptimizer  # noqa: E402
+from app.services.calendar_service import calendar_service  # noqa: E402
+from app.services.optimizer import DeterministicScheduler  # noqa: E402
+from app.services.replanner import incremental_planner  # noqa: E402
+from benchmarks.bench_http_client import percentile  # noqa: E402
+from benchmarks.fake_llm import FakeGemini, echo_schedules  # noqa: E402
+
+TIMEZONE = "Europe/Paris"
+
+
+def make_task(rng: random.Random, i: int) -> TaskRequest:
+    preferred = rng.choice(["09:00", "14:00", "17:30"]) if i % 10 == 0 else None
+    return TaskRequest(title=f"Tâche {i}", duration=rng.choice([30, 45, 60, 90]), priority=1 + i % 3,
+                       preferred_time=preferred)
+
+
+async def seed(args, rng: random.Random):
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    now = datetime.now(timezone.utc)
+    async with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="")
+        db.add(user)
+        await db.commit()
+        db.add(CalendarSyncState(
+            user_id=user.id, sync_token="bench", last_synced_at=now,
+            synced_until=now + timedelta(days=settings.PLAN_HORIZON_DAYS + 2),
+        ))
+        day = now.replace(hour=8, minute=0, second=0, microsecond=0)
+        for d in range(settings.PLAN_HORIZON_DAYS + 1):
+            if (day + timedelta(days=d)).weekday() >= 5:
+                continue
+            for e in range(args.events_per_day):
+                begin = day + timedelta(days=d, hours=rng.randint(0, 9), minutes=rng.choice([0, 30]))
+                end = begin + timedelta(minutes=rng.choice([30, 60]))
+                db.add(CalendarEvent(
+                    user_id=user.id, event_id=f"evt{d}-{e}", title="Réunion",
+                    start=begin.isoformat(), end=end.isoformat(), start_at=begin, end_at=end,
+                ))
+        await db.commit()
+        # Planning initial : toutes les tâches d'un coup, enregistrées en base
+        tasks = [make_task(rng, i) for i in range(args.tasks)]
+        await incremental_planner.replan(user.id, ReplanRequest(user_timezone=TIMEZONE, added=tasks), db)
+    return user.id
+
+
+async def one_diff(user_id, kind: str, rng: random.Random, round_: int) -> float:
+    async with SessionLocal() as db:
+        plan = [item for item in await incremental_planner.get_plan(user_id, db, TIMEZONE) if item.start]
+        target = rng.choice(plan)
+        if kind == "ajout":
+            diff = ReplanRequest(user_timezone=TIMEZONE, added=[make_task(rng, 10**6 + round_)])
+        elif kind == "deplacement":
+            start = datetime.fromisoformat(target.start) + timedelta(days=rng.randint(1, 5))
+            diff = ReplanRequest(user_timezone=TIMEZONE, moved=[TaskMove(task_id=target.task_id, start=start)])
+        elif kind == "agenda":
+            diff = ReplanRequest(user_timezone=TIMEZONE, calendar=[CalendarChange(
+                event_id=f"new{round_}", title="Imprévu", start=target.start, end=target.end,
+            )])
+        else:
+            diff = ReplanRequest(user_timezone=TIMEZONE, removed=[target.task_id])
+    # Mesure : une session neuve, comme une requête de l'API (lecture + diff + écriture)
+    async with SessionLocal() as db:
+        started = time.perf_counter()
+        await incremental_planner.replan(user_id, diff, db)
+        return (time.perf_counter() - started) * 1000
+
+
+async def full_solve(args, user_id) -> dict:
+    async with SessionLocal() as db:
+        now = datetime.now(timezone.utc)
+        events = await calendar_service.get_upcoming_events(
+            user_id, db, user_timezone=TIMEZONE, until=now + timedelta(days=settings.PLAN_HORIZON_DAYS),
+        )
+        tasks = [TaskRequest(**item.dict(include={"title", "duration", "priority", "preferred_time"}))
+                 for item in await incremental_planner.get_plan(user_id, db, TIMEZONE)]
+    scheduler = DeterministicScheduler(horizon_days=settings.PLAN_HORIZON_DAYS)
+    started = time.perf_counter()
+    scheduler.schedule(events, tasks, TIMEZONE)
+    solver_ms = (time.perf_counter() - started) * 1000
+
+    llm = FakeGemini(responder=echo_schedules, latency_ms=args.llm_latency_ms, item_latency_ms=args.item_ms)
+    optimizer = AIOptimizer(llm=llm)
+    started = time.perf_counter()
+    await optimizer.optimize_schedule(events, tasks, TIMEZONE, engine="llm", use_cache=False)
+    llm_ms = (time.perf_counter() - started) * 1000
+    return {"tasks": len(tasks), "events": len(events), "solver_ms": round(solver_ms, 1), "llm_ms": round(llm_ms, 1)}
+
+
+async def main_async(args) -> dict:
+    rng = random.Random(42)
+    # Les logs (un par diff) fausseraient la mesure
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        user_id = await seed(args, rng)
+        incremental = {}
+        for kind in ("ajout", "deplacement", "agenda", "suppression"):
+            latencies = [await one_diff(user_id, kind, rng, i) for i in range(args.rounds)]
+            incremental[kind] = {
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "max_ms": round(max(latencies), 2),
+            }
+        full = await full_solve(args, user_id)
+    await engine.dispose()
+    return {"horizon_days": settings.PLAN_HORIZON_DAYS, "incremental": incremental, "full": full}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200, help="Tâches du planning initial")
+    parser.add_argument("--events-per-day", type=int, default=3, help="Réunions par jour ouvré")
+    parser.add_argument("--rounds", type=int, default=50, help="Diffs mesurés par type")
+    parser.add_argument("--llm-latency-ms", type=float, default=2500, help="Coût fixe d'un appel au faux Gemini")
+    parser.add_argument("--item-ms", type=float, default=60, help="Coût par créneau généré")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
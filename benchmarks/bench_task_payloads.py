@@ -0,0 +1,170 @@
+"""
+Benchmark : mémoire Redis occupée par les optimisations IA en cours (broker + backend Celery).
+
+Pour N optimisations en vol (message dans la file, puis résultat gardé dans le backend) :
+- "avant" : agenda et tâches en arguments JSON du message, résultat en JSON sans expiration ;
+- "après" : arguments de plus de TASK_PAYLOAD_MIN_BYTES déposés une fois dans Redis
+  (msgpack + zlib, clé = empreinte du contenu), résultat en `kairos-msgpack`.
+
+Les messages sont construits par Celery / kombu comme pour un vrai envoi (enveloppe du
+transport Redis comprise). On compte les octets des valeurs stockées, pas le surcoût
+fixe de Redis par clé (~50-100 octets).
+
+    python -m benchmarks.bench_task_payloads --inflight 1000 --events 50
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from kombu.serialization import dumps  # noqa: E402
+
+from app.core.celery_app import celery_app  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.serialization import RESULT_SERIALIZER  # noqa: E402
+from app.services.optimizer import deterministic_scheduler  # noqa: E402
+from app.services.task_payloads import task_payloads  # noqa: E402
+from app.workers.ai_task import optimize_schedule_task  # noqa: E402
+
+
+class _MemoryRedis:
+    """Juste ce que task_payloads utilise ; garde les valeurs pour les compter."""
+
+    def __init__(self):
+        self.values = {}
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def get(self, key):
+        return self.values.get(key)
+
+
+def make_events(user: int, count: int, rng: random.Random) -> list:
+    """Agenda tel que le renvoie calendar_service (copie locale des événements Google)."""
+    start_day = datetime.now(timezone.utc).replace(hour=8, minute=0, second=0, microsecond=0)
+    events = []
+    for i in range(count):
+        start = start_day + timedelta(days=i % 7, hours=rng.randint(0, 10), minutes=rng.choice((0, 15, 30, 45)))
+        events.append({
+            "id": uuid.UUID(int=rng.getrandbits(128)).hex[:26],
+            "title": rng.choice(("Réunion d'équipe", "Point client", "Déjeuner", "Revue de code", "1:1")) + f" {user}",
+            "start": start.isoformat(),
+            "end": (start + timedelta(minutes=rng.choice((30, 45, 60, 90)))).isoformat(),
+            "is_fixed": True,
+            "source": "google",
+        })
+    return events
+
+
+def make_tasks(user: int, count: int) -> list:
+    return [
+        {"title": f"Tâche {user}-{i}", "duration": 30 + 15 * (i % 3), "priority": 1 + i % 3, "preferred_time": None}
+        for i in range(count)
+    ]
+
+
+def broker_bytes(kwargs: dict) -> int:
+    """Taille du message dans la liste Redis du broker (corps JSON en base64 + enveloppe kombu)."""
+    task_id = str(uuid.uuid4())
+    message = celery_app.amqp.as_task_v2(task_id, optimize_schedule_task.name, args=(), kwargs=kwargs)
+    content_type, encoding, body = dumps(message.body, serializer="json")
+    properties = dict(message.properties)
+    properties.update({
+        "body_encoding": "base64", "delivery_tag": str(uuid.uuid4()), "priority": 0,
+        "delivery_info": {"exchange": "", "routing_key": "celery"},
+    })
+    envelope = {
+        "body": base64.b64encode(body.encode() if isinstance(body, str) else body).decode(),
+        "content-encoding": encoding,
+        "content-type": content_type,
+        "headers": message.headers,
+        "properties": properties,
+    }
+    return len(json.dumps(envelope, default=str))
+
+
+def backend_bytes(task_id: str, result: list, serializer: str) -> int:
+    meta = {
+        "status": "SUCCESS", "result": result, "traceback": None, "children": [],
+        "date_done": datetime.now(timezone.utc).isoformat(), "task_id": task_id,
+    }
+    _, _, payload = dumps(meta, serializer=serializer)
+    return len(payload)
+
+
+async def measure(args) -> dict:
+    rng = random.Random(42)
+    store = _MemoryRedis()
+    import app.services.task_payloads as payloads_module
+    payloads_module.get_redis = lambda: store
+
+    totals = {key: 0 for key in ("broker_before", "backend_before", "broker_after", "payloads_after", "backend_after")}
+    for user in range(args.inflight):
+        events = make_events(user, args.events, rng)
+        # Une part des utilisateurs renvoie la même liste de tâches (modèles de journée)
+        tasks = make_tasks(user if rng.random() >= args.shared_tasks else 0, args.tasks)
+        schedule = deterministic_scheduler.schedule(current_events=events, tasks_todo=tasks, user_timezone="Europe/Paris")
+        result = [item.dict() for item in schedule]
+        kwargs = {"user_timezone": "Europe/Paris", "engine": "llm", "use_cache": False, "stream": False}
+        task_id = str(uuid.uuid4())
+
+        totals["broker_before"] += broker_bytes({**kwargs, "google_events": events, "tasks_todo": tasks})
+        totals["backend_before"] += backend_bytes(task_id, result, "json")
+
+        settings.TASK_PAYLOAD_BY_REFERENCE = True
+        by_ref = {
+            **kwargs,
+            "google_events": await task_payloads.put(events),
+            "tasks_todo": await task_payloads.put(tasks),
+        }
+        assert await task_payloads.resolve(by_ref["google_events"]) == events
+        totals["broker_after"] += broker_bytes(by_ref)
+        totals["backend_after"] += backend_bytes(task_id, result, RESULT_SERIALIZER)
+    totals["payloads_after"] = sum(len(value) for value in store.values.values())
+
+    before = totals["broker_before"] + totals["backend_before"]
+    after = totals["broker_after"] + totals["payloads_after"] + totals["backend_after"]
+    per_1000 = 1000 / args.inflight
+    return {
+        "inflight": args.inflight,
+        "events_per_user": args.events,
+        "payload_keys": len(store.values),
+        "per_1000_inflight_kb": {
+            "before": {
+                "broker": round(totals["broker_before"] * per_1000 / 1024, 1),
+                "backend": round(totals["backend_before"] * per_1000 / 1024, 1),
+                "total": round(before * per_1000 / 1024, 1),
+            },
+            "after": {
+                "broker": round(totals["broker_after"] * per_1000 / 1024, 1),
+                "payload_store": round(totals["payloads_after"] * per_1000 / 1024, 1),
+                "backend": round(totals["backend_after"] * per_1000 / 1024, 1),
+                "total": round(after * per_1000 / 1024, 1),
+            },
+            "saved": round((before - after) * per_1000 / 1024, 1),
+        },
+        "saved_ratio": round(1 - after / before, 3),
+        "result_expires_seconds": settings.CELERY_RESULT_EXPIRES_SECONDS,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inflight", type=int, default=1000, help="Optimisations en vol simultanément")
+    parser.add_argument("--events", type=int, default=50, help="Événements par agenda (fenêtre de planification)")
+    parser.add_argument("--tasks", type=int, default=6)
+    parser.add_argument("--shared-tasks", type=float, default=0.2, help="Part des demandes avec une liste de tâches commune")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(measure(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark : requêtes SQL par requête HTTP pour deps.get_current_user, avec et sans
+le cache d'identité, sur une charge mixte (popularité Zipf, nouvelles connexions,
+changements d'abonnement). L'horloge est simulée pour couvrir plusieurs minutes de trafic.
+
+    python -m benchmarks.bench_user_cache --requests 200000 --users 5000 --rps 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from uuid import uuid4
+
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from datetime import timedelta  # noqa: E402
+
+import app.core.cache as cache_module  # noqa: E402
+import app.services.user_cache as user_cache_module  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class CountingDB:
+    """Remplace l'AsyncSession : compte les db.get(User)."""
+
+    def __init__(self, users):
+        self.users = users
+        self.queries = 0
+
+    async def get(self, model, user_id):
+        self.queries += 1
+        return self.users.get(user_id)
+
+
+async def run(args, cached: bool) -> dict:
+    clock = VirtualClock()
+    cache_module.time = clock
+    user_cache_module.time = clock
+    random.seed(args.seed)
+
+    if not cached:
+        user_cache_module.settings.USER_CACHE_TTL_SECONDS = 0
+        user_cache_module.settings.TOKEN_CACHE_TTL_SECONDS = 0
+    cache = user_cache_module.UserIdentityCache()
+    deps.user_cache = cache
+
+    users = {}
+    tokens = []
+    for _ in range(args.users):
+        user = User(id=uuid4(), email=f"{uuid4().hex}@example.com", hashed_password="")
+        users[user.id] = user
+        tokens.append(create_access_token(user.id, timedelta(days=7)))
+    db = CountingDB(users)
+    population = list(users.values())
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.users)]
+
+    decode_calls = 0
+    original_decode = deps.jwt.decode
+
+    def counting_decode(*a, **kw):
+        nonlocal decode_calls
+        decode_calls += 1
+        return original_decode(*a, **kw)
+
+    deps.jwt.decode = counting_decode
+    try:
+        indexes = random.choices(range(args.users), weights=weights, k=args.requests)
+        for i in indexes:
+            clock.now += 1 / args.rps
+            if random.random() < args.login_rate:
+                # Nouvelle connexion : nouveau JWT pour cet utilisateur
+                tokens[i] = create_access_token(population[i].id, timedelta(days=7))
+            if random.random() < args.tier_change_rate:
+                user = population[i]
+                user.subscription_tier = "PRO" if user.subscription_tier == "FREE" else "FREE"
+                await cache.invalidate(user.id)
+            await deps.get_current_user(tokens[i], db)
+    finally:
+        deps.jwt.decode = original_decode
+
+    return {
+        "db_queries_per_request": round(db.queries / args.requests, 4),
+        "jwt_decodes_per_request": round(decode_calls / args.requests, 4),
+        **cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--rps", type=float, default=500.0, help="Débit simulé (détermine l'effet des TTL)")
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--login-rate", type=float, default=0.001)
+    parser.add_argument("--tier-change-rate", type=float, default=0.0005)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    settings = user_cache_module.settings
+    ttl = (settings.USER_CACHE_TTL_SECONDS, settings.TOKEN_CACHE_TTL_SECONDS)
+    with_cache = asyncio.run(run(args, cached=True))
+    settings.USER_CACHE_TTL_SECONDS, settings.TOKEN_CACHE_TTL_SECONDS = ttl
+    without_cache = asyncio.run(run(args, cached=False))
+
+    report = {
+        "requests": args.requests,
+        "users": args.users,
+        "simulated_rps": args.rps,
+        "without_cache": without_cache,
+        "with_cache": with_cache,
+        "db_query_reduction": round(
+            1 - with_cache["db_queries_per_request"] / without_cache["db_queries_per_request"], 4
+        ),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
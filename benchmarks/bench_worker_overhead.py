@@ -0,0 +1,110 @@
+"""
+Benchmark : surcoût par tâche du worker IA, hors temps de réponse de Gemini.
+
+- "avant" : asyncio.run() par tâche + client Gemini, parser, prompt et chaîne reconstruits
+  à chaque appel (ancien optimize_schedule_task) ;
+- "après" : boucle persistante du process (worker_loop) + chaîne construite une seule fois.
+
+Le modèle est remplacé par un faux Gemini local (réponse fixe, latence nulle par défaut) :
+la différence mesurée est donc uniquement du surcoût.
+
+    python -m benchmarks.bench_worker_overhead --tasks 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")  # on mesure le calcul, pas le cache
+
+from langchain_core.output_parsers import PydanticOutputParser  # noqa: E402
+from langchain_core.prompts import PromptTemplate  # noqa: E402
+from langchain_google_genai import ChatGoogleGenerativeAI  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.schemas.ai import OptimizedSchedule  # noqa: E402
+from app.services.ai_engine.optimizer import LLM_MODEL, SCHEDULE_TEMPLATE, AIOptimizer  # noqa: E402
+from app.services.ai_engine.prompt_encoding import encode_schedule_prompt  # noqa: E402
+from app.services.optimizer import resolve_timezone  # noqa: E402
+from app.services.schedule_validator import schedule_validator  # noqa: E402
+from app.workers.event_loop import WorkerEventLoop  # noqa: E402
+from benchmarks.bench_http_client import summarize  # noqa: E402
+from benchmarks.fake_llm import FakeGemini, schedule_response  # noqa: E402
+
+TASKS = [
+    {"title": f"Tâche {i}", "duration": 30 + 15 * (i % 3), "priority": 1 + i % 3, "preferred_time": None}
+    for i in range(6)
+]
+
+
+async def legacy_optimize(fake_llm, events, tasks, user_timezone):
+    """Reproduction de l'ancien chemin : tout est reconstruit à chaque appel."""
+    now = datetime.now(resolve_timezone(user_timezone))
+    ChatGoogleGenerativeAI(  # construit puis remplacé par le faux modèle : on ne garde que son coût
+        model=LLM_MODEL, google_api_key=settings.GOOGLE_API_KEY, temperature=0.1,
+        convert_system_message_to_human=True, transport="rest",
+    )
+    parser = PydanticOutputParser(pydantic_object=OptimizedSchedule)
+    prompt = PromptTemplate(
+        template=SCHEDULE_TEMPLATE,
+        input_variables=["now", "timezone", "horizon", "busy", "tasks"],
+        partial_variables={"format_instructions": parser.get_format_instructions()},
+    )
+    chain = prompt | fake_llm | parser
+    encoded = encode_schedule_prompt(lambda inputs: prompt.format(**inputs), events, tasks, user_timezone, now)
+    result = await chain.ainvoke(encoded.inputs)
+    schedule, _ = schedule_validator.repair(result.schedule, events, tasks, user_timezone, now=now)
+    return schedule
+
+
+def run_legacy(fake_llm, n: int) -> list:
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        asyncio.run(legacy_optimize(fake_llm, [], TASKS, "Europe/Paris"))
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def run_persistent(fake_llm, n: int) -> list:
+    loop = WorkerEventLoop()
+    optimizer = AIOptimizer(llm=fake_llm)
+    loop.start()  # équivalent de worker_process_init
+    optimizer.warm_up()
+    samples = []
+    try:
+        for _ in range(n):
+            t0 = time.perf_counter()
+            loop.run(optimizer.optimize_schedule([], TASKS, "Europe/Paris", use_cache=False))
+            samples.append((time.perf_counter() - t0) * 1000)
+    finally:
+        loop.stop()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence simulée de Gemini")
+    parser.add_argument("--warmup", type=int, default=5)
+    args = parser.parse_args()
+
+    fake_llm = FakeGemini(response=schedule_response(TASKS), latency_ms=args.latency_ms)
+    legacy = summarize(run_legacy(fake_llm, args.tasks), args.warmup)
+    persistent = summarize(run_persistent(fake_llm, args.tasks), args.warmup)
+    report = {
+        "tasks": args.tasks,
+        "fake_llm_latency_ms": args.latency_ms,
+        "legacy_asyncio_run": legacy,
+        "persistent_loop": persistent,
+        "overhead_removed_ms_per_task": round(legacy["mean_ms"] - persistent["mean_ms"], 3),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Benchmark : optimisations IA par seconde et par Go de mémoire worker, prefork vs mode asynchrone.
+
+- "prefork" : `celery worker -P prefork -c N`, un process par optimisation en vol ;
+- "async" : WORKER_ASYNC_MODE (un seul process, WORKER_MAX_IN_FLIGHT optimisations en
+  vol sur la boucle asyncio partagée).
+
+Chaque variante lance un vrai worker Celery en sous-process (broker `filesystem://` et
+backend `file://` dans un dossier temporaire : aucun Redis nécessaire) qui appelle un faux
+Gemini à latence réaliste via le vrai client LangChain. Le même lot de demandes est envoyé
+d'un coup ; la mémoire est le pic de PSS de l'arbre de process du worker (/proc, Linux).
+
+    python -m benchmarks.bench_worker_pool --tasks 256 --prefork-concurrency 8 --in-flight 64
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_ENV = {
+    "BASE_URL": "http://localhost:8000",
+    "GOOGLE_API_KEY": "benchmark",
+    "LLM_CACHE_ENABLED": "false",  # chaque demande doit vraiment appeler le modèle
+    "METRICS_WORKER_PORT": "0",
+    "LOG_LEVEL": "WARNING",
+}
+os.environ.update({key: value for key, value in BENCH_ENV.items() if key not in os.environ})
+
+
+def configure_transport(workdir: str) -> None:
+    """Broker et backend fichiers partagés entre ce process et le worker."""
+    from app.core.celery_app import celery_app
+
+    messages = os.path.join(workdir, "broker")
+    results = os.path.join(workdir, "results")
+    os.makedirs(messages, exist_ok=True)
+    os.makedirs(results, exist_ok=True)
+    celery_app.conf.broker_url = "filesystem://"
+    celery_app.conf.broker_transport_options = {
+        "data_folder_in": messages, "data_folder_out": messages, "polling_interval": 0.05,
+        "control_folder": os.path.join(workdir, "control"),  # sinon créé dans le dossier courant
+    }
+    celery_app.conf.result_backend = f"file://{results}"
+
+
+def serve_worker(workdir: str, argv: list) -> None:
+    """Point d'entrée du sous-process (`--serve-worker`)."""
+    configure_transport(workdir)
+    from app.core.celery_app import celery_app
+
+    celery_app.worker_main(["worker", "--loglevel=warning", "--without-heartbeat", "--without-mingle",
+                            "--without-gossip", *argv])
+
+
+def process_tree(root: int) -> list:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [root]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+def pss_bytes(pids: list) -> int:
+    """PSS : les pages partagées après le fork ne sont comptées qu'une fois sur l'arbre."""
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class MemorySampler(threading.Thread):
+    def __init__(self, root: int, interval: float = 0.2):
+        super().__init__(daemon=True)
+        self.root = root
+        self.interval = interval
+        self.peak = 0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.is_set():
+            self.peak = max(self.peak, pss_bytes(process_tree(self.root)))
+            self._done.wait(self.interval)
+
+    def stop(self) -> int:
+        self._done.set()
+        self.join()
+        return self.peak
+
+
+def make_tasks(user: int) -> list:
+    return [
+        {"title": f"Tâche {user}-{i}", "duration": 30 + 15 * (i % 3), "priority": 1 + i % 3, "preferred_time": None}
+        for i in range(4)
+    ]
+
+
+def submit(count: int, offset: int = 0) -> list:
+    from app.services.admission import DEFAULT_TIER, queue_for
+    from app.workers.ai_task import optimize_schedule_task
+
+    return [
+        optimize_schedule_task.apply_async(
+            kwargs={
+                "google_events": [], "tasks_todo": make_tasks(offset + user), "user_timezone": "Europe/Paris",
+                "engine": "llm", "use_cache": False,
+            },
+            queue=queue_for(DEFAULT_TIER),
+        )
+        for user in range(count)
+    ]
+
+
+def wait_all(results: list, timeout: float) -> int:
+    failures = 0
+    deadline = time.monotonic() + timeout
+    for result in results:
+        try:
+            result.get(timeout=max(1.0, deadline - time.monotonic()), interval=0.05, propagate=True)
+        except Exception:
+            failures += 1
+    return failures
+
+
+def run_variant(args, name: str, env: dict, argv: list, workdir: str) -> dict:
+    from app.services.admission import DEFAULT_TIER, queue_for
+
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_worker_pool", "--serve-worker", workdir, "--",
+         "-Q", queue_for(DEFAULT_TIER), *argv],
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        # Démarrage, construction de la chaîne LLM et première connexion : hors mesure
+        if wait_all(submit(1, offset=10**6), timeout=120):
+            raise SystemExit(f"{name} : le worker ne traite pas les tâches")
+        sampler = MemorySampler(worker.pid)
+        sampler.start()
+        started = time.perf_counter()
+        failures = wait_all(submit(args.tasks), timeout=args.timeout)
+        elapsed = time.perf_counter() - started
+        peak = sampler.stop()
+    finally:
+        worker.terminate()
+        worker.wait(timeout=60)
+
+    throughput = (args.tasks - failures) / elapsed
+    return {
+        "worker": name,
+        "in_flight": args.prefork_concurrency if name == "prefork" else args.in_flight,
+        "processes": 1 + (args.prefork_concurrency if name == "prefork" else 0),
+        "tasks": args.tasks,
+        "failures": failures,
+        "duration_s": round(elapsed, 1),
+        "throughput_per_s": round(throughput, 2),
+        "peak_pss_mb": round(peak / 2**20, 1),
+        "throughput_per_s_per_gb": round(throughput / (peak / 2**30), 1) if peak else None,
+    }
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--serve-worker":
+        serve_worker(sys.argv[2], sys.argv[4:])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=256, help="Optimisations envoyées d'un coup")
+    parser.add_argument("--prefork-concurrency", type=int, default=8, help="Process prefork (-c)")
+    parser.add_argument("--in-flight", type=int, default=64, help="WORKER_MAX_IN_FLIGHT du mode asynchrone")
+    parser.add_argument("--llm-latency-ms", type=float, default=2500, help="Coût fixe d'un appel au faux Gemini")
+    parser.add_argument("--item-ms", type=float, default=150, help="Coût par créneau généré")
+    parser.add_argument("--timeout", type=float, default=900)
+    parser.add_argument("--port", type=int, default=8821)
+    args = parser.parse_args()
+
+    from benchmarks.fake_gemini import FakeGeminiConfig, create_fake_gemini_app
+    from benchmarks.fake_google import BackgroundServer
+
+    gemini = create_fake_gemini_app(FakeGeminiConfig(latency_ms=args.llm_latency_ms, item_latency_ms=args.item_ms))
+    report = []
+    with BackgroundServer(gemini, args.port) as server, tempfile.TemporaryDirectory(prefix="kairos-pool-") as workdir:
+        configure_transport(workdir)
+        env = {"GEMINI_BASE_URL": server.base_url}
+        variants = {
+            "prefork": ({**env, "WORKER_ASYNC_MODE": "false"}, ["-P", "prefork", "-c", str(args.prefork_concurrency)]),
+            "async": ({**env, "WORKER_ASYNC_MODE": "true", "WORKER_MAX_IN_FLIGHT": str(args.in_flight)}, []),
+        }
+        for name, (variant_env, argv) in variants.items():
+            report.append(run_variant(args, name, variant_env, argv, workdir))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Faux serveur Gemini (API REST generateContent / streamGenerateContent) pour les tests de charge :
+le vrai client LangChain est utilisé de bout en bout (GEMINI_BASE_URL), seules les réponses
+sont simulées. Le planning renvoyé est construit à partir des tâches du prompt.
+"""
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from benchmarks.fake_llm import echo_schedules
+
+
+@dataclass
+class FakeGeminiConfig:
+    latency_ms: float = 0.0       # coût fixe d'un appel
+    item_latency_ms: float = 0.0  # génération : coût par créneau écrit dans la réponse
+    failure_rate: float = 0.0     # part de réponses 503 ("model overloaded")
+    chunk_chars: int = 40         # taille des morceaux en streaming
+
+
+def _candidate(text: str, finish: bool) -> dict:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return candidate
+
+
+def _usage(prompt: str, text: str) -> dict:
+    prompt_tokens, response_tokens = len(prompt) // 4, len(text) // 4
+    return {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": response_tokens,
+        "totalTokenCount": prompt_tokens + response_tokens,
+    }
+
+
+def create_fake_gemini_app(config: FakeGeminiConfig) -> Starlette:
+    async def generate(request: Request):
+        model, _, method = request.path_params["model_method"].partition(":")
+        body = await request.json()
+        prompt = "".join(part.get("text", "") for part in body["contents"][-1]["parts"])
+        if config.failure_rate and random.random() < config.failure_rate:
+            await asyncio.sleep(config.latency_ms / 1000)
+            return JSONResponse(
+                {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}},
+                status_code=503,
+            )
+
+        text = echo_schedules(prompt)
+        delay = (config.latency_ms + config.item_latency_ms * text.count('"title"')) / 1000
+        if method == "generateContent":
+            await asyncio.sleep(delay)
+            return JSONResponse({
+                "candidates": [_candidate(text, finish=True)],
+                "usageMetadata": _usage(prompt, text),
+                "modelVersion": model,
+            })
+
+        # streamGenerateContent?alt=sse : la latence est répartie sur les morceaux
+        chunks = [text[i:i + config.chunk_chars] for i in range(0, len(text), config.chunk_chars)] or [""]
+
+        async def events():
+            for i, chunk in enumerate(chunks):
+                await asyncio.sleep(delay / len(chunks))
+                last = i == len(chunks) - 1
+                payload = {"candidates": [_candidate(chunk, finish=last)], "modelVersion": model}
+                if last:
+                    payload["usageMetadata"] = _usage(prompt, text)
+                yield f"data: {json.dumps(payload)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return Starlette(routes=[
+        Route("/v1beta/models/{model_method}", generate, methods=["POST"]),
+    ])
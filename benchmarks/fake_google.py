@@ -0,0 +1,215 @@
+"""
+Faux serveur Google (OAuth token + Calendar events) pour les benchmarks.
+Latence et taux d'erreur configurables ; TLS optionnel (certificat auto-signé)
+pour mesurer le coût réel des handshakes. Comme l'API réelle : ressources complètes,
+réponse partielle (`fields`), fenêtre timeMin / timeMax, pagination et gzip.
+"""
+import asyncio
+import datetime as dt
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+@dataclass
+class FakeGoogleConfig:
+    latency_ms: float = 0.0       # latence ajoutée à chaque réponse
+    failure_rate: float = 0.0     # part de réponses 503
+    events_count: int = 50        # nombre d'événements renvoyés par GET /events (un toutes les 2 h)
+
+
+def _item_fields(mask: Optional[str]) -> Optional[set]:
+    """`items(id,summary,start(date,dateTime)),nextPageToken` -> {"id", "summary", "start"}."""
+    if not mask or "items(" not in mask:
+        return None
+    inner, depth, names, current = mask[mask.index("items(") + 6:], 0, set(), ""
+    for char in inner:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            if depth == 0:
+                break
+            depth -= 1
+        elif char == "," and depth == 0:
+            names.add(current.strip())
+            current = ""
+        elif depth == 0:
+            current += char
+    names.add(current.strip())
+    return names
+
+
+def _full_event(i: int, begin: dt.datetime) -> dict:
+    """Ressource complète, comme la renvoie Google sans masque `fields`."""
+    created = (begin - dt.timedelta(days=14)).isoformat().replace("+00:00", "Z")
+    return {
+        "kind": "calendar#event",
+        "etag": f'"{3400000000000000 + i}"',
+        "id": f"evt{i}",
+        "status": "confirmed",
+        "htmlLink": f"https://www.google.com/calendar/event?eid=ZXZ0{i}bWVAZXhhbXBsZS5jb20",
+        "created": created,
+        "updated": created,
+        "summary": f"Événement {i}",
+        "description": "Ordre du jour : point d'avancement, risques, prochaines étapes.",
+        "location": "Salle Horizon, 3e étage",
+        "creator": {"email": "me@example.com", "self": True},
+        "organizer": {"email": "me@example.com", "self": True},
+        "start": {"dateTime": begin.isoformat(), "timeZone": "Europe/Paris"},
+        "end": {"dateTime": (begin + dt.timedelta(minutes=45)).isoformat(), "timeZone": "Europe/Paris"},
+        "iCalUID": f"evt{i}@google.com",
+        "sequence": 0,
+        "attendees": [
+            {"email": "me@example.com", "organizer": True, "self": True, "responseStatus": "accepted"},
+            {"email": f"collegue{i % 7}@example.com", "responseStatus": "needsAction"},
+        ],
+        "hangoutLink": f"https://meet.google.com/abc-defg-{i:03d}",
+        "reminders": {"useDefault": True},
+        "eventType": "default",
+    }
+
+
+def create_fake_google_app(config: FakeGoogleConfig) -> Starlette:
+    async def _delay_or_fail() -> Optional[JSONResponse]:
+        if config.latency_ms:
+            await asyncio.sleep(config.latency_ms / 1000)
+        if config.failure_rate and random.random() < config.failure_rate:
+            return JSONResponse({"error": "backendError"}, status_code=503)
+        return None
+
+    async def token(request: Request):
+        failure = await _delay_or_fail()
+        if failure:
+            return failure
+        return JSONResponse({
+            "access_token": f"fake-{time.time_ns()}",
+            "expires_in": 3599,
+            "token_type": "Bearer",
+        })
+
+    async def list_events(request: Request):
+        failure = await _delay_or_fail()
+        if failure:
+            return failure
+        sync_token = request.query_params.get("syncToken")
+        if sync_token == "expired":
+            return JSONResponse({"error": {"code": 410, "message": "Sync token is no longer valid"}}, status_code=410)
+        if sync_token:
+            # Synchro incrémentale : rien n'a changé depuis le dernier passage
+            return JSONResponse({"kind": "calendar#events", "items": [], "nextSyncToken": f"sync-{time.time_ns()}"})
+
+        # Synchro complète, paginée comme l'API réelle (maxResults / pageToken), bornée par timeMax
+        page_size = int(request.query_params.get("maxResults", 250))
+        offset = int(request.query_params.get("pageToken", 0))
+        start = dt.datetime.now(dt.timezone.utc).replace(minute=0, second=0, microsecond=0)
+        time_max = request.query_params.get("timeMax")
+        last = config.events_count
+        if time_max:
+            limit = dt.datetime.fromisoformat(time_max.replace("Z", "+00:00"))
+            # Événement i : début à start + (2i + 1) h, gardé s'il commence avant timeMax
+            last = min(last, max(0, math.ceil(((limit - start).total_seconds() / 3600 - 1) / 2)))
+        keep = _item_fields(request.query_params.get("fields"))
+        items = []
+        for i in range(offset, min(offset + page_size, last)):
+            item = _full_event(i, start + dt.timedelta(hours=2 * i + 1))
+            items.append({key: value for key, value in item.items() if key in keep} if keep else item)
+        body = {"kind": "calendar#events", "items": items}
+        if offset + page_size < last:
+            body["nextPageToken"] = str(offset + page_size)
+        else:
+            body["nextSyncToken"] = f"sync-{time.time_ns()}"
+        return JSONResponse(body)
+
+    async def create_event(request: Request):
+        failure = await _delay_or_fail()
+        if failure:
+            return failure
+        body = await request.json()
+        return JSONResponse({"id": f"created-{time.time_ns()}", "status": "confirmed", **body})
+
+    return Starlette(
+        routes=[
+            Route("/token", token, methods=["POST"]),
+            Route("/calendar/v3/calendars/primary/events", list_events, methods=["GET"]),
+            Route("/calendar/v3/calendars/primary/events", create_event, methods=["POST"]),
+        ],
+        middleware=[Middleware(GZipMiddleware, minimum_size=500)],
+    )
+
+
+def make_self_signed_cert(directory: str) -> Tuple[str, str]:
+    """Génère un certificat auto-signé pour 127.0.0.1 (fichiers cert, clé)."""
+    import ipaddress
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = dt.datetime.now(dt.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - dt.timedelta(days=1))
+        .not_valid_after(now + dt.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+class BackgroundServer:
+    """Lance une app ASGI avec uvicorn dans un thread (démarrage / arrêt propres)."""
+
+    def __init__(self, app, port: int, tls: bool = False):
+        self.port = port
+        self.tls = tls
+        ssl_options = {}
+        if tls:
+            self._tmp = tempfile.TemporaryDirectory()
+            cert, key = make_self_signed_cert(self._tmp.name)
+            ssl_options = {"ssl_certfile": cert, "ssl_keyfile": key}
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", **ssl_options)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"{'https' if self.tls else 'http'}://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
@@ -0,0 +1,132 @@
+"""
+Faux modèle Gemini (interface LangChain) pour les benchmarks : réponse JSON fixe (ou
+calculée à partir du prompt), latence configurable, aucun appel réseau.
+"""
+import asyncio
+import datetime as dt
+import json
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+def schedule_response(tasks: List[dict], start: Optional[dt.datetime] = None) -> str:
+    """Réponse "schedule" plausible : les tâches à la suite, à partir de demain 9h (UTC)."""
+    if start is None:
+        tomorrow = dt.datetime.now(dt.timezone.utc) + dt.timedelta(days=1)
+        start = tomorrow.replace(hour=9, minute=0, second=0, microsecond=0)
+    items = []
+    for task in tasks:
+        end = start + dt.timedelta(minutes=task["duration"])
+        items.append({
+            "title": task["title"],
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "type": "task",
+            "reasoning": "Créneau libre suivant",
+        })
+        start = end
+    return json.dumps({"schedule": items})
+
+
+_SINGLE_TASKS = re.compile(r"^- Tâches .*?\) : (\[.*\])$", re.MULTILINE)
+_BATCH_TASKS = re.compile(r"^### Demande (\d+) :.*?^Tâches : (\[.*?\])$", re.MULTILINE | re.DOTALL)
+
+
+def _prompt_tasks(encoded: str) -> List[dict]:
+    return [{"title": task["t"], "duration": task["d"]} for task in json.loads(encoded)]
+
+
+def echo_schedules(prompt: str) -> str:
+    """
+    Réponse calculée à partir du prompt (encodage compact) : un planning par demande,
+    que le prompt soit unitaire ("schedule") ou un lot du micro-batching ("schedules").
+    """
+    batch = _BATCH_TASKS.findall(prompt)
+    if batch:
+        return json.dumps({"schedules": [
+            {"id": int(request_id), "schedule": json.loads(schedule_response(_prompt_tasks(tasks)))["schedule"]}
+            for request_id, tasks in batch
+        ]})
+    match = _SINGLE_TASKS.search(prompt)
+    return schedule_response(_prompt_tasks(match.group(1)) if match else [])
+
+
+class FakeGemini(BaseChatModel):
+    response: str = ""
+    responder: Optional[Callable[[str], str]] = None  # réponse calculée à partir du prompt
+    latency_ms: float = 0.0  # coût fixe d'un appel (réseau, file d'attente, préambule)
+    item_latency_ms: float = 0.0  # génération : coût par créneau écrit dans la réponse
+    max_concurrency: Optional[int] = None  # appels simultanés acceptés (quota du fournisseur)
+    chunk_chars: int = 40  # taille des morceaux renvoyés en streaming
+    # Pannes (tirées au hasard, `seed` pour rejouer la même séquence)
+    slow_rate: float = 0.0  # part des appels très lents (file d'attente du fournisseur)
+    slow_latency_ms: float = 0.0
+    failure_rate: float = 0.0  # part des appels en erreur (503 "model overloaded")
+    garbage_rate: float = 0.0  # part des réponses qui ne sont pas le JSON demandé
+    seed: Optional[int] = None
+    calls: int = 0
+    _slots: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+    _rng: Optional[random.Random] = PrivateAttr(default=None)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _respond(self, messages: List[BaseMessage]) -> tuple:
+        """(texte de la réponse, latence simulée en secondes)."""
+        text = self.responder(messages[-1].content) if self.responder else self.response
+        delay = (self.latency_ms + self.item_latency_ms * text.count('"title"')) / 1000
+        if self.slow_rate or self.failure_rate or self.garbage_rate:
+            if self._rng is None:
+                self._rng = random.Random(self.seed)
+            if self._rng.random() < self.slow_rate:
+                delay = self.slow_latency_ms / 1000
+            draw = self._rng.random()
+            if draw < self.failure_rate:
+                return None, delay
+            if draw < self.failure_rate + self.garbage_rate:
+                text = "Voici votre planning optimisé : tout tient dans la journée !"
+        return text, delay
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        text, delay = self._respond(messages)
+        time.sleep(delay)
+        if text is None:
+            raise RuntimeError("503 The model is overloaded.")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        text, delay = self._respond(messages)
+        if self.max_concurrency is None:
+            await asyncio.sleep(delay)
+        else:
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.max_concurrency)
+            async with self._slots:
+                await asyncio.sleep(delay)
+        if text is None:
+            raise RuntimeError("503 The model is overloaded.")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(
+        self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        # La latence est répartie sur les morceaux, comme un vrai flux de tokens
+        self.calls += 1
+        text, delay = self._respond(messages)
+        if text is None:
+            await asyncio.sleep(delay)
+            raise RuntimeError("503 The model is overloaded.")
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        for chunk in chunks:
+            await asyncio.sleep(delay / max(len(chunks), 1))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
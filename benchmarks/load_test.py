@@ -0,0 +1,358 @@
+"""
+Test de charge de bout en bout : API FastAPI + worker Celery + faux Google (OAuth, Calendar)
++ faux Gemini, avec latence et taux d'erreur configurables pour chacun.
+
+Des clients virtuels enchaînent un mélange réaliste de requêtes (lecture de l'agenda,
+optimisation IA, polling du statut, écriture dans Google) pendant `--duration` secondes.
+Sortie JSON (débit, p50/p95/p99, taux d'erreur par opération) à comparer entre commits :
+
+    REDIS_URL=redis://localhost:6379/0 python -m benchmarks.load_test --output after.json
+    python -m benchmarks.load_test --worker real --worker-concurrency 8 --gemini-latency-ms 800
+    python -m benchmarks.load_test --compare before.json after.json
+
+Nécessite Redis (broker / résultats Celery). Base SQLite jetable par défaut (DATABASE_URL
+pour une vraie base PostgreSQL). `--worker eager` exécute les tâches dans le process de l'API ;
+`--worker real` lance un vrai worker Celery (pool threads) en sous-process.
+
+Les modules `app` sont importés seulement après la configuration de l'environnement
+(les settings sont lus à l'import).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+OPERATIONS = ("events", "optimize", "status", "sync")
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"Opération inconnue dans --mix : {name} (attendu : {', '.join(OPERATIONS)})")
+        mix[name] = float(weight)
+    return mix
+
+
+def configure_environment(args, workdir: str) -> dict:
+    """Variables lues par les settings de l'API et du worker (avant tout import de `app`)."""
+    env = {
+        "BASE_URL": "http://localhost:8000",
+        "GOOGLE_API_KEY": "load-test",
+        "SECRET_KEY": "load-test",
+        "GOOGLE_TOKEN_URL": f"http://127.0.0.1:{args.google_port}/token",
+        "GOOGLE_CALENDAR_API_URL": f"http://127.0.0.1:{args.google_port}/calendar/v3",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{args.gemini_port}",
+        # Seaux à jetons / délestage : coupés par défaut, sinon on mesure surtout des 429
+        "OPTIMIZE_ADMISSION_ENABLED": "true" if args.admission else "false",
+    }
+    os.environ.update(env)
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{workdir}/load_test.db")
+    env["DATABASE_URL"] = os.environ["DATABASE_URL"]
+    return env
+
+
+class LoadStats:
+    def __init__(self, warmup_until: float):
+        self.warmup_until = warmup_until
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(Counter)  # opération -> code HTTP (ou nom de l'exception)
+
+    def record(self, operation: str, started: float, ok: bool, outcome: str) -> None:
+        if started < self.warmup_until:
+            return
+        if ok:
+            self.samples[operation].append((time.perf_counter() - started) * 1000)
+        else:
+            self.errors[operation][outcome] += 1
+
+    def report(self, elapsed: float) -> dict:
+        from benchmarks.bench_http_client import percentile
+
+        results = {}
+        for operation in sorted(set(self.samples) | set(self.errors)):
+            samples = self.samples[operation]
+            errors = sum(self.errors[operation].values())
+            total = len(samples) + errors
+            results[operation] = {
+                "requests": total,
+                "throughput_rps": round(total / elapsed, 2),
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "errors": dict(self.errors[operation]),
+                "p50_ms": round(percentile(samples, 50), 1) if samples else None,
+                "p95_ms": round(percentile(samples, 95), 1) if samples else None,
+                "p99_ms": round(percentile(samples, 99), 1) if samples else None,
+                "mean_ms": round(statistics.fmean(samples), 1) if samples else None,
+            }
+        return results
+
+
+def parse_tiers(spec: str) -> dict:
+    """`FREE=80,PRO=15,FOUNDER=5` -> poids de chaque offre parmi les comptes créés."""
+    return {name.strip().upper(): float(weight) for name, weight in (part.split("=") for part in spec.split(","))}
+
+
+async def seed(users: int, tiers: dict) -> list:
+    from sqlmodel import SQLModel
+    from app.core.security import create_access_token
+    from app.db.session import SessionLocal, engine
+    from app.models.oauth import OAuthCredential
+    from app.models.user import User
+    import app.models.calendar_event  # noqa: F401  (tables)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    tokens = []
+    async with SessionLocal() as db:
+        for i in range(users):
+            tier = random.choices(list(tiers), weights=list(tiers.values()))[0]
+            user = User(email=f"load-{time.time_ns()}-{i}@example.com", hashed_password="", subscription_tier=tier)
+            db.add(user)
+            await db.flush()
+            # Une partie des tokens Google expirent bientôt : le chemin "refresh" est exercé aussi
+            db.add(OAuthCredential(
+                user_id=user.id, provider="google", access_token="load-test", refresh_token="load-test",
+                expires_at=int(time.time()) + random.randint(0, 1800),
+            ))
+            tokens.append(create_access_token(user.id))
+        await db.commit()
+    await engine.dispose()
+    return tokens
+
+
+def random_tasks() -> list:
+    return [
+        {"title": f"Tâche {random.randint(1, 10 ** 6)}", "duration": random.choice((15, 30, 45, 60, 90)),
+         "priority": random.randint(1, 3), "preferred_time": random.choice((None, None, "10:00", "14:30"))}
+        for _ in range(random.randint(2, 6))
+    ]
+
+
+def random_sync_items() -> list:
+    start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1)
+    return [
+        {"title": f"Tâche {i}", "start": (start + timedelta(hours=i)).isoformat(),
+         "end": (start + timedelta(hours=i, minutes=30)).isoformat(), "type": "task"}
+        for i in range(random.randint(1, 3))
+    ]
+
+
+async def drive(base_url: str, tokens: list, args, mix: dict) -> dict:
+    import httpx
+    from benchmarks.bench_http_client import percentile
+
+    started = time.perf_counter()
+    stats = LoadStats(started + args.warmup)
+    deadline = started + args.warmup + args.duration
+    pending = {}  # task_id -> instant de soumission (bout en bout : soumission -> "completed")
+    end_to_end = []
+    operations, weights = list(mix), list(mix.values())
+
+    async def call(client, operation, method, path, token, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            response = await client.request(
+                method, path, headers={"Authorization": f"Bearer {token}"}, **kwargs
+            )
+        except httpx.HTTPError as e:
+            stats.record(operation, t0, False, type(e).__name__)
+            return None
+        ok = response.status_code < 400
+        stats.record(operation, t0, ok, str(response.status_code))
+        return response.json() if ok else None
+
+    async def virtual_user(client):
+        while time.perf_counter() < deadline:
+            token = random.choice(tokens)
+            operation = random.choices(operations, weights)[0]
+            if operation == "status" and not pending:
+                operation = "events"  # rien à suivre pour l'instant
+            if operation == "events":
+                await call(client, "events", "GET", "/api/v1/calendar/events", token)
+            elif operation == "sync":
+                await call(client, "sync", "POST", "/api/v1/calendar/sync", token, json=random_sync_items())
+            elif operation == "optimize":
+                submitted = time.perf_counter()
+                body = await call(
+                    client, "optimize", "POST", "/api/v1/ai/optimize/start", token,
+                    json={"tasks": random_tasks(), "user_timezone": "Europe/Paris", "engine": args.engine},
+                )
+                if body and body.get("task_id"):
+                    pending[body["task_id"]] = submitted
+            else:
+                task_id = random.choice(list(pending))
+                body = await call(client, "status", "GET", f"/api/v1/ai/optimize/status/{task_id}", token)
+                if body and body.get("status") in ("completed", "failed") and task_id in pending:
+                    submitted = pending.pop(task_id)
+                    if submitted >= stats.warmup_until:
+                        end_to_end.append((time.perf_counter() - submitted) * 1000)
+            if args.think_ms:
+                await asyncio.sleep(random.expovariate(1000 / args.think_ms))
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        await asyncio.gather(*(virtual_user(client) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - stats.warmup_until
+
+    results = stats.report(elapsed)
+    total = sum(r["requests"] for r in results.values())
+    errors = sum(round(r["error_rate"] * r["requests"]) for r in results.values())
+    return {
+        "operations": results,
+        "optimize_end_to_end": {
+            "completed": len(end_to_end),
+            "unfinished": len(pending),
+            "p50_ms": round(percentile(end_to_end, 50), 1) if end_to_end else None,
+            "p95_ms": round(percentile(end_to_end, 95), 1) if end_to_end else None,
+            "p99_ms": round(percentile(end_to_end, 99), 1) if end_to_end else None,
+        },
+        "overall": {
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2),
+            "error_rate": round(errors / total, 4) if total else 0.0,
+        },
+    }
+
+
+def start_real_worker(env: dict, concurrency: int) -> subprocess.Popen:
+    from app.core.celery_app import celery_app
+
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "celery", "-A", "app.core.celery_app", "worker",
+         "-P", "threads", "-c", str(concurrency), "--loglevel=warning"],
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if celery_app.control.ping(timeout=1.0):
+            return worker
+        if worker.poll() is not None:
+            raise SystemExit("Le worker Celery s'est arrêté au démarrage")
+    worker.terminate()
+    raise SystemExit("Le worker Celery ne répond pas (Redis démarré ? REDIS_URL ?)")
+
+
+def git_label() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="kairos-load-")
+    env = configure_environment(args, workdir)
+
+    from app.core.celery_app import celery_app
+    from app.main import app
+    from benchmarks.fake_gemini import FakeGeminiConfig, create_fake_gemini_app
+    from benchmarks.fake_google import BackgroundServer, FakeGoogleConfig, create_fake_google_app
+
+    google = create_fake_google_app(FakeGoogleConfig(
+        latency_ms=args.google_latency_ms, failure_rate=args.google_failure_rate, events_count=args.events,
+    ))
+    gemini = create_fake_gemini_app(FakeGeminiConfig(
+        latency_ms=args.gemini_latency_ms, item_latency_ms=args.gemini_item_ms,
+        failure_rate=args.gemini_failure_rate,
+    ))
+    tokens = asyncio.run(seed(args.users, parse_tiers(args.tiers)))
+
+    worker = None
+    if args.worker == "eager":
+        # Tâches exécutées dans l'API ; résultats écrits dans le backend pour que le polling fonctionne
+        celery_app.conf.update(task_always_eager=True, task_store_eager_result=True)
+    else:
+        worker = start_real_worker(env, args.worker_concurrency)
+
+    try:
+        with BackgroundServer(google, args.google_port), BackgroundServer(gemini, args.gemini_port), \
+                BackgroundServer(app, args.api_port) as api:
+            results = asyncio.run(drive(api.base_url, tokens, args, parse_mix(args.mix)))
+    finally:
+        if worker is not None:
+            worker.terminate()
+            worker.wait(timeout=30)
+
+    return {
+        "label": args.label or git_label(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "worker": args.worker, "worker_concurrency": args.worker_concurrency, "engine": args.engine,
+            "users": args.users, "concurrency": args.concurrency, "duration_s": args.duration,
+            "warmup_s": args.warmup, "think_ms": args.think_ms, "mix": args.mix, "events": args.events,
+            "google_latency_ms": args.google_latency_ms, "google_failure_rate": args.google_failure_rate,
+            "gemini_latency_ms": args.gemini_latency_ms, "gemini_item_ms": args.gemini_item_ms,
+            "gemini_failure_rate": args.gemini_failure_rate, "tiers": args.tiers, "admission": args.admission,
+            "database": "sqlite" if env["DATABASE_URL"].startswith("sqlite") else "postgresql",
+        },
+        **results,
+    }
+
+
+def compare(before_path: str, after_path: str) -> dict:
+    """Écart entre deux sorties du test de charge (après - avant), par opération."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    deltas = {}
+    for operation, new in after["operations"].items():
+        old = before["operations"].get(operation)
+        if old is None:
+            continue
+        deltas[operation] = {
+            metric: round(new[metric] - old[metric], 4)
+            for metric in ("throughput_rps", "error_rate", "p50_ms", "p95_ms", "p99_ms")
+            if new[metric] is not None and old[metric] is not None
+        }
+    return {"before": before["label"], "after": after["label"], "delta": deltas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--worker", choices=("eager", "real"), default="eager")
+    parser.add_argument("--worker-concurrency", type=int, default=8)
+    parser.add_argument("--engine", choices=("llm", "hybrid", "deterministic"), default="llm")
+    parser.add_argument("--users", type=int, default=50, help="Comptes créés (et tokens Google)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Clients virtuels simultanés")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0, help="Secondes exclues des mesures")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause moyenne entre deux requêtes d'un client")
+    parser.add_argument("--mix", default="events=55,optimize=10,status=30,sync=5")
+    parser.add_argument("--events", type=int, default=50, help="Événements par agenda Google")
+    parser.add_argument("--tiers", default="FREE=100", help="Offres des comptes créés (poids)")
+    parser.add_argument("--admission", action="store_true", help="Active les seaux à jetons et le délestage (429)")
+    parser.add_argument("--google-latency-ms", type=float, default=30.0)
+    parser.add_argument("--google-failure-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-latency-ms", type=float, default=400.0)
+    parser.add_argument("--gemini-item-ms", type=float, default=15.0)
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.0)
+    parser.add_argument("--api-port", type=int, default=8800)
+    parser.add_argument("--google-port", type=int, default=8801)
+    parser.add_argument("--gemini-port", type=int, default=8802)
+    parser.add_argument("--label", help="Nom du run dans la sortie (défaut : commit courant)")
+    parser.add_argument("--output", help="Écrit aussi le rapport JSON dans ce fichier")
+    parser.add_argument("--compare", nargs=2, metavar=("AVANT", "APRES"), help="Compare deux rapports JSON")
+    args = parser.parse_args()
+
+    report = compare(*args.compare) if args.compare else run(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+
+# Réglages obligatoires (app.core.config) : valeurs factices pour les tests
+os.environ.setdefault("BASE_URL", "http://localhost:8000")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("SECRET_KEY", "test")
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+from app.schemas.ai import ScheduledItem
+from app.workers import ai_task
+from app.workers.ai_task import _progress_publisher, optimize_schedule_task
+
+
+def test_progress_is_published_under_the_task_id_from_another_thread(monkeypatch):
+    states, messages = [], []
+    monkeypatch.setattr(optimize_schedule_task, "update_state", lambda **kwargs: states.append(kwargs))
+
+    async def fake_publish(task_id, payload):
+        messages.append((task_id, payload))
+
+    monkeypatch.setattr(ai_task.task_events, "publish", fake_publish)
+
+    # Comme dans le worker : le callback est créé sur le thread Celery (task.request renseigné)...
+    optimize_schedule_task.push_request(id="task-42")
+    try:
+        publish = _progress_publisher(optimize_schedule_task)
+    finally:
+        optimize_schedule_task.pop_request()
+
+    # ... mais appelé depuis le thread de la boucle partagée, où task.request.id vaut None
+    item = ScheduledItem(title="Rapport", start="2026-03-02T14:00:00+01:00", end="2026-03-02T14:30:00+01:00", type="task")
+    thread = threading.Thread(target=lambda: asyncio.run(publish(item)))
+    thread.start()
+    thread.join()
+
+    assert [state["task_id"] for state in states] == ["task-42"]
+    assert states[0]["state"] == "PROGRESS"
+    assert [task_id for task_id, _ in messages] == ["task-42"]
+    assert messages[0][1]["partial"][0]["title"] == "Rapport"
@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_celery_app_imports_with_missing_multiprocess_dir(tmp_path):
+    # Le dossier n'existe pas encore (premier démarrage d'un conteneur worker)
+    metrics_dir = tmp_path / "prometheus"
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(metrics_dir), "PYTHONPATH": str(ROOT)}
+
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.core.celery_app"],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert metrics_dir.is_dir()
@@ -0,0 +1,22 @@
+from app.core.config import settings
+from app.services.ai_engine import model_policy as policy_module
+from app.services.ai_engine.model_policy import ModelPolicy, ModelStats
+from app.services.ai_engine.prompt_encoding import EncodedPrompt
+
+
+def test_demoted_model_recovers_once_its_failures_age_out(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(policy_module.time, "monotonic", lambda: now[0])
+    stats = ModelStats()
+    policy = ModelPolicy(stats)
+    encoded = EncodedPrompt(inputs={}, busy_blocks=0, busy_dropped=0, estimated_tokens=3000, task_count=10)
+
+    # Panne passagère du modèle principal : il passe derrière le modèle de repli...
+    for _ in range(settings.LLM_STATS_MIN_SAMPLES):
+        stats.record(settings.LLM_MODEL, 1.0, ok=False)
+    assert policy.chain(encoded)[0] != settings.LLM_MODEL
+
+    # ... et, n'étant plus appelé, revient devant quand ses échecs sont trop anciens
+    now[0] += settings.LLM_STATS_MAX_AGE_SECONDS + 1
+    assert stats.success_rate(settings.LLM_MODEL) is None
+    assert policy.chain(encoded)[0] == settings.LLM_MODEL
@@ -0,0 +1,27 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from celery.exceptions import TimeLimitExceeded
+
+from app.workers import precompute_task
+from app.workers.precompute_task import precompute_user_plan
+
+
+def test_hung_precomputation_hits_the_time_limit(monkeypatch):
+    # Pool threads : time_limit n'est pas appliqué par Celery, la boucle doit annuler la coroutine
+    cancelled = asyncio.Event()
+
+    async def hung(user_id):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    monkeypatch.setattr(precompute_task.plan_precompute, "precompute", hung)
+    monkeypatch.setattr(precompute_user_plan, "time_limit", 0.1)
+
+    with pytest.raises(TimeLimitExceeded):
+        precompute_user_plan(str(uuid4()))
+    precompute_task.worker_loop.run(asyncio.wait_for(cancelled.wait(), 1))
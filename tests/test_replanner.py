@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.calendar_event import CalendarSyncState
+from app.models.task import ScheduledSlot, Task
+from app.models.user import User
+from app.schemas.ai import TaskRequest
+from app.schemas.planning import CalendarChange, ReplanRequest, TaskMove
+from app.services.replanner import IncrementalPlanner
+
+NOW = datetime(2026, 3, 2, 7, 0, tzinfo=timezone.utc)  # lundi, 08:00 à Paris
+TZ = "Europe/Paris"
+
+
+def _engine(path):
+    # Clés étrangères appliquées, comme Postgres (SQLite ne les vérifie pas par défaut)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _foreign_keys(connection, _record):
+        connection.execute("PRAGMA foreign_keys=ON")
+
+    return engine
+
+
+async def _scenario(path):
+    engine = _engine(path)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    planner = IncrementalPlanner()
+
+    async with sessions() as db:
+        user = User(email="replan@example.com", hashed_password="")
+        db.add(user)
+        await db.commit()
+        # Copie locale de l'agenda fraîche : Google n'est pas appelé
+        db.add(CalendarSyncState(
+            user_id=user.id, sync_token="test", last_synced_at=datetime.now(timezone.utc),
+            synced_until=datetime.now(timezone.utc) + timedelta(days=365),
+        ))
+        await db.commit()
+
+        # Ajouts : tâches et créneaux insérés dans la même transaction
+        added = await planner.replan(user.id, ReplanRequest(user_timezone=TZ, added=[
+            TaskRequest(title="Rapport", duration=60, priority=3),
+            TaskRequest(title="Courses", duration=30, priority=1),
+        ]), db, now=NOW)
+        assert len(added["changed"]) == 2 and not added["unplaced"]
+        report = next(item for item in added["changed"] if item.title == "Rapport")
+        chores = next(item for item in added["changed"] if item.title == "Courses")
+        assert report.start == "2026-03-02T08:00:00+01:00"
+
+        # Déplacement à la main : créneau épinglé
+        moved = await planner.replan(user.id, ReplanRequest(user_timezone=TZ, moved=[
+            TaskMove(task_id=report.task_id, start=datetime(2026, 3, 2, 15, 0)),
+        ]), db, now=NOW)
+        assert [(item.start, item.pinned) for item in moved["changed"]] == [("2026-03-02T15:00:00+01:00", True)]
+
+        # Changement d'agenda : une réunion sur le créneau des courses, qui sont délogées
+        meeting = await planner.replan(user.id, ReplanRequest(user_timezone=TZ, calendar=[CalendarChange(
+            event_id="evt1", title="Réunion", start="2026-03-02T07:00:00Z", end="2026-03-02T09:00:00Z",
+        )]), db, now=NOW)
+        assert [(item.task_id, item.start) for item in meeting["changed"]] == [
+            (chores.task_id, "2026-03-02T10:00:00+01:00")
+        ]
+
+        # Suppression : la tâche et son créneau
+        removed = await planner.replan(user.id, ReplanRequest(user_timezone=TZ, removed=[report.task_id]), db, now=NOW)
+        assert removed["removed"] == [report.task_id]
+        assert (await db.exec(select(Task.id))).all() == [chores.task_id]
+        assert (await db.exec(select(ScheduledSlot.task_id))).all() == [chores.task_id]
+    await engine.dispose()
+
+
+def test_replan_with_foreign_keys_enforced(tmp_path):
+    asyncio.run(_scenario(tmp_path / "replan.db"))
@@ -0,0 +1,39 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app.schemas.ai import ScheduledItem, TaskRequest
+from app.services.schedule_validator import ScheduleValidator
+
+TZ = "Europe/Paris"
+NOW = datetime(2026, 3, 2, 8, 0, tzinfo=ZoneInfo(TZ))  # lundi
+
+
+def test_busy_preferred_slot_moves_task_right_after_the_event():
+    # 14:00 est pris par une réunion ; le LLM a mis la tâche le matin, sur un autre événement
+    events = [
+        {"title": "Standup", "start": "2026-03-02T09:00:00+01:00", "end": "2026-03-02T09:30:00+01:00"},
+        {"title": "Réunion", "start": "2026-03-02T13:30:00+01:00", "end": "2026-03-02T14:30:00+01:00"},
+    ]
+    task = TaskRequest(title="Rapport", duration=30, priority=2, preferred_time="14:00")
+    schedule = [ScheduledItem(
+        title="Rapport", start="2026-03-02T09:00:00+01:00", end="2026-03-02T09:30:00+01:00", type="task",
+    )]
+
+    repaired, report = ScheduleValidator().repair(schedule, events, [task], TZ, now=NOW)
+
+    placed = next(item for item in repaired if item.type == "task")
+    assert placed.start == "2026-03-02T14:30:00+01:00"  # pas 08:00, le premier trou de la journée
+    assert report.issues["overlap"] == 1
+    assert report.items_repaired == 1
+
+
+def test_free_preferred_slot_is_restored():
+    task = TaskRequest(title="Sport", duration=60, priority=2, preferred_time="18:00")
+    schedule = [ScheduledItem(
+        title="Sport", start="2026-03-02T10:00:00+01:00", end="2026-03-02T11:00:00+01:00", type="task",
+    )]
+
+    repaired, report = ScheduleValidator().repair(schedule, [], [task], TZ, now=NOW)
+
+    assert repaired[0].start == "2026-03-02T18:00:00+01:00"
+    assert report.issues["preferred"] == 1
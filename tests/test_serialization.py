@@ -0,0 +1,27 @@
+import json
+
+from app.core import serialization
+from app.core.celery_app import celery_app
+from app.core.serialization import RESULT_SERIALIZER, pack, unpack
+
+RESULT = [
+    {"title": "Réunion d'équipe", "start": "2026-03-02T09:00:00+01:00", "end": "2026-03-02T09:30:00+01:00"},
+    {"title": "Rapport", "start": "2026-03-02T14:00:00+01:00", "end": "2026-03-02T14:30:00+01:00", "priority": 2},
+]
+
+
+def test_pack_unpack_round_trip(monkeypatch):
+    for min_bytes in (0, 1):  # jamais compressé / toujours compressé
+        monkeypatch.setattr(serialization.settings, "CELERY_RESULT_COMPRESSION_MIN_BYTES", min_bytes)
+        data = pack(RESULT)
+        assert data[:1] == (b"\x01" if min_bytes else b"\x00")
+        assert unpack(data) == RESULT
+
+
+def test_legacy_json_results_stay_readable():
+    # Résultat écrit en JSON par un worker pas encore mis à jour, relu avec le nouveau sérialiseur
+    assert celery_app.conf.result_serializer == RESULT_SERIALIZER
+    legacy = json.dumps({"status": "SUCCESS", "result": RESULT, "task_id": "task-42"}).encode()
+    meta = celery_app.backend.decode(legacy)
+    assert meta["result"] == RESULT
+    assert unpack(json.dumps("ok")) == "ok"